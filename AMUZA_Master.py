@@ -8,6 +8,7 @@ import time
 import sys
 import logging
 from datetime import datetime
+from analysis.wells import VisitLog
 
 class Method:
     def __init__(self, ports, time):
@@ -93,6 +94,7 @@ class AmuzaConnection:
                 print(f"Method number {data[1]}") 
                 print(f"Time left at well {data[2][:len(data[2])-1].lstrip('0')+data[2][len(data[2])-1]}: {data[3][:len(data[3])-1].lstrip('0')+data[3][len(data[3])-1]} seconds") # this long line removes trailing zeroes while accounting for the edge case of "0"
             logging.info(f"Status Update: {cmd}")
+            self.visits.status(cmd)
             self.currentState = int(data[0])
             
         else:
@@ -114,6 +116,9 @@ class AmuzaConnection:
         
         logging.getLogger().addHandler(file_handler)
         self.showOutput = showOutputInConsole
+        # Well visits for lining up live sensor samples (analysis.wells); their
+        # timestamp_ns is time.monotonic_ns, so the visits use the same clock
+        self.visits = VisitLog(time.monotonic)
         print(f"AMUZA Interface Initiated - Detailed Logs can be found in AMUZA-{currentTime}.log")
         logging.info("AMUZA Interface Initiated")
     
@@ -314,6 +319,9 @@ class AmuzaConnection:
     
     def Move(self, sequence):
         self.socket.send(str(sequence))
+        if self.visits.move(sequence):
+            # Only a new target is logged, a resent sequence would restart the plan in from_log
+            logging.info(f"Move: {str(sequence).strip()}")
     
     def AdjustTemp(self, temperature):
         if(temperature < 0 or temperature > 99.9):
@@ -1,12 +1,14 @@
 import sys
 import threading
 import time
+import asyncio
 from PyQt5.QtWidgets import (
     QApplication, QWidget, QVBoxLayout, QHBoxLayout, QLabel, QGridLayout, QLineEdit, QPushButton, QMessageBox, QDialog, QFormLayout, QSpinBox
 )
 from PyQt5.QtCore import Qt, QSize
 from PyQt5.QtGui import QMouseEvent
 from SIX_SERVER_READER import PotentiostatReader
+from potentiostat.acquisition import AcquisitionService, write_text
 import AMUZA_Master
 
 # Global variables
@@ -342,8 +344,10 @@ class AMUZAGUI(QWidget):
         BAUD = 9600
         TIMEOUT = 0.5
         DataLogger = PotentiostatReader(com_port=COM_PORT, baud_rate=9600, timeout=TIMEOUT, output_filename=file_path)
-        while True:
-            data_list = DataLogger.run()
+        # Single acquisition loop feeding the file sink; subscribe more consumers here
+        self.acquisition = AcquisitionService(DataLogger)
+        asyncio.run(self.acquisition.run_with(
+            write_text(self.acquisition.subscribe(policy='block'), DataLogger.sink, DataLogger.output_format)))
 
     def resizeEvent(self, event):
         """Lock the aspect ratio of the window."""
@@ -1,5 +1,5 @@
-import pandas as pd
 import os
+from analysis.loader import load_table
 
 # Define file paths
 example_format_path = r'C:\Users\NoahB\Documents\HebrewU Bioengineering\Equipment\JOBST\example_format.txt'
@@ -16,11 +16,8 @@ os.makedirs(os.path.dirname(output_file_path), exist_ok=True)
 with open(example_format_path, 'r') as file:
     template_lines = file.readlines()
 
-# Read the Buffer_Sol data, handling possible encoding issues
-try:
-    buffer_df = pd.read_csv(buffer_sol_path, sep='\t', header=None, encoding='ISO-8859-1', skiprows=1)
-except UnicodeDecodeError:
-    buffer_df = pd.read_csv(buffer_sol_path, sep='\t', header=None, encoding='cp1252', skiprows=1)
+# Read the Buffer_Sol data, handling possible encoding issues (cached, see analysis.loader)
+buffer_df = load_table(buffer_sol_path, skiprows=1)
 
 # Example: The expected number of columns in the output is 83 (based on your description)
 expected_columns = 83
@@ -1,6 +1,8 @@
 import threading
 import time
+import asyncio
 from SIX_SERVER_READER import PotentiostatReader
+from potentiostat.acquisition import AcquisitionService, write_text
 import AMUZA_Master
 
 # Connect to the AMUZA
@@ -70,8 +72,9 @@ def run_datalogger(filename):
     BAUD = 9600
     TIMEOUT = 0.5
     DataLogger = PotentiostatReader(com_port=COM_PORT, baud_rate=9600, timeout=TIMEOUT, output_filename=file_path)
-    while True:
-        data_list = DataLogger.run()
+    service = AcquisitionService(DataLogger)
+    asyncio.run(service.run_with(
+        write_text(service.subscribe(policy='block'), DataLogger.sink, DataLogger.output_format)))
 
 # Get the filename input
 time.sleep(7)
@@ -0,0 +1,207 @@
+"""
+Batch analysis of many runs on a process pool.
+
+Every run goes through the same steps as ``jobst_data_reader.main`` with
+``live=False`` (``load_data``, ``calibrate_data`` and the steady state pass
+of ``create_buffer``) in its own worker process, and the ``get_debug_info``
+tables of all runs are stacked into one summary with a ``run`` column.
+With ``watch`` the directories are scanned again and again; runs are picked
+up once they are finished (they have a footer, are archived, or were not
+written to for ``settle`` seconds) and again whenever they change.
+
+Example
+-------
+    python -m analysis.batch BioMon "Data_Collected/*.txt" --output summary.txt
+    python -m analysis.batch Data_Collected --watch --config calibration.json
+
+"""
+
+import glob
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from potentiostat.archive import EXTENSION, is_archive
+from jobst_data_reader import DataProcessor
+
+RUN_PATTERNS = ['*.txt', '*' + EXTENSION]
+
+
+def find_runs(patterns):
+    """
+    Run files matching ``patterns``, sorted and without duplicates.
+
+    A directory stands for the text runs and archives directly inside it;
+    anything else is a glob. A run that is also archived is only listed
+    once, as the text file.
+    """
+    runs = set()
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            for run_pattern in RUN_PATTERNS:
+                runs.update(glob.glob(os.path.join(pattern, run_pattern)))
+        else:
+            runs.update(path for path in glob.glob(pattern) if os.path.isfile(path))
+    return sorted(run for run in runs
+                  if not (is_archive(run) and run[:-len(EXTENSION)] in runs))
+
+
+def has_footer(file_path, tail=4096):
+    """Whether the last line of a text run is a footer instead of a data row."""
+    with open(file_path, 'rb') as file:
+        file.seek(max(0, os.path.getsize(file_path) - tail))
+        lines = [line for line in file.read().splitlines() if line.strip()]
+    # A data row followed by a non numeric one; the Start line alone is not a footer
+    counters = [line.split(b"\t", 1)[0].strip() for line in lines[-2:]]
+    return len(counters) == 2 and counters[0].isdigit() and not counters[1].isdigit()
+
+
+def is_finished(file_path, settle=30.0, now=None):
+    """Archived, ended by a footer, or left alone for ``settle`` seconds."""
+    if is_archive(file_path):
+        return True
+    now = time.time() if now is None else now
+    return now - os.path.getmtime(file_path) >= settle or has_footer(file_path)
+
+
+def analyze_run(file_path, calibration=None):
+    """
+    Offline analysis of one run, as run in a worker process.
+
+    Returns the path, the ``get_debug_info`` table (None on failure), the
+    number of data rows and the error message (None on success), so one
+    broken file does not stop the batch: whatever the analysis raises
+    becomes the error entry of that run instead of failing the pool.
+    """
+    processor = DataProcessor(calibration)
+    try:
+        processor.load_data(file_path)
+        processor.create_buffer()
+        debug_info = processor.get_debug_info()
+    except (Exception, SystemExit) as error:
+        # load_data exits instead of raising when the file is gone
+        return file_path, None, 0, f"{type(error).__name__}: {error}"
+    return file_path, debug_info, len(processor.results), None
+
+
+def summary_table(results):
+    """
+    Stack ``analyze_run`` results into one table.
+
+    Each run contributes its ``get_debug_info`` rows below a ``run`` and a
+    ``rows`` column (data rows analysed); runs without any steady state
+    value keep a single row so they still show up.
+    """
+    frames = []
+    for file_path, debug_info, rows, error in results:
+        if error is not None:
+            continue
+        if debug_info.empty:
+            debug_info = pd.DataFrame(index=[0], columns=debug_info.columns)
+        frames.append(debug_info.assign(run=file_path, rows=rows))
+    if not frames:
+        return pd.DataFrame(columns=['run', 'rows'])
+    summary = pd.concat(frames, ignore_index=True)
+    return summary[['run', 'rows'] + [x for x in summary.columns if x not in ('run', 'rows')]]
+
+
+def analyze_runs(files, workers=None, calibration=None):
+    """
+    Analyse ``files`` on up to ``workers`` processes (all cores by default).
+
+    Yields the ``analyze_run`` results in the order of ``files``. With one
+    worker or one file everything runs in this process.
+    """
+    files = list(files)
+    if workers == 1 or len(files) <= 1:
+        for file_path in files:
+            yield analyze_run(file_path, calibration)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        yield from executor.map(analyze_run, files, [calibration] * len(files))
+
+
+def write_summary(summary, filename):
+    """Write the tab separated summary atomically (through a .tmp file)."""
+    temporary = filename + ".tmp"
+    summary.to_csv(temporary, sep="\t", index=False)
+    os.replace(temporary, filename)
+
+
+def watch(patterns, output=None, workers=None, calibration=None, interval=10.0, settle=30.0,
+          stop=None, report=print):
+    """
+    Keep analysing the finished runs among ``patterns`` as they appear.
+
+    A run is analysed again when its size or modification time changes and
+    its row in the summary is replaced. The pool stays up between scans.
+    After every scan that analysed something the summary is written to
+    ``output`` (if given). Runs until ``stop()`` returns True; returns the
+    last summary.
+    """
+    seen = {}
+    results = {}
+    summary = summary_table([])
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        while not (stop is not None and stop()):
+            now = time.time()
+            pending = []
+            for file_path in find_runs(patterns):
+                try:
+                    stat = os.stat(file_path)
+                    identity = (stat.st_size, stat.st_mtime_ns)
+                    if seen.get(file_path) == identity or not is_finished(file_path, settle, now):
+                        continue
+                except FileNotFoundError:
+                    continue
+                seen[file_path] = identity
+                pending.append(file_path)
+            if pending:
+                for result in executor.map(analyze_run, pending, [calibration] * len(pending)):
+                    results[result[0]] = result
+                    if result[3] is not None:
+                        report(f"{result[0]}: {result[3]}")
+                    else:
+                        report(f"{result[0]}: {result[2]} rows, {len(result[1])} outputs")
+                summary = summary_table(results[file_path] for file_path in sorted(results))
+                if output:
+                    write_summary(summary, output)
+            time.sleep(interval)
+    return summary
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from analysis.calibration import Calibration
+
+    parser = argparse.ArgumentParser(description="Analyse many runs in parallel")
+    parser.add_argument("patterns", nargs="+", help="Run directories or globs (BioMon, Data_Collected/*.txt, ...)")
+    parser.add_argument("--output", type=str, default=None, help="Tab separated summary file")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes, all cores by default")
+    parser.add_argument("--config", type=str, default=None, help="JSON calibration per sensor block")
+    parser.add_argument("--watch", action="store_true", help="Keep analysing newly finished runs")
+    parser.add_argument("--interval", type=float, default=10.0, help="Seconds between scans in watch mode")
+    parser.add_argument("--settle", type=float, default=30.0,
+                        help="Seconds without writes after which a run without footer counts as finished")
+    args = parser.parse_args()
+
+    calibration = Calibration.from_config(args.config) if args.config else None
+    if args.watch:
+        try:
+            watch(args.patterns, args.output, args.workers, calibration, args.interval, args.settle)
+        except KeyboardInterrupt:
+            pass
+    else:
+        results = []
+        for result in analyze_runs(find_runs(args.patterns), args.workers, calibration):
+            results.append(result)
+            if result[3] is not None:
+                print(f"{result[0]}: {result[3]}")
+        summary = summary_table(results)
+        if args.output:
+            write_summary(summary, args.output)
+        else:
+            print(summary.to_string(index=False))
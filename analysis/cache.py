@@ -0,0 +1,227 @@
+"""
+Cache of parsed runs.
+
+Parsing the tab separated text is by far the slowest part of opening a
+run, and jobst_data_reader, jobst_data_plotter, Format_BioMon and the batch
+analysis all parse the same files again. ``RunCache`` keeps the parsed
+columns of every run as a compressed .npz file, one per run and parser,
+so loading them again is a few array reads.
+
+An entry is keyed by the absolute path of the run and records its size and
+modification time; when either differs the entry is stale and is rebuilt
+from the text. Columns that were not cached yet are parsed together with
+the cached ones and added to the entry. The cache lives in
+~/.cache/jobst_runs unless the JOBST_RUN_CACHE environment variable names
+another directory; an empty JOBST_RUN_CACHE turns it off. It holds at most
+256 MB (JOBST_RUN_CACHE_MB to change that): after every write the least
+recently used entries are removed until the rest fit.
+
+Example
+-------
+    python -m analysis.cache warm "Data_Collected/*.txt"
+    python -m analysis.cache clear
+
+"""
+
+import glob
+import hashlib
+import os
+
+import numpy as np
+
+from potentiostat.archive import resolve_run
+
+DEFAULT_DIRECTORY = os.path.join(os.path.expanduser('~'), '.cache', 'jobst_runs')
+DEFAULT_MAX_BYTES = 256 << 20
+
+
+def file_identity(file_path):
+    """Absolute path, size and modification time (ns) of a file."""
+    stat = os.stat(file_path)
+    return os.path.abspath(file_path), stat.st_size, stat.st_mtime_ns
+
+
+class RunCache:
+    """
+    Directory of parsed run columns.
+
+    Parameters
+    ----------
+    directory : string, optional
+        Where the entries are kept. The default is ``DEFAULT_DIRECTORY``.
+    enabled : bool, optional
+        With False every ``get`` just parses. The default is True.
+    max_bytes : int, optional
+        Size the entries are kept under by evicting the least recently used
+        ones. The default is ``DEFAULT_MAX_BYTES``; None means no limit.
+
+    """
+    def __init__(self, directory=DEFAULT_DIRECTORY, enabled=True, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = directory
+        self.enabled = enabled
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+
+    def entry_path(self, file_path, kind):
+        digest = hashlib.sha1(os.path.abspath(file_path).encode('utf-8')).hexdigest()[:20]
+        return os.path.join(self.directory, f"{digest}.{kind}.npz")
+
+    def read(self, file_path, kind, identity):
+        """Cached columns of ``file_path`` as a dict, or None if missing or stale."""
+        path = self.entry_path(file_path, kind)
+        try:
+            with np.load(path, allow_pickle=False) as entry:
+                if (str(entry['source']), int(entry['size']), int(entry['mtime_ns'])) != identity:
+                    return None
+                arrays = {str(name): entry[f'c{i}'] for i, name in enumerate(entry['names'])}
+            # The modification time of an entry is its last use, for evict()
+            os.utime(path)
+        except (OSError, KeyError, ValueError):
+            # Missing, half written by an older version or otherwise unreadable
+            return None
+        return arrays
+
+    def write(self, file_path, kind, identity, arrays):
+        """
+        Store ``arrays`` (column name to 1-d array) for ``file_path``.
+
+        Columns of Python objects (text) cannot be stored without pickling
+        and are skipped, as are unwritable cache directories.
+        """
+        if any(array.dtype == object for array in arrays.values()):
+            return
+        path = self.entry_path(file_path, kind)
+        temporary = f"{path}.{os.getpid()}.tmp"
+        source, size, mtime_ns = identity
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(temporary, 'wb') as file:
+                np.savez_compressed(file, source=np.array(source), size=np.array(size, dtype=np.int64),
+                         mtime_ns=np.array(mtime_ns, dtype=np.int64), names=np.array(list(arrays), dtype=str),
+                         **{f'c{i}': array for i, array in enumerate(arrays.values())})
+            os.replace(temporary, path)
+        except OSError:
+            if os.path.exists(temporary):
+                os.remove(temporary)
+            return
+        self.evict(keep=path)
+
+    def evict(self, keep=None):
+        """
+        Remove the least recently used entries until the rest fit in
+        ``max_bytes`` (``keep`` is never removed); returns how many went.
+        """
+        if self.max_bytes is None:
+            return 0
+        entries = []
+        for entry in glob.glob(os.path.join(self.directory, '*.npz')):
+            try:
+                stat = os.stat(entry)
+            except FileNotFoundError:
+                # Evicted by another process meanwhile
+                continue
+            entries.append((stat.st_mtime_ns, stat.st_size, entry))
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for _, size, entry in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if entry == keep:
+                continue
+            try:
+                os.remove(entry)
+            except FileNotFoundError:
+                pass
+            total -= size
+            removed += 1
+        return removed
+
+    def get(self, file_path, kind, parse, columns=None):
+        """
+        Columns of a run, from the cache or parsed and cached.
+
+        Parameters
+        ----------
+        file_path : string
+            The run (its .pstz archive is used if only that exists).
+        kind : string
+            Name of the parser, so different readings of a file do not mix.
+        parse : callable
+            ``parse(columns)`` returns a dict of column name to 1-d array
+            for ``columns`` (all columns when None).
+        columns : list of string, optional
+            Columns needed. The default (None) caches and returns whatever
+            ``parse(None)`` returns.
+
+        Returns
+        -------
+        dict
+            Column name to array; it may hold more columns than requested.
+
+        """
+        if not self.enabled:
+            return parse(columns)
+        source = resolve_run(file_path)
+        # Taken before parsing, so a file written meanwhile is stale next time
+        identity = file_identity(source)
+        cached = self.read(source, kind, identity)
+        if cached is not None and (columns is None or all(column in cached for column in columns)):
+            self.hits += 1
+            return cached
+        self.misses += 1
+        if cached is not None and columns is not None:
+            columns = list(cached) + [column for column in columns if column not in cached]
+        arrays = parse(columns)
+        self.write(source, kind, identity, arrays)
+        return arrays
+
+    def clear(self):
+        """Remove every entry; returns how many there were."""
+        entries = glob.glob(os.path.join(self.directory, '*.npz'))
+        for entry in entries:
+            os.remove(entry)
+        return len(entries)
+
+
+_default = None
+
+
+def default_cache():
+    """The shared cache configured by JOBST_RUN_CACHE and JOBST_RUN_CACHE_MB."""
+    global _default
+    if _default is None:
+        directory = os.environ.get('JOBST_RUN_CACHE', DEFAULT_DIRECTORY)
+        megabytes = os.environ.get('JOBST_RUN_CACHE_MB')
+        max_bytes = int(float(megabytes) * (1 << 20)) if megabytes else DEFAULT_MAX_BYTES
+        _default = RunCache(directory or DEFAULT_DIRECTORY, enabled=bool(directory), max_bytes=max_bytes)
+    return _default
+
+
+def set_default_cache(cache):
+    """Replace the shared cache (for example with one in a scratch directory); returns the old one."""
+    global _default
+    previous, _default = default_cache(), cache
+    return previous
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from analysis.loader import DEFAULT_COLUMNS, load_run
+
+    parser = argparse.ArgumentParser(description="Cache of parsed runs")
+    commands = parser.add_subparsers(dest="command", required=True)
+    warm_parser = commands.add_parser("warm", help="Parse runs into the cache ahead of time")
+    warm_parser.add_argument("sources", nargs="+", help="Runs (globs allowed)")
+    warm_parser.add_argument("--columns", nargs="+", default=DEFAULT_COLUMNS, help="Header names to cache")
+    commands.add_parser("clear", help="Remove every cached run")
+    args = parser.parse_args()
+
+    cache = default_cache()
+    if args.command == "warm":
+        for pattern in args.sources:
+            for source in sorted(glob.glob(pattern)) or [pattern]:
+                print(f"{source}: {len(load_run(source, args.columns))} rows")
+    else:
+        print(f"Removed {cache.clear()} entries from {cache.directory}")
@@ -0,0 +1,167 @@
+"""
+Calibration of the sensor block #1 channels into analyte concentrations.
+
+Every analyte is a working electrode minus its blank, times a gain:
+
+    Glutamate = (ch1 - ch2) * 0.97
+    Glutamine = (ch3 - ch1) * 0.418
+    Glucose   = (ch5 - ch4) * 0.6854
+    Lactate   = (ch6 - ch4) * 0.0609
+
+The pairs and gains are kept as index and coefficient vectors so a single
+sample or a whole (rows, 6) array is calibrated with one fancy index, one
+subtraction and one multiplication, without building DataFrames.
+
+``Calibration`` generalises this to a linear map over the channels of all
+sensor blocks (#1 to #4), loaded from a per sensor JSON config such as
+calibration.json, and applied as one matrix multiply.
+
+"""
+
+import json
+
+import numpy as np
+import pandas as pd
+
+from analysis.loader import load_run
+
+ANALYTES = ['Glutamate', 'Glutamine', 'Glucose', 'Lactate']
+CHANNELS = [f'#1ch{channel}' for channel in range(1, 7)]
+# Zero based channel of the working electrode and of the blank per analyte
+WORKING = np.array([0, 2, 4, 5])
+BLANK = np.array([1, 0, 3, 3])
+GAINS = np.array([0.97, 0.418, 0.6854, 0.0609])
+
+
+def calibrate(channels, out=None):
+    """
+    Analytes from raw channel currents.
+
+    ``channels`` is a (6,) sample or a (rows, 6) array; the result has the
+    same leading shape with four analytes. ``out`` can be a preallocated
+    array (for example a row of a ring buffer) to write into.
+    """
+    channels = np.asarray(channels, dtype=np.float64)
+    difference = channels[..., WORKING] - channels[..., BLANK]
+    return np.multiply(difference, GAINS, out=out)
+
+
+# Block #1 rules above in the configuration format of Calibration.from_config
+DEFAULT_SENSOR = {
+    name: {'working': int(working) + 1, 'blank': int(blank) + 1, 'gain': float(gain)}
+    for name, working, blank, gain in zip(ANALYTES, WORKING, BLANK, GAINS)
+}
+
+
+class Calibration:
+    """
+    Linear map from raw channels of any sensor blocks to analytes.
+
+    ``matrix`` has one row per analyte and one column per raw channel in
+    ``columns``; calibrating a (rows, channels) batch or a live ring is a
+    single matrix multiply plus the offsets.
+
+    Parameters
+    ----------
+    columns : list of string
+        Raw channel columns, for example '#1ch1'.
+    analytes : list of string
+        Output names, for example '#1 Glutamate'.
+    matrix : numpy.ndarray
+        (len(analytes), len(columns)) coefficients.
+    offsets : numpy.ndarray, optional
+        Added to every analyte. The default is zeros.
+
+    """
+    def __init__(self, columns, analytes, matrix, offsets=None):
+        self.columns = list(columns)
+        self.analytes = list(analytes)
+        self.matrix = np.asarray(matrix, dtype=np.float64)
+        if self.matrix.shape != (len(self.analytes), len(self.columns)):
+            raise ValueError("Calibration matrix does not match the columns and analytes")
+        self.offsets = (np.zeros(len(self.analytes)) if offsets is None
+                        else np.asarray(offsets, dtype=np.float64))
+        self._transposed = np.ascontiguousarray(self.matrix.T)
+
+    @classmethod
+    def from_sensors(cls, sensors):
+        """
+        Build the map from a per sensor block description.
+
+        ``sensors`` maps a block ('#1' to '#4' or 1 to 4) to its analytes.
+        An analyte is either ``{'working': 1, 'blank': 2, 'gain': 0.97}``
+        (the working minus the blank channel, times the gain) or
+        ``{'coefficients': {'1': 0.5, '3': -0.5}}`` for any linear
+        combination of that block's channels; both accept an ``offset``.
+        """
+        columns, analytes, rows, offsets = [], [], [], []
+        for block, definitions in sensors.items():
+            block = str(block).lstrip('#')
+            for name, definition in definitions.items():
+                if 'coefficients' in definition:
+                    terms = {int(channel): float(value)
+                             for channel, value in definition['coefficients'].items()}
+                else:
+                    gain = float(definition.get('gain', 1.0))
+                    terms = {int(definition['working']): gain}
+                    if definition.get('blank') is not None:
+                        blank = int(definition['blank'])
+                        terms[blank] = terms.get(blank, 0.0) - gain
+                row = {}
+                for channel, value in terms.items():
+                    column = f'#{block}ch{channel}'
+                    if column not in columns:
+                        columns.append(column)
+                    row[column] = value
+                analytes.append(f'#{block} {name}')
+                rows.append(row)
+                offsets.append(float(definition.get('offset', 0.0)))
+        matrix = np.zeros((len(analytes), len(columns)))
+        for i, row in enumerate(rows):
+            for column, value in row.items():
+                matrix[i, columns.index(column)] = value
+        return cls(columns, analytes, matrix, offsets)
+
+    @classmethod
+    def from_config(cls, file_path):
+        """Load a JSON file with the ``from_sensors`` layout."""
+        with open(file_path, 'r') as file:
+            return cls.from_sensors(json.load(file))
+
+    @classmethod
+    def default(cls, blocks=(1,)):
+        """Block #1 rules applied to each of ``blocks``."""
+        return cls.from_sensors({f'#{block}': DEFAULT_SENSOR for block in blocks})
+
+    def apply(self, raw, out=None):
+        """Analytes of a (rows, len(columns)) array or a single row."""
+        result = np.matmul(np.asarray(raw, dtype=np.float64), self._transposed, out=out)
+        result += self.offsets
+        return result
+
+    def apply_frame(self, df):
+        """Calibrated DataFrame of the ``columns`` of ``df``, same index."""
+        return pd.DataFrame(self.apply(df[self.columns].to_numpy(dtype=float)),
+                            columns=self.analytes, index=df.index)
+
+    def calibrate_run(self, file_path, chunk_size=1 << 20):
+        """Load only the needed columns of a run and calibrate them."""
+        df = load_run(file_path, ['counter', 't[min]'] + self.columns, chunk_size)
+        return pd.concat([df[['counter', 't[min]']], self.apply_frame(df)], axis=1)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Calibrate every sensor block of a run")
+    parser.add_argument("file_path", type=str, help="Run file (text or .pstz archive)")
+    parser.add_argument("--config", type=str, default=None, help="JSON calibration per sensor block")
+    parser.add_argument("--output", type=str, default=None, help="Tab separated output file")
+    args = parser.parse_args()
+
+    calibration = Calibration.from_config(args.config) if args.config else Calibration.default()
+    results = calibration.calibrate_run(args.file_path)
+    if args.output:
+        results.to_csv(args.output, sep="\t", index=False)
+    else:
+        print(results)
@@ -0,0 +1,219 @@
+"""
+Follow a run file while the datalogger is still writing it.
+
+``RunFollower`` remembers the byte offset up to which it parsed, so every
+read only touches the bytes appended since then. A partial last line stays
+unread until its newline arrives. Between reads it sleeps on inotify
+(Linux, through libc with ctypes) and falls back to polling elsewhere.
+
+Both layouts written by the loggers are understood: BioMon files (Created
+line, counter/t[min]/#1ch1... header, Start line) and the Sample/Time/s/
+Ch1/nA... tables. Rows come out as float arrays of sample number, time in
+seconds and channels 1 to 6.
+
+Example
+-------
+    follower = RunFollower('Data_Collected/run.txt')
+    for rows in follower.follow():
+        for sample, seconds, *channels in rows:
+            ...
+
+"""
+
+import ctypes
+import ctypes.util
+import os
+import select
+import time
+
+import numpy as np
+
+from potentiostat.rows import HEADER_FIELDS
+
+FIELDS = ['sample', 'time', 'ch1', 'ch2', 'ch3', 'ch4', 'ch5', 'ch6']
+
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVE_SELF = 0x00000800
+IN_DELETE_SELF = 0x00000400
+IN_NONBLOCK = 0o4000
+
+
+class _Inotify:
+    """Minimal inotify watch on one file; raises OSError where unavailable."""
+    def __init__(self, file_path):
+        name = ctypes.util.find_library('c')
+        if name is None:
+            raise OSError("libc not found")
+        libc = ctypes.CDLL(name, use_errno=True)
+        if not hasattr(libc, 'inotify_init1'):
+            raise OSError("inotify is not available")
+        self.fd = libc.inotify_init1(IN_NONBLOCK)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        mask = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVE_SELF | IN_DELETE_SELF
+        if libc.inotify_add_watch(self.fd, os.fsencode(file_path), mask) < 0:
+            error = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(error, f"inotify_add_watch failed for {file_path}")
+
+    def wait(self, timeout):
+        """Block until the file changes or ``timeout`` seconds pass."""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return False
+        try:
+            while os.read(self.fd, 4096):
+                pass
+        except BlockingIOError:
+            pass
+        return True
+
+    def close(self):
+        os.close(self.fd)
+
+
+class RunFollower:
+    """
+    Incremental reader of a growing run file.
+
+    Parameters
+    ----------
+    file_path : string
+    poll_interval : float, optional
+        Seconds between checks without inotify, and the longest wait with
+        it. The default is 0.5.
+    use_inotify : bool, optional
+        The default is True; polling is used if inotify is not available.
+    max_read : int, optional
+        Most bytes parsed per call, so catching up on a long file happens
+        in bounded steps. The default is 4 MiB.
+
+    """
+    def __init__(self, file_path, poll_interval=0.5, use_inotify=True, max_read=1 << 22):
+        self.file_path = file_path
+        self.max_read = max_read
+        self.poll_interval = poll_interval
+        self.use_inotify = use_inotify
+        self.offset = 0
+        self.finished = False
+        self.rows_read = 0
+        self._usecols = None
+        self._time_scale = 1.0
+        self._watch = None
+
+    def _read_header(self, data):
+        """Parse the header out of ``data``; returns the bytes consumed or None."""
+        lines = data.split(b"\n")
+        if len(lines) < 2:
+            return None
+        first = lines[0].decode('latin-1').rstrip("\r").split("\t")
+        if first[0] == "Sample" or first[0] == "Time/s":
+            names, consumed = first, len(lines[0]) + 1
+        else:
+            if len(lines) < 4:
+                return None
+            names = lines[1].decode('latin-1').rstrip("\r").split("\t")
+            consumed = sum(len(line) + 1 for line in lines[:3])
+        fields = [HEADER_FIELDS.get(name) for name in names]
+        missing = [field for field in FIELDS[1:] if field not in fields]
+        if missing:
+            raise ValueError(f"{self.file_path} has no columns for {missing}")
+        # The time only tables have no sample column; the row number stands in
+        self._usecols = [fields.index(field) if field in fields else None for field in FIELDS]
+        self._time_scale = 60.0 if "t[min]" in names else 1.0
+        return consumed
+
+    def _parse(self, lines):
+        # Blank lines (such as the one after the template header) are skipped,
+        # the first other non numeric row is the footer
+        rows = []
+        for line in lines:
+            if not line.strip():
+                continue
+            counter = line.split(b"\t", 1)[0].strip()
+            if not counter.replace(b".", b"", 1).isdigit():
+                self.finished = True
+                break
+            rows.append(line.decode('latin-1'))
+        out = np.empty((len(rows), len(FIELDS)))
+        if not rows:
+            return out
+        present = [column for column, index in enumerate(self._usecols) if index is not None]
+        out[:, present] = np.loadtxt(rows, delimiter="\t", ndmin=2,
+                                     usecols=[self._usecols[column] for column in present])
+        if self._usecols[0] is None:
+            out[:, 0] = np.arange(self.rows_read + 1, self.rows_read + len(rows) + 1)
+        out[:, 1] *= self._time_scale
+        self.rows_read += len(rows)
+        return out
+
+    def read_new(self):
+        """
+        Rows appended since the last call, as a (rows, 8) float array of
+        sample number, time in seconds and channels 1 to 6.
+        """
+        try:
+            size = os.path.getsize(self.file_path)
+        except FileNotFoundError:
+            return np.zeros((0, len(FIELDS)))
+        if size < self.offset:
+            # Truncated or replaced: start again from the top
+            self.close()
+            self.offset = 0
+            self.rows_read = 0
+            self._usecols = None
+            self.finished = False
+        if size == self.offset or self.finished:
+            return np.zeros((0, len(FIELDS)))
+        with open(self.file_path, 'rb') as file:
+            file.seek(self.offset)
+            data = file.read(min(size - self.offset, self.max_read))
+        if self._usecols is None:
+            consumed = self._read_header(data)
+            if consumed is None:
+                return np.zeros((0, len(FIELDS)))
+            self.offset += consumed
+            data = data[consumed:]
+        end = data.rfind(b"\n") + 1
+        if end == 0:
+            return np.zeros((0, len(FIELDS)))
+        self.offset += end
+        return self._parse(data[:end].splitlines())
+
+    def wait(self, timeout=None):
+        """Sleep until the file may have grown."""
+        timeout = self.poll_interval if timeout is None else timeout
+        if self._watch is None and self.use_inotify and os.path.exists(self.file_path):
+            try:
+                self._watch = _Inotify(self.file_path)
+            except (OSError, AttributeError):
+                self.use_inotify = False
+        if self._watch is not None:
+            self._watch.wait(timeout)
+        else:
+            time.sleep(timeout)
+
+    def follow(self, stop=None, idle_timeout=None):
+        """
+        Yield arrays of new rows until the footer is reached, ``stop()``
+        returns True or nothing arrived for ``idle_timeout`` seconds.
+        """
+        last_data = time.monotonic()
+        try:
+            while not self.finished and not (stop is not None and stop()):
+                rows = self.read_new()
+                if len(rows):
+                    last_data = time.monotonic()
+                    yield rows
+                    continue
+                if idle_timeout is not None and time.monotonic() - last_data > idle_timeout:
+                    return
+                self.wait()
+        finally:
+            self.close()
+
+    def close(self):
+        if self._watch is not None:
+            self._watch.close()
+            self._watch = None
@@ -0,0 +1,71 @@
+"""
+Preallocated ring buffer for the live analysis.
+
+The live mode used to build a one row DataFrame per sample in
+``organize_data`` and two more in ``calibrate_data``. ``LiveBuffer`` keeps
+the raw channels, the calibrated analytes and the sample numbers in fixed
+NumPy arrays instead; each sample is written into the next row in place.
+
+"""
+
+import numpy as np
+
+from analysis.calibration import ANALYTES, calibrate
+
+
+class LiveBuffer:
+    """
+    Ring of the most recent samples.
+
+    Parameters
+    ----------
+    capacity : int, optional
+        Samples kept. The default is 4096 (about seven minutes at 10
+        samples per second).
+    channels : int, optional
+        Raw channels per sample. The default is 6.
+    analytes : int, optional
+        The default is 4.
+    calibration : Calibration, optional
+        Matrix calibration to use instead of the block #1 rules; the ring
+        then holds its ``columns`` and ``analytes``.
+
+    """
+    def __init__(self, capacity=4096, channels=6, analytes=len(ANALYTES), calibration=None):
+        if calibration is not None:
+            channels, analytes = len(calibration.columns), len(calibration.analytes)
+        self.calibration = calibration
+        self.capacity = capacity
+        self.raw = np.full((capacity, channels), np.nan)
+        self.analytes = np.full((capacity, analytes), np.nan)
+        self.indices = np.zeros(capacity, dtype=np.int64)
+        self.count = 0
+
+    def __len__(self):
+        return min(self.count, self.capacity)
+
+    def append(self, index, channels):
+        """
+        Store one sample and calibrate it in place.
+
+        Returns a view of the calibrated row; it is overwritten once the
+        ring wraps around.
+        """
+        row = self.count % self.capacity
+        self.raw[row] = channels
+        self.indices[row] = index
+        if self.calibration is not None:
+            self.calibration.apply(self.raw[row], out=self.analytes[row])
+        else:
+            calibrate(self.raw[row], out=self.analytes[row])
+        self.count += 1
+        return self.analytes[row]
+
+    def _order(self, count):
+        count = min(count, len(self))
+        return np.arange(self.count - count, self.count) % self.capacity
+
+    def latest(self, count=None):
+        """Copies of the last ``count`` sample numbers, raw rows and analyte rows, oldest first."""
+        order = self._order(len(self) if count is None else count)
+        return self.indices[order], self.raw[order], self.analytes[order]
@@ -0,0 +1,146 @@
+"""
+Chunked loader for BioMon style run files.
+
+The files written by the dataloggers and by BioMon look like
+example_format.txt: a Created line, the column header, a Start line, one
+tab separated row per sample and possibly a footer of comments. The
+analysis only uses a handful of the 387 columns, so ``load_run`` parses
+just those columns straight into float arrays, a chunk of lines at a
+time, and stops at the first row whose counter is not a number. The
+parsed columns are kept in the run cache (see analysis.cache), so opening
+the same unchanged run again skips the parsing.
+
+"""
+
+import numpy as np
+import pandas as pd
+
+from analysis.cache import default_cache
+from potentiostat.archive import open_run
+
+# Sensor block #1 as used by DataProcessor: counter, time and ch1 to ch7
+DEFAULT_COLUMNS = ['counter', 't[min]'] + [f'#1ch{channel}' for channel in range(1, 8)]
+# Data rows start after the Created, header and Start lines
+FIRST_DATA_LINE = 3
+
+
+def read_header(file):
+    """Read the preamble of an open run and return the column names."""
+    lines = [file.readline() for _ in range(FIRST_DATA_LINE)]
+    if not lines[1]:
+        raise ValueError("Run file has no column header")
+    return lines[1].rstrip("\r\n").split("\t")
+
+
+def column_indices(names, columns):
+    missing = [column for column in columns if column not in names]
+    if missing:
+        raise ValueError(f"Columns not found in the run header: {missing}")
+    return [names.index(column) for column in columns]
+
+
+def parse_lines(lines, indices):
+    """
+    Parse the data rows among ``lines`` into a float array.
+
+    Returns the (rows, len(indices)) array and whether a footer row (a row
+    whose counter is not a number) was reached. Blank lines, such as the
+    one after the header of example_format.txt, are skipped.
+    """
+    lines = [line for line in lines if line.strip()]
+    end = len(lines)
+    # Footers only follow the data, so a numeric last line means no footer here
+    if end and not lines[-1].split("\t", 1)[0].isdigit():
+        end = next(i for i, line in enumerate(lines) if not line.split("\t", 1)[0].isdigit())
+    if end == 0:
+        return np.zeros((0, len(indices))), end < len(lines)
+    values = np.loadtxt(lines[:end], delimiter="\t", usecols=indices, dtype=np.float64, ndmin=2)
+    return values, end < len(lines)
+
+
+def iter_chunks(file_path, columns=DEFAULT_COLUMNS, chunk_size=1 << 20):
+    """
+    Yield float arrays of the selected columns, about ``chunk_size`` bytes
+    of text at a time, until the data rows end.
+    """
+    with open_run(file_path) as file:
+        indices = column_indices(read_header(file), columns)
+        while True:
+            lines = file.readlines(chunk_size)
+            if not lines:
+                return
+            values, footer = parse_lines(lines, indices)
+            if len(values):
+                yield values
+            if footer:
+                return
+
+
+def _parse_run(file_path, columns, chunk_size):
+    chunks = list(iter_chunks(file_path, columns, chunk_size))
+    values = np.concatenate(chunks) if chunks else np.zeros((0, len(columns)))
+    return {column: values[:, i] for i, column in enumerate(columns)}
+
+
+def load_run(file_path, columns=DEFAULT_COLUMNS, chunk_size=1 << 20, cache=None):
+    """
+    Load the data rows of a run into a DataFrame.
+
+    Parameters
+    ----------
+    file_path : string
+        Text run or its ``.pstz`` archive.
+    columns : list of string, optional
+        Header names to load. The default is counter, t[min] and #1ch1 to
+        #1ch7.
+    chunk_size : int, optional
+        Bytes of text parsed at once, which bounds the memory used on top of
+        the result. The default is 1 MiB.
+    cache : RunCache or False, optional
+        Where parsed columns are kept. The default is the shared cache;
+        False always parses the text.
+
+    Returns
+    -------
+    pandas.DataFrame
+        Float columns (the counter as integers) indexed like the old
+        ``load_data`` frame, i.e. starting at 3.
+
+    """
+    columns = list(columns)
+    if cache is False:
+        arrays = _parse_run(file_path, columns, chunk_size)
+    else:
+        arrays = (cache or default_cache()).get(
+            file_path, 'run', lambda wanted: _parse_run(file_path, wanted, chunk_size), columns)
+    rows = len(arrays[columns[0]]) if columns else 0
+    df = pd.DataFrame({column: arrays[column] for column in columns}, columns=columns,
+                      index=pd.RangeIndex(FIRST_DATA_LINE, FIRST_DATA_LINE + rows))
+    if 'counter' in df.columns:
+        df['counter'] = df['counter'].astype(np.int64)
+    return df
+
+
+def _parse_table(file_path, skiprows):
+    try:
+        df = pd.read_csv(file_path, sep='\t', header=None, encoding='ISO-8859-1', skiprows=skiprows)
+    except UnicodeDecodeError:
+        df = pd.read_csv(file_path, sep='\t', header=None, encoding='cp1252', skiprows=skiprows)
+    return {str(column): df[column].to_numpy() for column in df.columns}
+
+
+def load_table(file_path, skiprows=1, cache=None):
+    """
+    Read a whole tab separated table without header names, such as the
+    Sample/Time/s/Ch1/nA... logs, as ``pandas.read_csv`` with
+    ``header=None`` would (columns numbered from 0).
+
+    Tables with text columns are parsed every time, since the cache only
+    holds numeric columns.
+    """
+    if cache is False:
+        arrays = _parse_table(file_path, skiprows)
+    else:
+        arrays = (cache or default_cache()).get(
+            file_path, f'table{skiprows}', lambda wanted: _parse_table(file_path, skiprows))
+    return pd.DataFrame({int(column): values for column, values in arrays.items()})
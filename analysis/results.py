@@ -0,0 +1,105 @@
+"""
+Append friendly store for the analyte results of a run.
+
+``DataProcessor.check_change`` used to grow a DataFrame with ``pd.concat``
+one row at a time, which copies everything gathered so far on every
+append. ``ResultStore`` keeps the results in one NumPy record array that
+doubles its capacity when full, so appending stays constant time however
+long the run gets, and only builds a DataFrame when asked to.
+
+Every record carries the analyte (as a number into ``analytes``), the
+value, the sample index it was taken at and a timestamp (the t[min] of the
+sample, NaN when unknown) and the number of the row of the wide table it
+belongs to; records appended together form one row.
+
+"""
+
+import numpy as np
+import pandas as pd
+
+RESULT_DTYPE = np.dtype([('row', np.int64), ('analyte', np.int16), ('value', np.float64),
+                         ('index', np.int64), ('timestamp', np.float64)])
+
+
+class ResultStore:
+    """
+    Growable columnar table of analyte results.
+
+    Parameters
+    ----------
+    analytes : list of string
+        Names of the analytes, in the order of the values passed to
+        ``append_row``.
+    capacity : int, optional
+        Records allocated up front. The default is 1024.
+
+    """
+    def __init__(self, analytes, capacity=1024):
+        self.analytes = list(analytes)
+        self._records = np.zeros(capacity, dtype=RESULT_DTYPE)
+        self._count = 0
+        self._rows = 0
+        self._last_row = None
+
+    def __len__(self):
+        return self._count
+
+    @property
+    def records(self):
+        """View of the stored records (valid until the next append)."""
+        return self._records[:self._count]
+
+    def _reserve(self, count):
+        if self._count + count > len(self._records):
+            grown = np.zeros(max(2 * len(self._records), self._count + count), dtype=RESULT_DTYPE)
+            grown[:self._count] = self.records
+            self._records = grown
+
+    def append(self, analyte, value, index, timestamp=np.nan):
+        """Add one result of analyte number ``analyte`` as a row of its own."""
+        self._reserve(1)
+        self._records[self._count] = (self._rows, analyte, value, index, timestamp)
+        self._count += 1
+        self._rows += 1
+
+    def append_row(self, values, index, timestamp=np.nan):
+        """
+        Add one value per analyte (NaN values are left out) taken at
+        ``index``.
+
+        Returns False without storing anything when every value is NaN or
+        the values repeat the previous row, as ``check_change`` requires.
+        """
+        values = np.asarray(values, dtype=np.float64)
+        present = np.flatnonzero(~np.isnan(values))
+        if not len(present) or (self._last_row is not None and np.array_equal(values, self._last_row, equal_nan=True)):
+            return False
+        self._reserve(len(present))
+        rows = self._records[self._count:self._count + len(present)]
+        rows['row'] = self._rows
+        rows['analyte'] = present
+        rows['value'] = values[present]
+        rows['index'] = index
+        rows['timestamp'] = timestamp
+        self._count += len(present)
+        self._rows += 1
+        self._last_row = values
+        return True
+
+    def to_frame(self):
+        """Long DataFrame with row, analyte (categorical), value, index and timestamp columns."""
+        records = self.records
+        return pd.DataFrame({
+            'row': records['row'],
+            'analyte': pd.Categorical.from_codes(records['analyte'], categories=self.analytes),
+            'value': records['value'],
+            'index': records['index'],
+            'timestamp': records['timestamp'],
+        })
+
+    def wide(self):
+        """One row per stored row and one column per analyte, like the old output frame."""
+        records = self.records
+        table = np.full((self._rows, len(self.analytes)), np.nan)
+        table[records['row'], records['analyte']] = records['value']
+        return pd.DataFrame(table, columns=self.analytes)
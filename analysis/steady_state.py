@@ -0,0 +1,225 @@
+"""
+Steady state detection for the calibrated analyte traces.
+
+A window of ``WINDOW + 1`` samples is steady when its standard deviation
+is below ``STD_LIMIT``. A steady value is accepted as a new output when it
+is the first one, or when it left the ``thresh`` ratio band around the
+previous output and at least ``SPACING`` samples passed since then. These
+are the rules of ``DataProcessor.analyze_buffer``; jobst_data_reader takes
+its constants from here, so the live and the offline detection agree.
+
+"""
+
+import numpy as np
+
+WINDOW = 25  # the window global of jobst_data_reader; windows hold WINDOW + 1 samples
+STD_LIMIT = 0.006  # Don't go much lower than this as it will not work
+SPACING = 200
+# Lower and upper ratio to the previous output for glutamate, glutamine, glucose, lactate
+THRESH = [[0.2, 100], [0.2, 50], [0.2, 100], [0.2, 100]]
+
+
+def accept(outputs, indices, value, index, thresh, spacing=SPACING):
+    """Whether ``value`` at ``index`` becomes the next output of one analyte."""
+    if not outputs:
+        return True
+    return (not (outputs[-1] * thresh[0] <= value <= outputs[-1] * thresh[1])
+            and index - indices[-1] >= spacing)
+
+
+class StreamingSteadyState:
+    """
+    Constant time steady state detector for the live mode.
+
+    Keeps the last ``window`` values of every analyte in a ring together
+    with their running mean and sum of squared deviations (Welford's update
+    for a sliding window), so each sample costs a few array operations
+    regardless of the window length. The window is rechecked on every
+    sample once it is full.
+
+    Parameters
+    ----------
+    analytes : int, optional
+        Number of traces. The default is 4.
+    window : int, optional
+        Samples per window. The default is ``WINDOW + 1``, the rows
+        create_buffer tests at once.
+    std_limit : float, optional
+        The default is ``STD_LIMIT``.
+    thresh : list, optional
+        Ratio band per analyte. The default is ``THRESH``.
+    spacing : int, optional
+        The default is ``SPACING``.
+    outputs, indices : list of lists, optional
+        Lists the accepted values and their sample numbers are appended
+        to, one per analyte. New lists are made if omitted.
+
+    """
+    # Recompute the sums from the ring now and then to stop rounding drift
+    RESYNC_EVERY = 4096
+
+    def __init__(self, analytes=4, window=WINDOW + 1, std_limit=STD_LIMIT, thresh=THRESH, spacing=SPACING,
+                 outputs=None, indices=None):
+        self.window = window
+        self.std_limit = std_limit
+        self.thresh = thresh
+        self.spacing = spacing
+        self.outputs = outputs if outputs is not None else [[] for _ in range(analytes)]
+        self.indices = indices if indices is not None else [[] for _ in range(analytes)]
+        self._ring = np.zeros((window, analytes))
+        self._mean = np.zeros(analytes)
+        self._m2 = np.zeros(analytes)
+        self._count = 0
+        self._position = 0
+        self._updates = 0
+
+    @property
+    def std(self):
+        if self._count == 0:
+            return np.full(len(self._mean), np.nan)
+        return np.sqrt(np.maximum(self._m2, 0) / self._count)
+
+    @property
+    def mean(self):
+        return self._mean.copy()
+
+    def _resync(self):
+        values = self._ring[:self._count]
+        self._mean = values.mean(axis=0)
+        self._m2 = ((values - self._mean) ** 2).sum(axis=0)
+
+    def update(self, index, values):
+        """
+        Add one calibrated sample and test the window.
+
+        Returns the list of analyte numbers whose output was accepted.
+        """
+        x = np.asarray(values, dtype=np.float64)
+        if self._count < self.window:
+            # Growing window: plain Welford
+            self._count += 1
+            delta = x - self._mean
+            self._mean += delta / self._count
+            self._m2 += delta * (x - self._mean)
+        else:
+            old = self._ring[self._position]
+            mean = self._mean + (x - old) / self.window
+            self._m2 += (x - old) * (x - mean + old - self._mean)
+            self._mean = mean
+        self._ring[self._position] = x
+        self._position = (self._position + 1) % self.window
+        self._updates += 1
+        if self._updates % self.RESYNC_EVERY == 0:
+            self._resync()
+
+        if self._count < self.window:
+            return []
+        accepted = []
+        steady = self._m2 < (self.std_limit ** 2) * self.window
+        for i in np.flatnonzero(steady):
+            value = int(abs(x[i]) * 1000) / 1000
+            if accept(self.outputs[i], self.indices[i], value, index, self.thresh[i], self.spacing):
+                self.outputs[i].append(value)
+                self.indices[i].append(index)
+                accepted.append(int(i))
+        return accepted
+
+
+def window_std(values, ends, length, chunk=16384):
+    """
+    Population standard deviation of the ``length`` rows ending at each of
+    ``ends`` (positions, inclusive), for every column of ``values``.
+    Windows that would start before the first row use the rows available.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    ends = np.asarray(ends, dtype=np.int64)
+    out = np.empty((len(ends), values.shape[1]))
+    short = ends < length - 1
+    for i in np.flatnonzero(short):
+        out[i] = values[:ends[i] + 1].std(axis=0)
+    full = np.flatnonzero(~short)
+    if len(full) and len(values) >= length:
+        # (rows - length + 1, columns, length) view, nothing is copied here
+        windows = np.lib.stride_tricks.sliding_window_view(values, length, axis=0)
+        for first in range(0, len(full), chunk):
+            part = full[first:first + chunk]
+            out[part] = windows[ends[part] - length + 1].std(axis=-1)
+    return out
+
+
+def offline_steady_state(values, labels, window=WINDOW, stride=None, buffered=0, std_limit=STD_LIMIT,
+                         thresh=THRESH, spacing=SPACING, outputs=None, indices=None):
+    """
+    Steady state outputs of a whole run in one vectorised pass.
+
+    With the defaults this reproduces ``DataProcessor.create_buffer``: a
+    window of ``window + 1`` rows is tested after every ``window + 1`` rows.
+    The standard deviations of all windows and analytes are computed at
+    once, steady candidates are picked with a boolean mask and the ratio and
+    spacing rules only step from one accepted output to the next.
+
+    Parameters
+    ----------
+    values : numpy.ndarray
+        (rows, analytes) calibrated traces.
+    labels : numpy.ndarray
+        Index label of every row; these are the stored indices.
+    window : int, optional
+        The default is ``WINDOW``.
+    stride : int, optional
+        Rows between tests. The default is ``window + 1``; 1 tests a
+        rolling window at every row.
+    buffered : int, optional
+        Rows already counted towards the next test (``DataProcessor.buffer``).
+    outputs, indices : list of lists, optional
+        Lists to append the accepted values and labels to.
+
+    Returns
+    -------
+    outputs, indices : list of lists
+    buffered : int
+        Rows counted towards the next test after the last row.
+
+    """
+    values = np.asarray(values, dtype=np.float64)
+    labels = np.asarray(labels)
+    rows, analytes = values.shape
+    length = window + 1
+    stride = length if stride is None else stride
+    if outputs is None:
+        outputs = [[] for _ in range(analytes)]
+    if indices is None:
+        indices = [[] for _ in range(analytes)]
+
+    ends = np.arange(max(0, window - buffered), rows, stride)
+    buffered = (buffered + rows) if not len(ends) else rows - 1 - ends[-1]
+    if not len(ends):
+        return outputs, indices, buffered
+    steady = window_std(values, ends, length) < std_limit
+
+    for i in range(analytes):
+        positions = ends[steady[:, i]]
+        if not len(positions):
+            continue
+        candidates = np.trunc(np.abs(values[positions, i]) * 1000) / 1000
+        candidate_labels = labels[positions]
+        start = 0
+        if not outputs[i]:
+            outputs[i].append(float(candidates[0]))
+            indices[i].append(int(candidate_labels[0]))
+            start = 1
+        while start < len(candidates):
+            # Skip ahead to the first candidate far enough from the last output
+            start = max(start, int(np.searchsorted(candidate_labels, indices[i][-1] + spacing)))
+            rest = candidates[start:]
+            if not len(rest):
+                break
+            low, high = outputs[i][-1] * thresh[i][0], outputs[i][-1] * thresh[i][1]
+            outside = np.flatnonzero(~((low <= rest) & (rest <= high)))
+            if not len(outside):
+                break
+            start += int(outside[0])
+            outputs[i].append(float(candidates[start]))
+            indices[i].append(int(candidate_labels[start]))
+            start += 1
+    return outputs, indices, buffered
@@ -0,0 +1,269 @@
+"""
+Which AMUZA well every sensor sample came from.
+
+``VisitLog`` collects what the AMUZA did: the sequences sent with
+``AmuzaConnection.Move`` and the ``@q`` status replies handled in
+``handleRecieved`` (state, method number, well, time left). Status replies
+are recorded on transitions only; a change of method or well starts a new
+visit and method 0 means the needle is resting. Without any status replies
+(the reception thread is off unless the console output is on) the visits
+are planned from the Move sequences and the method times instead.
+
+``WellMap`` holds the visits as sorted start and end arrays, so labelling
+any number of samples is one ``numpy.searchsorted`` and the per well table
+one group by, whether for a finished run or sample by sample in live mode.
+Times are seconds on the clock the log was kept with: ``time.time`` (as
+in ``from_log``) to match the Start line of a run, or ``time.monotonic``
+(as ``AmuzaConnection`` keeps it) to match the ``timestamp_ns`` of live
+samples.
+
+Example
+-------
+    visits = VisitLog.from_log('AMUZA-2024-09-02_12-26-00.log')
+    times = run_start('Data_Collected/run.txt') + df['t[min]'].to_numpy() * 60
+    table = visits.wells().aggregate(times, processor.results)
+
+    # Live: AmuzaConnection keeps a VisitLog on time.monotonic, so per sample
+    well = connection.visits.well_at(sample.timestamp_ns / 1e9)
+
+"""
+
+import re
+import time
+from collections import namedtuple
+from datetime import datetime
+from itertools import groupby
+
+import numpy as np
+import pandas as pd
+
+from potentiostat.archive import open_run
+
+WELL_ROWS = "ABCDEFGH"
+
+# kind is 'move' (one planned visit per port) or 'status' (a transition)
+Event = namedtuple('Event', ['time', 'kind', 'well', 'method', 'seconds'])
+
+LOG_LINE = re.compile(r"^(\d{4}-\d\d-\d\d \d\d:\d\d:\d\d,\d{3}) \w+: (Status Update|Move): (.*)$")
+
+
+def well_name(number):
+    """'A1' for 1, 'B1' for 2, ... the inverse of ``AmuzaConnection.well_mapping``."""
+    column, row = divmod(int(number) - 1, len(WELL_ROWS))
+    return f"{WELL_ROWS[row]}{column + 1}"
+
+
+def parse_sequence(text):
+    """(ports, seconds) of every method in the text of a ``Sequence``."""
+    fields = [field for field in text.strip().split(',') if field]
+    methods = []
+    for position, field in enumerate(fields):
+        if re.fullmatch(r"M\d+", field):
+            seconds = int(fields[position + 1])
+            ports = []
+            for port in fields[position + 2:]:
+                if port.startswith("M"):
+                    break
+                ports.append(int(port))
+            methods.append((ports, seconds))
+    return methods
+
+
+def parse_status(text):
+    """(state, method, well) of an ``@q`` reply."""
+    data = text.strip()[3:].split(',')
+    return int(data[0]), int(data[1]), int(data[2]) if len(data) > 2 and data[2].strip() else 0
+
+
+def run_start(file_path):
+    """Epoch seconds of the Start line of a BioMon run (local time)."""
+    with open_run(file_path) as file:
+        for _ in range(3):
+            line = file.readline()
+            if line.startswith("Start:"):
+                stamp = " ".join(line[len("Start:"):].split())
+                return datetime.strptime(stamp, "%m/%d/%Y %I:%M:%S %p").timestamp()
+    raise ValueError(f"{file_path} has no Start line")
+
+
+class WellMap:
+    """
+    Sorted, non-overlapping well visits.
+
+    Parameters
+    ----------
+    starts, ends : numpy.ndarray
+        Start and end time of every visit, sorted by start; an open visit
+        ends at infinity.
+    wells : numpy.ndarray
+        Well number (``well_mapping`` numbering) of every visit.
+
+    """
+    def __init__(self, starts, ends, wells):
+        self.starts = np.asarray(starts, dtype=np.float64)
+        self.ends = np.asarray(ends, dtype=np.float64)
+        self.wells = np.asarray(wells, dtype=np.int64)
+
+    def __len__(self):
+        return len(self.starts)
+
+    def visit_of(self, times):
+        """Visit number of every time, -1 outside all visits."""
+        times = np.asarray(times, dtype=np.float64)
+        visit = np.searchsorted(self.starts, times, side='right') - 1
+        inside = visit >= 0
+        inside[inside] = times[inside] < self.ends[visit[inside]]
+        return np.where(inside, visit, -1)
+
+    def assign(self, times):
+        """Well number of every time, 0 outside all visits."""
+        visit = self.visit_of(times)
+        return np.where(visit >= 0, self.wells[np.maximum(visit, 0)], 0)
+
+    def well_at(self, timestamp):
+        """Well number at one time, 0 if none."""
+        return int(self.assign([timestamp])[0])
+
+    def aggregate(self, times, values):
+        """
+        Per well table of the samples taken during its visits.
+
+        Parameters
+        ----------
+        times : numpy.ndarray
+            Time of every sample.
+        values : pandas.DataFrame
+            One row per sample (for example the calibrated analytes).
+
+        Returns
+        -------
+        pandas.DataFrame
+            Indexed by well name with the number of visits and samples, the
+            first and last sample time and the mean, std, min and max of
+            every column of ``values``; samples outside visits are left out.
+
+        """
+        visit = self.visit_of(times)
+        inside = visit >= 0
+        frame = values.reset_index(drop=True)[inside]
+        keys = self.wells[visit[inside]]
+        grouped = frame.groupby(keys, sort=True)
+        table = grouped.agg(['mean', 'std', 'min', 'max'])
+        table.columns = [f"{column} {statistic}" for column, statistic in table.columns]
+        sample_times = pd.Series(np.asarray(times, dtype=np.float64)[inside]).groupby(keys, sort=True)
+        table.insert(0, 'visits', pd.Series(visit[inside]).groupby(keys, sort=True).nunique())
+        table.insert(1, 'samples', grouped.size())
+        table.insert(2, 'first', sample_times.min())
+        table.insert(3, 'last', sample_times.max())
+        table.index = [well_name(well) for well in table.index]
+        table.index.name = 'well'
+        return table
+
+
+class VisitLog:
+    """
+    Move and status events of one AMUZA session.
+
+    Parameters
+    ----------
+    clock : callable, optional
+        Time source in seconds for the events. The default is
+        ``time.time``; use ``time.monotonic`` to line up with live samples.
+
+    """
+    def __init__(self, clock=time.time):
+        self.clock = clock
+        self.events = []
+        self._status = None
+        self._move = None
+        self._map = None
+
+    def move(self, sequence, timestamp=None):
+        """
+        Record a sequence sent with ``Move`` (a ``Sequence`` or its text).
+
+        Returns False without recording anything when the same sequence is
+        sent again before its planned visits are over, so a resent command
+        does not restart the plan; True otherwise.
+        """
+        timestamp = self.clock() if timestamp is None else timestamp
+        methods = parse_sequence(str(sequence))
+        if self._move is not None and self._move[0] == methods and timestamp < self._move[1]:
+            return False
+        self._move = (methods, timestamp + sum(len(ports) * seconds for ports, seconds in methods))
+        for ports, seconds in methods:
+            for port in ports:
+                self.events.append(Event(timestamp, 'move', port, None, seconds))
+        self._map = None
+        return True
+
+    def status(self, reply, timestamp=None):
+        """Record an ``@q`` reply if the method or the well changed."""
+        _, method, well = parse_status(reply)
+        if method == 0:
+            well = 0
+        if (method, well) == self._status:
+            return
+        self._status = (method, well)
+        timestamp = self.clock() if timestamp is None else timestamp
+        self.events.append(Event(timestamp, 'status', well, method, None))
+        self._map = None
+
+    @classmethod
+    def from_log(cls, file_path):
+        """Events from an AMUZA-*.log file written by ``AmuzaConnection``."""
+        visits = cls()
+        with open(file_path, 'r') as file:
+            for line in file:
+                match = LOG_LINE.match(line.rstrip("\n"))
+                if not match:
+                    continue
+                moment = datetime.strptime(match.group(1), "%Y-%m-%d %H:%M:%S,%f").timestamp()
+                if match.group(2) == "Move":
+                    visits.move(match.group(3), moment)
+                else:
+                    visits.status(match.group(3), moment)
+        return visits
+
+    def _status_visits(self, events):
+        starts, ends, wells = [], [], []
+        for event in events:
+            if wells and ends[-1] == np.inf:
+                ends[-1] = event.time
+            if event.method:
+                starts.append(event.time)
+                ends.append(np.inf)
+                wells.append(event.well)
+        return starts, ends, wells
+
+    def _planned_visits(self, events):
+        # The ports of one Move one after the other; a later Move cuts the plan short
+        starts, ends, wells = [], [], []
+        for sent, group in groupby(events, key=lambda event: event.time):
+            while starts and starts[-1] >= sent:
+                del starts[-1], ends[-1], wells[-1]
+            if ends and ends[-1] > sent:
+                ends[-1] = sent
+            start = sent
+            for event in group:
+                starts.append(start)
+                ends.append(start + event.seconds)
+                wells.append(event.well)
+                start += event.seconds
+        return starts, ends, wells
+
+    def wells(self):
+        """The visits as a ``WellMap`` (rebuilt only after new events)."""
+        if self._map is None:
+            status = [event for event in self.events if event.kind == 'status']
+            if status:
+                starts, ends, wells = self._status_visits(sorted(status, key=lambda event: event.time))
+            else:
+                moves = [event for event in self.events if event.kind == 'move']
+                starts, ends, wells = self._planned_visits(sorted(moves, key=lambda event: event.time))
+            self._map = WellMap(starts, ends, wells)
+        return self._map
+
+    def well_at(self, timestamp):
+        """Well being sampled at ``timestamp`` (live mode), 0 if none."""
+        return self.wells().well_at(timestamp)
@@ -0,0 +1,99 @@
+"""
+Benchmark of the DataProcessor stages on synthetic runs.
+
+Runs of 10k, 100k and 1M samples (``--quick``: 10k and 100k) are written
+with ``benchmarks.synthetic`` and every stage of jobst_data_reader is
+timed on them: ``load_data`` with an empty and with a warm run cache,
+``calibrate_data``, ``create_buffer``, the per window ``analyze_buffer``
+path and the live path (``process_live`` sample by sample). Throughput is
+in samples per second and the memory column is the peak of one traced
+call. The two sample by sample paths are timed on at most ``LIVE_SAMPLES``
+samples per size. Run from the repository root:
+
+    python -m benchmarks.bench_processor                 # print the table
+    python -m benchmarks.bench_processor --save          # store a baseline
+    python -m benchmarks.bench_processor --compare       # fail on regressions
+
+"""
+
+import os
+import tempfile
+
+from analysis.cache import RunCache, set_default_cache
+from analysis.calibration import CHANNELS
+from benchmarks.harness import time_stage, main_cli
+from benchmarks.synthetic import write_run
+import jobst_data_reader
+from jobst_data_reader import DataProcessor
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE_FILE = os.path.join(REPO_DIR, 'benchmarks', 'baselines', 'processor.json')
+SIZES = {'10k': 10000, '100k': 100000, '1M': 1000000}
+LIVE_SAMPLES = 50000
+
+
+def loaded(file_path):
+    processor = DataProcessor()
+    processor.load_data(file_path)
+    return processor
+
+
+def bench_size(label, file_path, cache, repeat):
+    results = {}
+    processor = loaded(file_path)
+    samples = len(processor.df)
+
+    def cold():
+        cache.clear()
+        return DataProcessor()
+
+    results[f"processor.load_data.cold.{label}"] = time_stage(
+        lambda state: state.load_data(file_path), samples, cold, repeat)
+    results[f"processor.load_data.cached.{label}"] = time_stage(
+        lambda state: state.load_data(file_path), samples, DataProcessor, repeat)
+    results[f"processor.calibrate_data.{label}"] = time_stage(
+        lambda state: state.calibrate_data(state.df), samples, lambda: processor, repeat)
+    results[f"processor.create_buffer.{label}"] = time_stage(
+        lambda state: state.create_buffer(), samples, lambda: loaded(file_path), repeat)
+
+    # The old create_buffer: analyze_buffer on every window + 1 rows
+    window = jobst_data_reader.window
+    ends = processor.results.index[window:LIVE_SAMPLES:window + 1]
+
+    def windows(state):
+        for index in ends:
+            state.buffer = window + 1
+            state.analyze_buffer(index)
+
+    results[f"processor.analyze_buffer.{label}"] = time_stage(
+        windows, len(ends) * (window + 1), lambda: loaded(file_path), repeat)
+
+    rows = processor.df[['counter'] + CHANNELS[:6]].to_numpy()[:LIVE_SAMPLES]
+    counters = rows[:, 0].astype(int).tolist()
+    channels = list(rows[:, 1:])
+
+    def live(state):
+        for index, values in zip(counters, channels):
+            state.process_live(index, values)
+
+    results[f"processor.process_live.{label}"] = time_stage(live, len(rows), DataProcessor, repeat)
+    return results
+
+
+def run(quick=False):
+    sizes = {label: samples for label, samples in SIZES.items() if not (quick and samples > 100000)}
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        cache = RunCache(os.path.join(directory, 'cache'))
+        previous = set_default_cache(cache)
+        try:
+            for label, samples in sizes.items():
+                file_path = write_run(os.path.join(directory, f"run_{label}.txt"), samples)
+                results.update(bench_size(label, file_path, cache, repeat=1 if samples > 100000 else 3))
+        finally:
+            set_default_cache(previous)
+    return results
+
+
+if __name__ == "__main__":
+    main_cli("Benchmark the DataProcessor stages on synthetic runs", run, BASELINE_FILE)
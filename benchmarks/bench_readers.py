@@ -0,0 +1,157 @@
+"""
+Benchmark of the serial decode and logging hot path of every
+PotentiostatReader variant.
+
+Uses synthetic frames from the emulator's waveform and an in-memory serial
+port, so no hardware is needed. Run from the repository root:
+
+    python -m benchmarks.bench_readers                 # print the table
+    python -m benchmarks.bench_readers --save          # store a baseline
+    python -m benchmarks.bench_readers --compare       # fail on regressions
+
+"""
+
+import contextlib
+import importlib
+import os
+import tempfile
+
+from benchmarks.harness import time_calls, main_cli
+from potentiostat.emulator import Waveform
+from potentiostat.framing import encode_frame, FrameSynchronizer, decode_frame
+
+VARIANTS = ['SIX_SERVER_READER', 'SIX_SERVER_READER_2', 'SIX_SERVER_READER_3', 'jobst_data_server']
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TEMPLATE_FILE = os.path.join(REPO_DIR, 'example_format.txt')
+BASELINE_FILE = os.path.join(REPO_DIR, 'benchmarks', 'baselines', 'readers.json')
+
+
+class MemorySerial:
+    """
+    Stand-in for serial.Serial that serves bytes from memory.
+
+    ``max_waiting`` caps ``in_waiting`` to mimic a FIFO that only holds a
+    few frames per read.
+    """
+    def __init__(self, data, max_waiting=None):
+        self._data = memoryview(bytes(data))
+        self._pos = 0
+        self.max_waiting = max_waiting
+
+    @property
+    def in_waiting(self):
+        waiting = len(self._data) - self._pos
+        if self.max_waiting is not None:
+            waiting = min(waiting, self.max_waiting)
+        return waiting
+
+    def read(self, size=1):
+        chunk = bytes(self._data[self._pos:self._pos + size])
+        self._pos += len(chunk)
+        return chunk
+
+    def close(self):
+        pass
+
+
+def synthetic_frames(count, seed=1):
+    waveform = Waveform(seed=seed)
+    return [encode_frame(waveform.words(i * 0.1)) for i in range(count)]
+
+
+def shift_register(frame):
+    # Layout of PotentiostatReader.data_block: newest byte first
+    return [bytes([b]) for b in reversed(frame)]
+
+
+def make_reader(module, directory, name):
+    output_filename = os.path.join(directory, f"{name}.txt")
+    kwargs = {'output_filename': output_filename}
+    if module.__name__ == 'SIX_SERVER_READER_3':
+        kwargs['template_file'] = TEMPLATE_FILE
+    return module.PotentiostatReader('bench', **kwargs)
+
+
+def bench_variant(name, frames, directory):
+    module = importlib.import_module(name)
+    results = {}
+    reader = make_reader(module, directory, name)
+    blocks = [(shift_register(frame),) for frame in frames]
+    words = [(decode_frame(frame),) for frame in frames]
+
+    def validate(block):
+        reader.data_block = block
+        return reader.validate_data_block()
+
+    def process(block):
+        reader.data_block = block
+        return reader.process_data_block()
+
+    results[f"{name}.validate_data_block"] = time_calls(validate, blocks)
+    results[f"{name}.process_data_block"] = time_calls(process, blocks)
+    results[f"{name}.convert_data"] = time_calls(reader.convert_data, words)
+
+    # get_data and run read from an in-memory port holding the whole stream;
+    # two passes because time_calls replays the calls for its memory pass
+    stream = b"".join(frames) * 2
+    no_args = [()] * len(frames)
+    reader = make_reader(module, directory, name)
+    reader.serial_connection = MemorySerial(stream)
+    results[f"{name}.get_data"] = time_calls(reader.get_data, no_args)
+
+    reader = make_reader(module, directory, name)
+    reader.serial_connection = MemorySerial(stream)
+    if hasattr(reader, 'line_one'):
+        reader.line_one()
+    results[f"{name}.run"] = time_calls(reader.run, no_args)
+    reader.close_sink()
+
+    # run_batch handles a whole read; report it per frame like the framer
+    frames_per_read = 4
+    reader = make_reader(module, directory, name)
+    reader.serial_connection = MemorySerial(stream, max_waiting=frames_per_read * len(frames[0]))
+    if hasattr(reader, 'line_one'):
+        reader.line_one()
+    result = time_calls(reader.run_batch, no_args[:len(frames) // frames_per_read])
+    results[f"{name}.run_batch"] = per_frame(result, frames_per_read)
+    reader.close_sink()
+    return results
+
+
+def per_frame(result, frames_per_call):
+    result['per_second'] *= frames_per_call
+    for key in ('p50_us', 'p90_us', 'p99_us', 'alloc_bytes', 'alloc_blocks'):
+        result[key] /= frames_per_call
+    return result
+
+
+def bench_framer(frames, frames_per_chunk=4):
+    # Feed the stream a few frames at a time, like a busy serial FIFO
+    stream = b"".join(frames)
+    chunk = frames_per_chunk * len(frames[0])
+    chunks = [(stream[i:i + chunk],) for i in range(0, len(stream), chunk)]
+    framer = FrameSynchronizer()
+
+    def feed(data):
+        framer.feed(data)
+        return framer.frames()
+
+    # Report per frame rather than per chunk
+    result = per_frame(time_calls(feed, chunks), frames_per_chunk)
+    return {'framing.FrameSynchronizer': result}
+
+
+def run(quick=False):
+    frames = synthetic_frames(2000 if quick else 20000)
+    results = {}
+    results.update(bench_framer(frames))
+    with tempfile.TemporaryDirectory() as directory:
+        # Some variants print every sample
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            for name in VARIANTS:
+                results.update(bench_variant(name, frames, directory))
+    return results
+
+
+if __name__ == "__main__":
+    main_cli("Benchmark the PotentiostatReader hot path", run, BASELINE_FILE)
@@ -0,0 +1,176 @@
+"""
+Small timing harness shared by the benchmark scripts.
+
+Results are plain dicts so they can be printed as a table and stored as a
+JSON baseline; ``compare`` flags stages that got slower than the baseline
+by more than a tolerance.
+
+"""
+
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def time_calls(func, args_list, alloc_sample=200):
+    """
+    Call ``func(*args)`` for every entry of ``args_list`` and time each call.
+
+    Returns calls per second, latency percentiles in microseconds and the
+    memory cost per call. ``alloc_bytes`` is the average peak of traced
+    memory during one call and ``alloc_blocks`` the average number of
+    memory blocks left allocated afterwards, both measured in a separate
+    pass over the first ``alloc_sample`` calls because tracing slows the
+    interpreter down.
+    """
+    latencies = []
+    perf = time.perf_counter_ns
+    for args in args_list:
+        start = perf()
+        func(*args)
+        latencies.append(perf() - start)
+    total = sum(latencies)
+    latencies.sort()
+
+    sample = args_list[:alloc_sample]
+    peak_total = 0
+    blocks_before = sys.getallocatedblocks()
+    tracemalloc.start()
+    for args in sample:
+        tracemalloc.reset_peak()
+        base = tracemalloc.get_traced_memory()[0]
+        func(*args)
+        peak_total += tracemalloc.get_traced_memory()[1] - base
+    tracemalloc.stop()
+    blocks_after = sys.getallocatedblocks()
+
+    count = len(latencies)
+    return {
+        'calls': count,
+        'per_second': count / (total / 1e9) if total else 0.0,
+        'p50_us': percentile(latencies, 0.50) / 1e3,
+        'p90_us': percentile(latencies, 0.90) / 1e3,
+        'p99_us': percentile(latencies, 0.99) / 1e3,
+        'alloc_bytes': peak_total / len(sample) if sample else 0.0,
+        'alloc_blocks': (blocks_after - blocks_before) / len(sample) if sample else 0.0,
+    }
+
+
+def time_stage(func, units, setup=None, repeat=3):
+    """
+    Time a whole stage that processes ``units`` items (samples) at once.
+
+    ``setup()`` runs untimed before every call and its return value is
+    passed to ``func``. The result has the keys of ``time_calls`` so it
+    prints and compares the same way: ``per_second`` is units per second
+    of the fastest repeat, the latencies are per unit (p50 the median and
+    p90/p99 the slowest repeat), and ``alloc_bytes`` is the peak of traced
+    memory during one extra, traced call.
+    """
+    perf = time.perf_counter_ns
+    durations = []
+    for _ in range(repeat):
+        state = setup() if setup is not None else None
+        start = perf()
+        func(state)
+        durations.append(perf() - start)
+    durations.sort()
+
+    state = setup() if setup is not None else None
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    func(state)
+    peak = tracemalloc.get_traced_memory()[1] - base
+    tracemalloc.stop()
+
+    per_unit = [duration / max(1, units) / 1e3 for duration in durations]
+    return {
+        'calls': units,
+        'per_second': units / (durations[0] / 1e9) if durations[0] else 0.0,
+        'p50_us': percentile(per_unit, 0.50),
+        'p90_us': per_unit[-1],
+        'p99_us': per_unit[-1],
+        'alloc_bytes': float(peak),
+        'alloc_blocks': 0.0,
+    }
+
+
+def machine_info():
+    return {
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'node': platform.node(),
+    }
+
+
+def print_table(results):
+    print(f"{'stage':<44}{'per sec':>12}{'p50 us':>10}{'p90 us':>10}{'p99 us':>10}{'alloc B':>10}{'blocks':>8}")
+    for name, result in results.items():
+        print(f"{name:<44}{result['per_second']:>12.0f}{result['p50_us']:>10.2f}{result['p90_us']:>10.2f}"
+              f"{result['p99_us']:>10.2f}{result['alloc_bytes']:>10.0f}{result['alloc_blocks']:>8.2f}")
+
+
+def save_baseline(filename, results):
+    directory = os.path.dirname(filename)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(filename, 'w') as file:
+        json.dump({'machine': machine_info(), 'results': results}, file, indent=2, sort_keys=True)
+
+
+def compare(filename, results, tolerance=0.25):
+    """
+    Compare ``results`` against a stored baseline.
+
+    Returns a list of messages for stages whose throughput dropped by more
+    than ``tolerance`` (a fraction) or that are missing from the results.
+    """
+    with open(filename, 'r') as file:
+        baseline = json.load(file)
+    if baseline.get('machine', {}).get('node') != machine_info()['node']:
+        print(f"Warning: baseline {filename} was recorded on {baseline.get('machine', {}).get('node')}")
+    regressions = []
+    for name, old in baseline['results'].items():
+        new = results.get(name)
+        if new is None:
+            regressions.append(f"{name}: missing from this run")
+            continue
+        if new['per_second'] < old['per_second'] * (1 - tolerance):
+            regressions.append(f"{name}: {new['per_second']:.0f}/s vs baseline {old['per_second']:.0f}/s")
+    return regressions
+
+
+def main_cli(description, run, default_baseline):
+    """Common command line for the benchmark scripts."""
+    import argparse
+
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument("--baseline", type=str, default=default_baseline, help="Baseline JSON file")
+    parser.add_argument("--save", action="store_true", help="Store this run as the new baseline")
+    parser.add_argument("--compare", action="store_true", help="Fail if slower than the baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed slowdown as a fraction")
+    parser.add_argument("--quick", action="store_true", help="Smaller workloads for a fast check")
+    args = parser.parse_args()
+
+    results = run(quick=args.quick)
+    print_table(results)
+    if args.save:
+        save_baseline(args.baseline, results)
+        print(f"Baseline saved to {args.baseline}")
+    if args.compare:
+        regressions = compare(args.baseline, results, args.tolerance)
+        for message in regressions:
+            print(f"REGRESSION {message}")
+        if regressions:
+            sys.exit(1)
+        print("No regressions against the baseline.")
@@ -0,0 +1,140 @@
+"""
+Synthetic BioMon runs for the analysis benchmarks.
+
+``synthetic_trace`` builds six channel currents the way a run looks on the
+bench: buffer/standard steps with an exponential sensor response, a slow
+drift per channel, a small ripple, gaussian noise and occasional one
+sample spikes, all quantised to the logger's gain, plus the temperature.
+It is the vectorised counterpart of ``potentiostat.emulator.Waveform``
+with the same levels, but less noise and ripple by default. ``write_run``
+writes it in the BioMon layout: the Created line, the column header of
+example_format.txt, the Start line, rows padded to 83 columns and a Stop
+line as footer.
+
+Example
+-------
+    python -m benchmarks.synthetic run.txt --samples 1000000
+
+"""
+
+import os
+import time
+
+import numpy as np
+
+from potentiostat.capture import biomon_stamp
+from potentiostat.emulator import Waveform
+from potentiostat.framing import GAIN
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TEMPLATE_FILE = os.path.join(REPO_DIR, 'example_format.txt')
+ROW_COLUMNS = 83  # counter, t[min], 16 channels of block #1 and the rest, as written by the loggers
+
+
+def synthetic_trace(samples, rate=10.0, step_period=90.0, settle=5.0, drift=0.002, ripple=0.005, noise=0.003,
+                    slopes=None, spikes=1e-4, spike_height=1.0, first=0, seed=None):
+    """
+    Time and currents of ``samples`` consecutive samples.
+
+    Parameters
+    ----------
+    samples : int
+    rate : float, optional
+        Samples per second. The default is 10.
+    step_period : float, optional
+        Seconds between buffer and standard steps. The default is 90.
+    settle : float, optional
+        Time constant of the sensor response to a step, in seconds.
+    drift : float, optional
+        Drift in nA per minute; each channel gets 0.5 to 1.5 times this
+        unless ``slopes`` gives the six drifts.
+    ripple : float, optional
+        Amplitude of a 30 s sine ripple in nA.
+    noise : float, optional
+        Standard deviation of the gaussian noise in nA. With the defaults
+        the settled plateaus pass the steady state test.
+    spikes : float, optional
+        Probability of a spike per sample and channel.
+    spike_height : float, optional
+        Largest spike in nA, either sign.
+    first : int, optional
+        Number of the first sample, to generate a long run in chunks.
+    seed : int, optional
+
+    Returns
+    -------
+    seconds : numpy.ndarray
+        (samples,) time since the start.
+    values : numpy.ndarray
+        (samples, 7) currents of channels 1 to 6 in nA and the temperature
+        in °C.
+
+    """
+    random = np.random.default_rng(seed)
+    seconds = np.arange(first, first + samples) / rate
+    period = np.floor(seconds / step_period)
+    since_step = (seconds - period * step_period)[:, None]
+    standard = (period % 2)[:, None]
+    # Towards the standard level on odd periods, back to the buffer on even ones
+    response = np.exp(-since_step / settle)
+    level = np.where(standard == 1, 1 - response, np.where(period[:, None] == 0, 0.0, response))
+    channel = np.arange(6)
+    if slopes is None:
+        slopes = drift * random.uniform(0.5, 1.5, 6)
+    currents = (np.array(Waveform.BASELINE) + level * np.array(Waveform.STEP)
+                + slopes * seconds[:, None] / 60
+                + ripple * np.sin(2 * np.pi * seconds[:, None] / 30 + channel)
+                + random.normal(0, noise, (samples, 6)))
+    hits = random.random((samples, 6)) < spikes
+    currents[hits] += random.uniform(-spike_height, spike_height, int(hits.sum()))
+    currents = np.round(np.clip(currents / GAIN, -32768, 32767)) * GAIN
+    temperature = 37 + 0.2 * np.sin(2 * np.pi * seconds / 600)
+    return seconds, np.column_stack([currents, temperature])
+
+
+def write_run(file_path, samples, rate=10.0, chunk=100000, footer=True, template_file=TEMPLATE_FILE,
+              seed=0, **trace):
+    """
+    Write a synthetic BioMon run of ``samples`` rows; returns ``file_path``.
+
+    The trace is generated and written ``chunk`` samples at a time, so the
+    memory use does not grow with the run length. Extra keyword arguments
+    go to ``synthetic_trace``.
+    """
+    with open(template_file, 'r') as template:
+        template.readline()
+        header = template.readline()
+    random = np.random.default_rng(seed)
+    # The same drift in every chunk
+    slopes = trace.pop('drift', 0.002) * random.uniform(0.5, 1.5, 6)
+    now = time.time()
+    # Everything after block #1 channel 7 is zero, as in the logged files
+    row_format = "%d\t%.4f\t" + "\t".join(["%.3f"] * 7) + "\t0" * (ROW_COLUMNS - 9)
+    with open(file_path, 'w') as file:
+        file.write(biomon_stamp("Created", now) + header + biomon_stamp("Start", now))
+        for first in range(0, samples, chunk):
+            count = min(chunk, samples - first)
+            seconds, values = synthetic_trace(count, rate=rate, slopes=slopes, first=first,
+                                              seed=int(random.integers(1 << 31)), **trace)
+            rows = np.column_stack([np.arange(first + 1, first + count + 1), seconds / 60, values])
+            np.savetxt(file, rows, fmt=row_format)
+        if footer:
+            file.write(biomon_stamp("Stop", now + samples / rate))
+    return file_path
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Write a synthetic BioMon run")
+    parser.add_argument("output", type=str)
+    parser.add_argument("--samples", type=int, default=100000)
+    parser.add_argument("--rate", type=float, default=10.0, help="Samples per second")
+    parser.add_argument("--noise", type=float, default=0.003, help="Noise in nA")
+    parser.add_argument("--spikes", type=float, default=1e-4, help="Spike probability per sample and channel")
+    parser.add_argument("--no_footer", action="store_true", help="Leave the run open, as while it is logged")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    write_run(args.output, args.samples, rate=args.rate, footer=not args.no_footer, seed=args.seed,
+              noise=args.noise, spikes=args.spikes)
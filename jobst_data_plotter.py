@@ -2,34 +2,16 @@ import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
 from matplotlib.ticker import MaxNLocator
+from analysis.loader import load_run
 
 # Define the path to the file
 path = "C:\\Users\\NoahB\\Documents\\HebrewU Bioengineering\\Equipment\\JOBST\\"
 filename = "Medium_Calibration_Test.txt"
 file_path = path + filename
 
-# Open the file in read mode and read the contents
-with open(file_path, "r", newline="") as file:
-    lines = file.readlines()
-
-# Process the data
-data = [line.strip().split("\t") for line in lines]
-df = pd.DataFrame(data)
-df = df.loc[:, :8]  # Select relevant columns for one sensor
-new_header = df.iloc[1]  # Select the third row as header
-df = df[3:]  # Take the data less the new header row
-df.columns = new_header  # Set the new header
-
-# Separate the data from comments and other information at the bottom
-index = []
-for i in range(3, len(df) + 2):
-    a = df.loc[i, "counter"]
-    if not a.isdigit():
-        index.append(i)
-        break  # Stop once the first non-digit is found
-
-df2 = df.loc[0 : index[0] - 1, :]
-df2 = df2.apply(pd.to_numeric)
+# Load the columns of sensor block #1 up to the footer
+# (plain text or its .pstz archive, see analysis.loader)
+df2 = load_run(file_path)
 
 # Subtract signals from blanks according to the rules
 glutamate = df2["#1ch1"] - df2["#1ch2"]
@@ -1,12 +1,20 @@
 import pandas as pd
 import numpy as np
 import sys
-import time
 import getopt
+import asyncio
 from queue import Queue
 from SIX_SERVER_READER_3 import PotentiostatReader
+from potentiostat.acquisition import AcquisitionService, write_text, consume
+from analysis.loader import load_run, DEFAULT_COLUMNS
+from analysis.steady_state import StreamingSteadyState, offline_steady_state, WINDOW, STD_LIMIT, SPACING, THRESH
+from analysis.calibration import ANALYTES, CHANNELS, calibrate
+from analysis.live import LiveBuffer
+from analysis.follow import RunFollower
+from analysis.results import ResultStore
+from analysis.wells import run_start, well_name
 
-window =25 #global variable window which appears in dataprocess or
+window = WINDOW #global variable window which appears in dataprocess or
 
 class SteadyState:
     def __init__(self, data):
@@ -19,70 +27,66 @@ class SteadyState:
         
 
     def test(self):
-        if abs(self.std_dev) < 0.006:  # Don't go much lower than this as it will not work
+        if abs(self.std_dev) < STD_LIMIT:  # Don't go much lower than this as it will not work
             return 1
         else:
             return None
 
 class DataProcessor:
-    def __init__(self):
+    def __init__(self, calibration=None):
+        # calibration: optional analysis.calibration.Calibration covering any of
+        # the sensor blocks #1 to #4 instead of the built in block #1 rules
+        self.calibration = calibration
+        self.analytes = list(calibration.analytes) if calibration is not None else list(ANALYTES)
         self.df = None
         self.results = None
-        self.output = pd.DataFrame(columns=['Glutamate', 'Glutamine', 'Glucose', 'Lactate'])
+        # Rows accepted by check_change, see analysis.results
+        self.changes = ResultStore(self.analytes)
         self.buffer = 0
-        self.outputs = [[] for _ in range(4)]
-        self.indices = [[] for _ in range(4)]
-        self.thresh = [[0.2, 100], [0.2, 50], [0.2, 100], [0.2, 100]] # list for glutamate, glutamine, glucose, lactate
-        self.sign = [None] * 4
+        self.outputs = [[] for _ in self.analytes]
+        self.indices = [[] for _ in self.analytes]
+        self.thresh = [list(band) for band in THRESH] # list for glutamate, glutamine, glucose, lactate
+        if calibration is not None:
+            # Every sensor block uses the band of its analyte, unknown analytes the widest one
+            names = [name.split(' ', 1)[-1] for name in self.analytes]
+            self.thresh = [self.thresh[ANALYTES.index(name)] if name in ANALYTES else [0.2, 100] for name in names]
+        self.sign = [None] * len(self.analytes)
+        self.detector = None
+        self.live = None
+
+    @property
+    def output(self):
+        # Built from the result store only when asked for
+        return self.changes.wide()
 
     def load_data(self,file_path):
         self.file_path = file_path
-        #Read all of the lines in the file and save to lines variable
+        #Parse only the columns in use, up to the footer (see analysis.loader)
         try:
-            with open(self.file_path, 'r', newline='') as file:
-                lines = file.readlines()
+            columns = DEFAULT_COLUMNS
+            if self.calibration is not None:
+                columns = columns + [x for x in self.calibration.columns if x not in columns]
+            df2 = load_run(self.file_path, columns)
         except FileNotFoundError:
             print(f"File not found: {self.file_path}")
             sys.exit(1)
-        #split up the lines appropriately
-        data = [line.strip().split('\t') for line in lines]
-        #turn them into a dataframe
-        df = pd.DataFrame(data)
-        df = df.loc[:, :8] #Get rid of columns not in use
-        new_header = df.iloc[1] #keep the first row as the header
-        df = df[3:] #store data from 3 rows on
-        df.columns = new_header
-        self.df = df
-        index = []
-        for i in range(3, len(self.df) + 2):
-            a = self.df.loc[i, 'counter']
-            if not a.isdigit():
-                index.append(i)
-        df2 = df.loc[0:index[0] - 1, :]
-        df2 = df2.apply(pd.to_numeric)
+        self.df = df2
         #Now that we have it all processed into df2, we want to calibrate them 
         self.calibrate_data(df2)
     
     def calibrate_data(self, df2):
-        # Subtract signals from blanks
-        glutamate = df2['#1ch1'] - df2['#1ch2']
-        glutamine = df2['#1ch3'] - df2['#1ch1']
-        glucose = df2['#1ch5'] - df2['#1ch4']
-        lactate = df2['#1ch6'] - df2['#1ch4']
-        gain = pd.DataFrame({'Glutamate': [0.97], 'Glutamine': [0.418], 'Glucose': [0.6854], 'Lactate': [0.0609]})
-        self.results = pd.DataFrame({
-            'Glutamate': glutamate * gain.loc[0, 'Glutamate'],
-            'Glutamine': glutamine * gain.loc[0, 'Glutamine'],
-            'Glucose': glucose * gain.loc[0, 'Glucose'],
-            'Lactate': lactate * gain.loc[0, 'Lactate']
-        })
+        # Subtract signals from blanks and apply the gains (see analysis.calibration)
+        if self.calibration is not None:
+            self.results = self.calibration.apply_frame(df2)
+            return
+        analytes = calibrate(df2[CHANNELS].to_numpy(dtype=float))
+        self.results = pd.DataFrame(analytes, columns=ANALYTES, index=df2.index)
 
     def create_buffer(self):
-        for index, row in self.results.iterrows():
-            self.buffer += 1
-            if self.buffer > window:
-                self.analyze_buffer(index)
-                self.buffer = 0
+        # Same windows as calling analyze_buffer every window + 1 rows, all at once
+        _, _, self.buffer = offline_steady_state(self.results.to_numpy(dtype=float), self.results.index.to_numpy(),
+                                                 window, buffered=self.buffer, thresh=self.thresh,
+                                                 outputs=self.outputs, indices=self.indices)
     def organize_data(self,data):
         self.buffer = 0
         data = pd.DataFrame({
@@ -107,62 +111,98 @@ class DataProcessor:
             if ss_index:
                 value = int(abs(self.results.loc[index, column]) * 1000) / 1000
                 if not self.outputs[i] or (not (self.outputs[i][-1] * self.thresh[i][0] <= value <= self.outputs[i][-1] * self.thresh[i][1])
-                                          and (index - self.indices[i][-1] >= 200)):
+                                          and (index - self.indices[i][-1] >= SPACING)):
                     self.outputs[i].append(value)
                     self.indices[i].append(index)
         #self.check_change(index)
 
-    def check_change(self, index):
-        for column in self.results.columns:
+    def analyze_sample(self, index, values):
+        # Live mode: rolling window per analyte, constant time per sample, as
+        # long as the window + 1 rows tested by create_buffer
+        if self.detector is None:
+            self.detector = StreamingSteadyState(len(self.outputs), window + 1, thresh=self.thresh,
+                                                 outputs=self.outputs, indices=self.indices)
+        return self.detector.update(index, values)
+
+    def process_live(self, index, channels):
+        # Live mode: calibrate into the preallocated ring, no DataFrames per sample
+        if self.live is None:
+            self.live = LiveBuffer(calibration=self.calibration)
+            self._live_channels = slice(None)
+            if self.calibration is not None:
+                # A single potentiostat only delivers sensor block #1
+                if any(not column.startswith('#1ch') for column in self.calibration.columns):
+                    raise ValueError("Live data only has sensor block #1 channels")
+                self._live_channels = [int(column[4:]) - 1 for column in self.calibration.columns]
+        return self.analyze_sample(index, self.live.append(index, np.asarray(channels)[self._live_channels]))
+
+    def follow_file(self, file_path, stop=None, idle_timeout=None):
+        # Analyse a run another process is still writing, only parsing new bytes
+        self.file_path = file_path
+        follower = RunFollower(file_path)
+        for rows in follower.follow(stop, idle_timeout):
+            for row in rows:
+                self.process_live(int(row[0]), row[2:8])
+        return follower
+
+    def check_change(self, index, timestamp=None):
+        # Only uses outputs, so it works in live and follow mode too (no results
+        # frame there); timestamp is the t[min] of the sample, looked up in df if None
+        for i in range(len(self.analytes)):
             """
             #Use this to skil any columns
-            if column == 'Glutamate':
+            if self.analytes[i] == 'Glutamate':
                 continue
             """
-            i = self.results.columns.get_loc(column)
             if len(self.outputs[i]) >= 2:
                 self.sign[i] = 1 if self.outputs[i][-2] > self.outputs[i][-1] else 0
         if self.sign[0] is not None and all(x == self.sign[0] for x in self.sign[:]):
-            new_row = pd.DataFrame([{
-                'Glutamate': self.outputs[1][-1],
-                'Glutamine': self.outputs[2][-1],
-                'Glucose': self.outputs[3][-1],
-                'Lactate': self.outputs[4][-1]
-            }])
-            if not new_row.dropna(axis=1).empty and (self.output.empty or not (new_row.iloc[0] == self.output.iloc[-1]).all()):
-                self.output = pd.concat([self.output, new_row], ignore_index=True)
-            self.sign = [None] * 4
+            # Latest output of every analyte; rows repeating the previous one are skipped
+            if timestamp is None:
+                timestamp = self.df.at[index, 't[min]'] if self.df is not None and index in self.df.index else np.nan
+            self.changes.append_row([values[-1] for values in self.outputs], index, timestamp)
+            self.sign = [None] * len(self.analytes)
+
+    def well_summary(self, visits, start=None):
+        # Per AMUZA well: the calibrated analytes during its visits and the last
+        # steady state output in them (visits: analysis.wells.VisitLog of the session,
+        # start: epoch seconds of t[min] = 0, by default the Start line of the run)
+        start = run_start(self.file_path) if start is None else start
+        wells = visits.wells()
+        table = wells.aggregate(start + self.df['t[min]'].to_numpy() * 60, self.results)
+        for i, name in enumerate(self.analytes):
+            found = wells.assign(start + self.df.loc[self.indices[i], 't[min]'].to_numpy(dtype=float) * 60)
+            steady = pd.Series(self.outputs[i], dtype=float)[found > 0].groupby(found[found > 0]).last()
+            table[f'{name} steady'] = pd.Series(steady.to_numpy(), index=[well_name(x) for x in steady.index],
+                                                dtype=float)
+        return table
 
     def get_debug_info(self):
-        return pd.DataFrame({
-            'Glutamate': pd.Series(self.outputs[0]),
-            'Index1': pd.Series(self.indices[0]),
-            'Glutamine': pd.Series(self.outputs[1]),
-            'Index2': pd.Series(self.indices[1]),
-            'Glucose': pd.Series(self.outputs[2]),
-            'Index3': pd.Series(self.indices[2]),
-            'Lactate': pd.Series(self.outputs[3]),
-            'Index4': pd.Series(self.indices[3]),
-        })
-
-def main(file_path,live):
+        # Glutamate, Index1, Glutamine, Index2, ... for every analyte
+        columns = {}
+        for i, name in enumerate(self.analytes):
+            columns[name] = pd.Series(self.outputs[i])
+            columns[f'Index{i + 1}'] = pd.Series(self.indices[i])
+        return pd.DataFrame(columns)
+
+def main(file_path,live,follow=False):
     processor = DataProcessor()
-    #Get the data either from live or from a file 
-    if live:
+    #Get the data either from live, from a file another process is writing, or from a file
+    if follow:
+        processor.follow_file(file_path)
+    elif live:
         DataLogger = PotentiostatReader(com_port=COM_PORT, baud_rate=BAUD, timeout=TIMEOUT, output_filename=file_path)
-        index = 1
-        DataLogger.line_one()
-        while (1):
-            list = DataLogger.run()
-            data = [float(i) for i in list]
+        service = AcquisitionService(DataLogger)
+
+        def process_sample(sample):
+            data = sample.values[0:6]
             print(data)
-            if data:
-                data = processor.organize_data(data)
-                processor.calibrate_data(data)
-                print("1")
-                processor.analyze_buffer(index)
-                index += 1
-            time.sleep(1.7)  # Control the data acquisition rate
+            processor.process_live(sample.index, data)
+
+        # The file gets every sample, the analysis drops the oldest ones if it falls behind
+        asyncio.run(service.run_with(
+            write_text(service.subscribe(policy='block'), DataLogger.sink, DataLogger.output_format),
+            consume(service.subscribe(maxsize=100, policy='drop_oldest'), process_sample, in_executor=True)))
     else:
         processor.load_data(file_path)
         processor.create_buffer()
@@ -176,9 +216,10 @@ if __name__ == "__main__":
     filename = 'Trial.txt'
     file_path = path + filename
     live = True # Flag to decide if read from the file (False) or write to it live (True)
+    follow = False # Follow a file the datalogger is writing instead of opening the port
     COM_PORT = "COM20"
     BAUD = 9600
     TIMEOUT = 0.5
-    main(file_path,live)
+    main(file_path,live,follow)
 #Latest update got the values input directly from the sensor working just need to make them save now.
 #also the read file should be working more normal now as well
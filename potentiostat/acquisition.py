@@ -0,0 +1,277 @@
+"""
+asyncio acquisition service with fan-out to several consumers.
+
+One ``AcquisitionService`` owns the PotentiostatReader and its serial port.
+Every decoded sample is handed to each ``Subscription``; a subscription has
+its own bounded queue and overflow policy so a slow consumer (a plot, the
+analysis) never stalls the serial reader or the file writer.
+
+Example
+-------
+    reader = PotentiostatReader(com_port='/dev/ttyUSB0', output_filename=path)
+    service = AcquisitionService(reader)
+    asyncio.run(service.run_with(
+        write_text(service.subscribe(policy='block'), reader.sink, reader.output_format),
+        consume(service.subscribe(maxsize=100, policy='drop_oldest'), print),
+    ))
+
+"""
+
+import asyncio
+import time
+from collections import deque, namedtuple
+
+from potentiostat.framing import decode_frame, GAIN, TEMPERATURE_SCALE
+from potentiostat.reader import SampleTableFormat
+
+
+# index counts from 1 like the sample numbers in the text files, words are the
+# raw data words of the frame and values the six currents in nA plus the
+# temperature in °C
+Sample = namedtuple('Sample', ['index', 'timestamp_ns', 'words', 'values'])
+
+
+def sample_values(words):
+    values = [x * GAIN for x in words[0:6]]
+    values.append(words[6] / TEMPERATURE_SCALE if len(words) > 6 else 0.0)
+    return values
+
+
+class Subscription:
+    """
+    Bounded queue of samples for one consumer.
+
+    Parameters
+    ----------
+    maxsize : int, optional
+        Number of samples that may wait in the queue. The default is 1024.
+    policy : string, optional
+        What to do when the queue is full:
+
+        'block': the publisher waits for room. Use for consumers that must
+        see every sample, such as the file sink.
+        'drop_oldest': the oldest queued sample is discarded.
+        'sample': only every ``sample_every``-th sample is kept (replacing
+        the oldest) until the consumer catches up to half the queue.
+
+        The default is 'block'.
+    sample_every : int, optional
+        Decimation factor of the 'sample' policy. The default is 10.
+
+    """
+    POLICIES = ('block', 'drop_oldest', 'sample')
+
+    def __init__(self, maxsize=1024, policy='block', sample_every=10):
+        if policy not in self.POLICIES:
+            raise ValueError(f"'policy' must be one of {self.POLICIES}")
+        if maxsize < 1:
+            raise ValueError("'maxsize' must be >= 1")
+        self.maxsize = maxsize
+        self.policy = policy
+        self.sample_every = sample_every
+        self.closed = False
+        self.delivered = 0
+        self.dropped = 0
+        self._items = deque()
+        self._not_empty = asyncio.Event()
+        self._not_full = asyncio.Event()
+        self._not_full.set()
+        self._overflowing = False
+        self._skipped = 0
+
+    def __len__(self):
+        return len(self._items)
+
+    async def put(self, sample):
+        if self.closed:
+            return
+        if self._overflowing and len(self._items) <= self.maxsize // 2:
+            self._overflowing = False
+        if len(self._items) >= self.maxsize or self._overflowing:
+            if self.policy == 'block':
+                while len(self._items) >= self.maxsize and not self.closed:
+                    self._not_full.clear()
+                    await self._not_full.wait()
+                if self.closed:
+                    return
+            elif self.policy == 'drop_oldest':
+                self._items.popleft()
+                self.dropped += 1
+            else:
+                if not self._overflowing:
+                    # The sample that overflows the queue is kept
+                    self._overflowing = True
+                    self._skipped = self.sample_every - 1
+                self._skipped += 1
+                if self._skipped < self.sample_every:
+                    self.dropped += 1
+                    return
+                self._skipped = 0
+                if len(self._items) >= self.maxsize:
+                    self._items.popleft()
+                    self.dropped += 1
+        self._items.append(sample)
+        self._not_empty.set()
+
+    async def get(self):
+        """Next sample, or None once the subscription is closed and drained."""
+        while not self._items:
+            if self.closed:
+                return None
+            self._not_empty.clear()
+            await self._not_empty.wait()
+        sample = self._items.popleft()
+        self.delivered += 1
+        self._not_full.set()
+        return sample
+
+    def close(self):
+        self.closed = True
+        self._not_empty.set()
+        self._not_full.set()
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        sample = await self.get()
+        if sample is None:
+            raise StopAsyncIteration
+        return sample
+
+
+class AcquisitionService:
+    """
+    Single acquisition loop around a PotentiostatReader.
+
+    The blocking serial reads run in the default executor so the event loop
+    stays free for the consumers. Frames are decoded once and published to
+    every subscription.
+
+    Parameters
+    ----------
+    reader : PotentiostatReader
+        Any of the reader classes; only its serial connection and framer
+        are used.
+
+    """
+    def __init__(self, reader):
+        self.reader = reader
+        self.subscriptions = []
+        self.sample_number = 1
+        self.start_ns = None
+        self._running = False
+        self._loop = None
+
+    def subscribe(self, maxsize=1024, policy='block', sample_every=10):
+        subscription = Subscription(maxsize, policy, sample_every)
+        self.subscriptions.append(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        subscription.close()
+        self.subscriptions.remove(subscription)
+
+    async def publish(self, sample):
+        for subscription in self.subscriptions:
+            await subscription.put(sample)
+
+    async def run(self):
+        """Read and publish samples until ``stop`` is called."""
+        loop = self._loop = asyncio.get_running_loop()
+        reader = self.reader
+        await loop.run_in_executor(None, reader.open_serial_connection)
+        self._running = True
+        try:
+            while self._running:
+                await loop.run_in_executor(None, reader.read_frames)
+                arrival_ns = time.monotonic_ns()
+                if self.start_ns is None:
+                    self.start_ns = arrival_ns
+                while reader.pending_frames:
+                    started = time.perf_counter()
+                    words = decode_frame(reader.pending_frames.popleft(), reader.package_length)
+                    sample = Sample(self.sample_number, arrival_ns, words, sample_values(words))
+                    reader.metrics.record_sample(time.perf_counter() - started)
+                    self.sample_number += 1
+                    await self.publish(sample)
+                reader.metrics.poll()
+        finally:
+            self._running = False
+            self._close_subscriptions()
+
+    def _close_subscriptions(self):
+        for subscription in self.subscriptions:
+            subscription.close()
+
+    def stop(self):
+        """
+        End the acquisition loop and close every subscription.
+
+        Consumers see the end of their subscription once they have drained
+        it. Safe to call from any thread.
+        """
+        self._running = False
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            self._close_subscriptions()
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            self._close_subscriptions()
+        else:
+            loop.call_soon_threadsafe(self._close_subscriptions)
+
+    async def run_with(self, *consumers):
+        """Run the acquisition loop together with consumer coroutines."""
+        await asyncio.gather(self.run(), *consumers)
+
+
+async def write_text(subscription, sink, output_format=None):
+    """
+    Consumer writing every sample to an ``OutputSink`` as text rows.
+
+    Header and row layout come from ``output_format``, one of the formats
+    of potentiostat.reader; pass the reader's ``output_format`` so the file
+    matches what the reader itself writes. The default is
+    ``SampleTableFormat()``.
+    """
+    if output_format is None:
+        output_format = SampleTableFormat()
+    formatter = output_format.formatter()
+    sink.open(output_format.header() if output_format.auto_header else None)
+    start_ns = None
+    try:
+        async for sample in subscription:
+            if start_ns is None:
+                start_ns = sample.timestamp_ns
+            sink.write(formatter.format(sample.index, (sample.timestamp_ns - start_ns) / 1e9, sample.words))
+    finally:
+        sink.close()
+
+
+async def write_capture(subscription, capture):
+    """Consumer storing every sample in a ``CaptureWriter``."""
+    try:
+        async for sample in subscription:
+            capture.write(sample.words, sample.timestamp_ns)
+    finally:
+        capture.close()
+
+
+async def consume(subscription, callback, in_executor=False):
+    """
+    Consumer calling ``callback(sample)`` for every sample.
+
+    Set ``in_executor`` for callbacks that block (plotting, heavy analysis)
+    so they run in a worker thread instead of on the event loop.
+    """
+    loop = asyncio.get_running_loop()
+    async for sample in subscription:
+        if in_executor:
+            await loop.run_in_executor(None, callback, sample)
+        else:
+            callback(sample)
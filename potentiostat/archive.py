@@ -0,0 +1,344 @@
+"""
+Seekable block compressed archive of finished runs.
+
+A run (a text log or a binary capture) is split into blocks of about
+``block_size`` bytes at line or record boundaries and every block is
+compressed on its own with zlib. A small index at the end of the archive
+holds the file offset and the first and last time of every block, so a
+time window only needs the blocks that overlap it.
+
+Layout of a ``.pstz`` file:
+
+    MAGIC
+    preamble (compressed): the text header lines or the capture header
+    block 0, block 1, ... (compressed)
+    index (compressed JSON)
+    trailer: index offset, index length, MAGIC
+
+``open_run`` opens a run whether it is plain text or archived, which is
+what the loaders in jobst_data_reader and jobst_data_plotter use.
+
+Example
+-------
+    python -m potentiostat.archive archive Data_Collected/*.txt --remove
+    python -m potentiostat.archive window Data_Collected/run.txt.pstz 600 900
+
+"""
+
+import bisect
+import io
+import json
+import locale
+import os
+import struct
+import zlib
+
+import numpy as np
+
+from potentiostat.capture import MAGIC as CAPTURE_MAGIC, HEADER_SIZE as CAPTURE_HEADER_SIZE, RECORD_DTYPE
+
+MAGIC = b"PSTARC\x00\x01"
+VERSION = 1
+EXTENSION = ".pstz"
+TRAILER_STRUCT = struct.Struct("<QQ8s")
+# Header names of the time column and their factor to seconds
+TIME_COLUMNS = {'t[min]': 60.0, 'Time/s': 1.0}
+TEXT_PREAMBLE_LINES = 3  # Created, column header, Start
+
+
+def is_archive(filename):
+    try:
+        with open(filename, 'rb') as file:
+            return file.read(len(MAGIC)) == MAGIC
+    except OSError:
+        return False
+
+
+def _text_time(line, column, factor):
+    fields = line.split(b"\t", column + 1)
+    try:
+        return float(fields[column]) * factor
+    except (IndexError, ValueError):
+        return None
+
+
+def _time_column(header):
+    """(column, factor to seconds) of the time in a header line, (0, None) if none."""
+    names = header.decode('latin-1').rstrip("\r\n").split("\t")
+    for name, scale in TIME_COLUMNS.items():
+        if name in names:
+            return names.index(name), scale
+    return 0, None
+
+
+def _text_blocks(file, block_size, index):
+    """Preamble and (data, first time, last time) blocks of a text run."""
+    # Lines stay bytes so the archive keeps whatever encoding the logger used
+    preamble = [file.readline()]
+    column, factor = _time_column(preamble[0])
+    if factor is None:
+        # Not a SIX_SERVER_READER table header: the BioMon layout with the
+        # column header between the Created and Start lines
+        preamble.extend(file.readline() for _ in range(TEXT_PREAMBLE_LINES - 1))
+        column, factor = _time_column(preamble[1])
+    index['time_column'] = [column, factor]
+    yield b"".join(preamble)
+
+    while True:
+        lines = file.readlines(block_size)
+        if not lines:
+            return
+        times = [None, None]
+        if factor is not None:
+            for line in lines:
+                times[0] = _text_time(line, column, factor)
+                if times[0] is not None:
+                    break
+            for line in reversed(lines):
+                times[1] = _text_time(line, column, factor)
+                if times[1] is not None:
+                    break
+        yield b"".join(lines), times[0], times[1]
+
+
+def _capture_blocks(file, block_size, index):
+    """Preamble and (data, first time, last time) blocks of a binary capture."""
+    header = file.read(CAPTURE_HEADER_SIZE)
+    yield header
+    start_ns = struct.unpack_from("<Q", header, 24)[0]
+    record_size = RECORD_DTYPE.itemsize
+    per_block = max(1, block_size // record_size)
+    while True:
+        data = file.read(per_block * record_size)
+        data = data[:len(data) - len(data) % record_size]
+        if not data:
+            return
+        stamps = np.frombuffer(data, dtype=RECORD_DTYPE)['timestamp_ns']
+        yield data, (int(stamps[0]) - start_ns) / 1e9, (int(stamps[-1]) - start_ns) / 1e9
+
+
+def archive_run(source, destination=None, block_size=1 << 20, level=6, remove=False):
+    """
+    Compress a finished run into a seekable archive.
+
+    Parameters
+    ----------
+    source : string
+        Text log or binary capture.
+    destination : string, optional
+        The default is ``source`` with ``.pstz`` appended.
+    block_size : int, optional
+        Uncompressed bytes per block. The default is 1 MiB.
+    level : int, optional
+        zlib compression level. The default is 6.
+    remove : bool, optional
+        Delete ``source`` once the archive is complete. The default is False.
+
+    Returns
+    -------
+    string
+        Path of the archive.
+
+    """
+    if destination is None:
+        destination = source + EXTENSION
+    with open(source, 'rb') as probe:
+        kind = 'capture' if probe.read(len(CAPTURE_MAGIC)) == CAPTURE_MAGIC else 'text'
+    index = {'version': VERSION, 'kind': kind, 'source': os.path.basename(source),
+             'size': os.path.getsize(source), 'blocks': []}
+    temporary = destination + ".tmp"
+    block_reader = _text_blocks if kind == 'text' else _capture_blocks
+    with open(source, 'rb') as source_file, open(temporary, 'wb') as output:
+        blocks = block_reader(source_file, block_size, index)
+        output.write(MAGIC)
+        preamble = zlib.compress(next(blocks), level)
+        index['preamble'] = [output.tell(), len(preamble)]
+        output.write(preamble)
+        for data, first, last in blocks:
+            compressed = zlib.compress(data, level)
+            index['blocks'].append([output.tell(), len(compressed), len(data), first, last])
+            output.write(compressed)
+        index_data = zlib.compress(json.dumps(index).encode(), level)
+        index_offset = output.tell()
+        output.write(index_data)
+        output.write(TRAILER_STRUCT.pack(index_offset, len(index_data), MAGIC))
+    os.replace(temporary, destination)
+    if remove:
+        os.remove(source)
+    return destination
+
+
+class RunArchive:
+    """
+    Random access to the blocks of a ``.pstz`` archive.
+
+    Parameters
+    ----------
+    filename : string
+
+    """
+    def __init__(self, filename):
+        self.filename = filename
+        self._file = open(filename, 'rb')
+        if self._file.read(len(MAGIC)) != MAGIC:
+            self._file.close()
+            raise ValueError(f"{filename} is not a run archive")
+        self._file.seek(-TRAILER_STRUCT.size, 2)
+        index_offset, index_length, magic = TRAILER_STRUCT.unpack(self._file.read(TRAILER_STRUCT.size))
+        if magic != MAGIC:
+            self._file.close()
+            raise ValueError(f"{filename} is truncated")
+        self.index = json.loads(zlib.decompress(self._read(index_offset, index_length)))
+        self.kind = self.index['kind']
+        self.blocks = self.index['blocks']
+        self.preamble = zlib.decompress(self._read(*self.index['preamble']))
+        # Blocks without a parsable time (footers) sort to the end
+        self._first_times = [block[3] if block[3] is not None else float('inf') for block in self.blocks]
+
+    def _read(self, offset, length):
+        self._file.seek(offset)
+        return self._file.read(length)
+
+    def read_block(self, number):
+        offset, length = self.blocks[number][0:2]
+        return zlib.decompress(self._read(offset, length))
+
+    def iter_blocks(self, first=0, last=None):
+        for number in range(first, len(self.blocks) if last is None else last):
+            yield self.read_block(number)
+
+    def blocks_between(self, start, stop):
+        """Numbers of the blocks that may hold times from ``start`` to ``stop`` seconds."""
+        first = max(0, bisect.bisect_right(self._first_times, start) - 1)
+        last = bisect.bisect_right(self._first_times, stop)
+        return range(first, max(first, last))
+
+    def read_all(self):
+        """The original file contents."""
+        return self.preamble + b"".join(self.iter_blocks())
+
+    def read_window(self, start, stop):
+        """
+        Data between ``start`` and ``stop`` seconds after the run start.
+
+        Text runs return the preamble and the matching lines as a string,
+        captures a structured array of ``RECORD_DTYPE`` records. Only the
+        overlapping blocks are decompressed.
+        """
+        numbers = self.blocks_between(start, stop)
+        if self.kind == 'capture':
+            start_ns = struct.unpack_from("<Q", self.preamble, 24)[0]
+            data = b"".join(self.read_block(number) for number in numbers)
+            records = np.frombuffer(data, dtype=RECORD_DTYPE)
+            seconds = (records['timestamp_ns'].astype(np.int64) - np.int64(start_ns)) / 1e9
+            return records[(seconds >= start) & (seconds <= stop)]
+
+        column, factor = self.index['time_column']
+        if factor is None:
+            raise ValueError(f"{self.filename} has no time column to select a window by")
+        lines = [self.preamble]
+        for number in numbers:
+            for line in self.read_block(number).splitlines(keepends=True):
+                moment = _text_time(line, column, factor)
+                if moment is not None and start <= moment <= stop:
+                    lines.append(line)
+        return b"".join(lines).decode(locale.getpreferredencoding(False))
+
+    def open_text(self):
+        """Text stream over the whole run, decompressed block by block."""
+        return io.TextIOWrapper(io.BufferedReader(_BlockStream(self)), newline='')
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class _BlockStream(io.RawIOBase):
+    """Readable raw stream that decompresses one block at a time."""
+    def __init__(self, archive):
+        self.archive = archive
+        self._chunks = iter([archive.preamble])
+        self._next_block = 0
+        self._buffer = memoryview(b"")
+
+    def readable(self):
+        return True
+
+    def readinto(self, target):
+        while not self._buffer:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                if self._next_block >= len(self.archive.blocks):
+                    return 0
+                chunk = self.archive.read_block(self._next_block)
+                self._next_block += 1
+            self._buffer = memoryview(chunk)
+        count = min(len(target), len(self._buffer))
+        target[:count] = self._buffer[:count]
+        self._buffer = self._buffer[count:]
+        return count
+
+    def close(self):
+        if not self.closed:
+            self.archive.close()
+        super().close()
+
+
+def resolve_run(filename):
+    """Path of the run itself or of its archive if only that exists."""
+    if not os.path.exists(filename) and os.path.exists(filename + EXTENSION):
+        return filename + EXTENSION
+    return filename
+
+
+def open_run(filename):
+    """
+    Open a text run for reading, plain or archived.
+
+    ``filename`` may name the text file, its ``.pstz`` archive, or the text
+    file after it was archived and removed.
+    """
+    filename = resolve_run(filename)
+    if is_archive(filename):
+        return RunArchive(filename).open_text()
+    return open(filename, 'r', newline='')
+
+
+if __name__ == "__main__":
+    import argparse
+    import glob
+
+    parser = argparse.ArgumentParser(description="Block compressed archives of finished runs")
+    commands = parser.add_subparsers(dest="command", required=True)
+    archive_parser = commands.add_parser("archive", help="Compress runs")
+    archive_parser.add_argument("sources", nargs="+", help="Text logs or captures (globs allowed)")
+    archive_parser.add_argument("--block_size", type=int, default=1 << 20, help="Uncompressed bytes per block")
+    archive_parser.add_argument("--remove", action="store_true", help="Delete the originals afterwards")
+    extract_parser = commands.add_parser("extract", help="Restore the original file")
+    extract_parser.add_argument("archive", type=str)
+    extract_parser.add_argument("output", type=str)
+    window_parser = commands.add_parser("window", help="Print the text rows of a time window")
+    window_parser.add_argument("archive", type=str)
+    window_parser.add_argument("start", type=float, help="Seconds after the start of the run")
+    window_parser.add_argument("stop", type=float, help="Seconds after the start of the run")
+    args = parser.parse_args()
+
+    if args.command == "archive":
+        for pattern in args.sources:
+            for source in sorted(glob.glob(pattern)) or [pattern]:
+                size = os.path.getsize(source)
+                destination = archive_run(source, block_size=args.block_size, remove=args.remove)
+                print(f"{source} -> {destination} ({os.path.getsize(destination) / max(1, size):.1%})")
+    elif args.command == "extract":
+        with RunArchive(args.archive) as archive, open(args.output, 'wb') as output:
+            output.write(archive.preamble)
+            for block in archive.iter_blocks():
+                output.write(block)
+    else:
+        with RunArchive(args.archive) as archive:
+            print(archive.read_window(args.start, args.stop), end="")
@@ -0,0 +1,207 @@
+"""
+Compact binary capture of the potentiostat stream.
+
+A capture file starts with a 64 byte header followed by fixed width little
+endian records:
+
+    uint64  monotonic timestamp in nanoseconds
+    int16   raw counts of channels 1 to 6
+    int16   raw temperature word (1/16 °C)
+    int16   reserved, always 0
+
+At 24 bytes per sample this is roughly a tenth of the padded text lines,
+and a finished capture can be mapped straight into NumPy with
+``read_capture``. ``export_biomon`` turns a capture back into the
+example_format.txt style text used by jobst_data_reader.
+
+"""
+
+import struct
+import time
+from datetime import datetime
+
+import numpy as np
+
+from potentiostat.framing import GAIN, TEMPERATURE_SCALE
+from potentiostat.sinks import OutputSink
+
+MAGIC = b"PSTCAP\x00\x01"
+VERSION = 1
+HEADER_SIZE = 64
+# magic, version, record size, wall clock start (epoch s), monotonic start (ns)
+HEADER_STRUCT = struct.Struct("<8sIIdQ")
+RECORD_STRUCT = struct.Struct("<Q8h")
+RECORD_DTYPE = np.dtype([
+    ('timestamp_ns', '<u8'),
+    ('channels', '<i2', (6,)),
+    ('temperature', '<i2'),
+    ('reserved', '<i2'),
+])
+
+
+class CaptureWriter:
+    """
+    Writes decoded frames as binary capture records.
+
+    Buffering, flushing, fsync and rotation are handled by an
+    ``OutputSink`` in binary mode; rotated files each get their own header.
+
+    Parameters
+    ----------
+    filename : string
+        Path of the capture file.
+    **sink_options
+        Passed on to ``OutputSink``.
+
+    """
+    def __init__(self, filename, **sink_options):
+        self.filename = filename
+        self.sink = OutputSink(filename, binary=True, **sink_options)
+        self.start_time = None
+        self.start_ns = None
+
+    def open(self):
+        self.start_time = time.time()
+        self.start_ns = time.monotonic_ns()
+        header = HEADER_STRUCT.pack(MAGIC, VERSION, RECORD_STRUCT.size,
+                                    self.start_time, self.start_ns)
+        self.sink.open(header.ljust(HEADER_SIZE, b"\x00"))
+
+    def write(self, out_data, timestamp_ns=None):
+        """
+        Store one decoded frame.
+
+        Parameters
+        ----------
+        out_data : list of int
+            Words returned by ``decode_frame``; the first six are the
+            channels and the seventh the temperature word.
+        timestamp_ns : int, optional
+            Arrival time from ``time.monotonic_ns``. Taken now if omitted.
+
+        """
+        if self.start_ns is None:
+            self.open()
+        if timestamp_ns is None:
+            timestamp_ns = time.monotonic_ns()
+        temperature = out_data[6] if len(out_data) > 6 else 0
+        self.sink.write(RECORD_STRUCT.pack(timestamp_ns, *out_data[0:6], temperature, 0))
+
+    def poll(self):
+        self.sink.poll()
+
+    def flush(self):
+        self.sink.flush()
+
+    def close(self):
+        self.sink.close()
+
+
+def read_capture_header(filename):
+    with open(filename, 'rb') as file:
+        raw = file.read(HEADER_SIZE)
+    return parse_capture_header(raw, filename)
+
+
+def parse_capture_header(raw, filename):
+    if len(raw) < HEADER_SIZE:
+        raise ValueError(f"{filename} is too short to be a capture file")
+    magic, version, record_size, start_time, start_ns = HEADER_STRUCT.unpack_from(raw)
+    if magic != MAGIC:
+        raise ValueError(f"{filename} is not a potentiostat capture file")
+    if version != VERSION or record_size != RECORD_DTYPE.itemsize:
+        raise ValueError(f"Unsupported capture version {version} in {filename}")
+    return {'version': version, 'start_time': start_time, 'start_ns': start_ns}
+
+
+def read_capture(filename):
+    """
+    Map a capture file into memory.
+
+    Returns the header as a dict and a read only structured array with the
+    fields of ``RECORD_DTYPE``. A trailing partial record left by an
+    interrupted run is ignored. Archived captures (see
+    ``potentiostat.archive``) are decompressed into memory instead.
+    """
+    from potentiostat.archive import RunArchive, is_archive, resolve_run
+    filename = resolve_run(filename)
+    if is_archive(filename):
+        with RunArchive(filename) as archive:
+            raw = archive.read_all()
+        info = parse_capture_header(raw[:HEADER_SIZE], filename)
+        data = raw[HEADER_SIZE:]
+        return info, np.frombuffer(data[:len(data) - len(data) % RECORD_DTYPE.itemsize], dtype=RECORD_DTYPE)
+    info = read_capture_header(filename)
+    with open(filename, 'rb') as file:
+        file.seek(0, 2)
+        count = (file.tell() - HEADER_SIZE) // RECORD_DTYPE.itemsize
+    if count == 0:
+        return info, np.zeros(0, dtype=RECORD_DTYPE)
+    records = np.memmap(filename, dtype=RECORD_DTYPE, mode='r', offset=HEADER_SIZE,
+                        shape=(count,))
+    return info, records
+
+
+def capture_to_arrays(info, records):
+    """
+    Convert raw records to physical units.
+
+    Returns the time since the start of the capture in seconds, the six
+    channel currents in nA as an (N, 6) array and the temperature in °C.
+    """
+    seconds = (records['timestamp_ns'].astype(np.int64) - np.int64(info['start_ns'])) / 1e9
+    currents = records['channels'] * GAIN
+    temperature = records['temperature'] / TEMPERATURE_SCALE
+    return seconds, currents, temperature
+
+
+def biomon_stamp(label, timestamp):
+    moment = datetime.fromtimestamp(timestamp)
+    clock = moment.strftime("%I:%M:%S %p").lstrip("0")
+    return f"{label}: {moment.month}/{moment.day}/{moment.year}\t{clock}\n"
+
+
+def export_biomon(capture_filename, output_filename, template_file="example_format.txt",
+                  columns=83, chunk_size=65536):
+    """
+    Write a capture as BioMon style text.
+
+    The column header is taken from ``template_file``; the Created and
+    Start lines are generated from the capture's start time. Each row holds
+    the counter, the time in minutes, channels 1 to 6 in nA and the
+    temperature in the #1ch7 column, padded with zeros to ``columns``
+    entries like the text written by PotentiostatReader.
+    """
+    info, records = read_capture(capture_filename)
+    with open(template_file, 'r') as template:
+        template_lines = template.readlines()
+    if len(template_lines) < 2:
+        raise ValueError(f"Template file {template_file} has no column header")
+    row_format = "%d\t%.4f\t" + "\t".join(["%.3f"] * 7) + "\t0" * (columns - 9)
+    with open(output_filename, 'w') as output:
+        output.write(biomon_stamp("Created", info['start_time']))
+        output.write(template_lines[1])
+        output.write(biomon_stamp("Start", info['start_time']))
+        for first in range(0, len(records), chunk_size):
+            chunk = records[first:first + chunk_size]
+            seconds, currents, temperature = capture_to_arrays(info, chunk)
+            rows = np.column_stack([
+                np.arange(first + 1, first + len(chunk) + 1),
+                seconds / 60,
+                currents,
+                temperature,
+            ])
+            np.savetxt(output, rows, fmt=row_format, delimiter="\t")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Export a binary capture as BioMon text")
+    parser.add_argument("capture_filename", type=str, help="Binary capture to convert")
+    parser.add_argument("output_filename", type=str, help="Text file to write")
+    parser.add_argument("--template_file", type=str, default="example_format.txt", help="File path of the template")
+    parser.add_argument("--columns", type=int, default=83, help="Number of columns per row")
+    args = parser.parse_args()
+    export_biomon(args.capture_filename, args.output_filename,
+                  template_file=args.template_file, columns=args.columns)
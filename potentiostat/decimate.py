@@ -0,0 +1,230 @@
+"""
+Streaming decimation of the potentiostat stream for long runs.
+
+Multi-day runs only need full resolution around events. ``Decimator`` sits
+between the acquisition and the sinks and writes
+
+    a summary file with one row per time bucket: the mean of channels 1 to
+    6 and the temperature in the BioMon columns (#1ch1 to #1ch7, so
+    ``DataProcessor.load_data`` reads it like any other run), followed by
+    the sample count and the per channel minimum and maximum;
+
+    an event file with full rate rows in the layout of the BioMon template
+    (its column header, rows zero padded to 83 columns) for a window
+    around every trigger. The last ``pre_trigger`` seconds are kept in a ring buffer so
+    the window also covers what happened before the trigger.
+
+Triggers are raised explicitly with ``trigger`` (for example after every
+AMUZA move) or by threshold crossings of single channels. ``trigger`` may
+be called from any thread: it only queues the trigger, which the
+acquisition side applies with the next sample.
+
+Example
+-------
+    decimator = Decimator(OutputSink('run_summary.txt'), OutputSink('run_events.txt'),
+                          bucket_seconds=10, thresholds={0: 5.0})
+    asyncio.run(service.run_with(write_decimated(service.subscribe(), decimator)))
+
+"""
+
+import queue
+import time
+from collections import deque
+
+import numpy as np
+
+from potentiostat.capture import biomon_stamp
+from potentiostat.framing import GAIN, TEMPERATURE_SCALE
+from potentiostat.rows import RowFormatter
+
+CHANNELS = 7  # six currents and the temperature
+# Raw counts to nA for the currents, to °C for the temperature
+SCALE = np.array([GAIN] * 6 + [1 / TEMPERATURE_SCALE])
+
+
+def summary_columns():
+    names = ["counter", "t[min]"]
+    names.extend(f"#1ch{channel}" for channel in range(1, CHANNELS + 1))
+    names.append("count")
+    names.extend(f"#1ch{channel}_min" for channel in range(1, CHANNELS + 1))
+    names.extend(f"#1ch{channel}_max" for channel in range(1, CHANNELS + 1))
+    return names
+
+
+class Decimator:
+    """
+    Min/max/mean buckets plus full rate windows around triggers.
+
+    Parameters
+    ----------
+    summary_sink : OutputSink
+        Receives one row per bucket.
+    event_sink : OutputSink, optional
+        Receives the full rate rows around triggers. Without it only the
+        summary is kept.
+    bucket_seconds : float, optional
+        Length of a bucket. The default is 10.
+    pre_trigger : float, optional
+        Seconds of full rate data kept before a trigger. The default is 30.
+    post_trigger : float, optional
+        Seconds of full rate data written after a trigger. The default is 60.
+    thresholds : dict, optional
+        Channel index (0 to 5 for the currents, 6 for the temperature) to a
+        level in nA or °C. Crossing the level in either direction raises a
+        trigger.
+    template_file : string, optional
+        BioMon file whose column header and columns the event file uses.
+        The default is "example_format.txt".
+    columns : int, optional
+        Number of entries per event row. The default is 83.
+
+    """
+    def __init__(self, summary_sink, event_sink=None, bucket_seconds=10.0,
+                 pre_trigger=30.0, post_trigger=60.0, thresholds=None,
+                 template_file="example_format.txt", columns=83):
+        self.summary_sink = summary_sink
+        self.event_sink = event_sink
+        self.bucket_ns = int(bucket_seconds * 1e9)
+        self.pre_ns = int(pre_trigger * 1e9)
+        self.post_ns = int(post_trigger * 1e9)
+        self.thresholds = dict(thresholds or {})
+        self.start_ns = None
+        self.buckets_written = 0
+        self.triggers = []
+        self._bucket = None
+        self._count = 0
+        self._sum = np.zeros(CHANNELS)
+        self._min = np.zeros(CHANNELS)
+        self._max = np.zeros(CHANNELS)
+        self._history = deque()
+        # Triggers from other threads, applied by add()
+        self._pending = queue.SimpleQueue()
+        self._full_until_ns = -1
+        self._last_values = None
+        self._summary_format = ("%d\t%.4f\t" + "\t".join(["%.3f"] * CHANNELS) + "\t%d\t"
+                                + "\t".join(["%.3f"] * (2 * CHANNELS)) + "\n")
+        self._event_header = None
+        self._event_rows = None
+        if event_sink is not None:
+            # Header and rows both follow the template's column names
+            with open(template_file, 'r') as template:
+                template.readline()
+                self._event_header = template.readline()
+            if not self._event_header:
+                raise ValueError(f"Template file {template_file} has no column header")
+            names = self._event_header.rstrip("\n").split("\t")
+            self._event_rows = RowFormatter.from_header(names, columns)
+
+    def open(self):
+        now = time.time()
+        self.summary_sink.open(biomon_stamp("Created", now)
+                               + "\t".join(summary_columns()) + "\n"
+                               + biomon_stamp("Start", now))
+        if self.event_sink is not None:
+            self.event_sink.open(biomon_stamp("Created", now) + self._event_header
+                                 + biomon_stamp("Start", now))
+
+    def add(self, index, timestamp_ns, words):
+        """Feed one sample: its sample number, arrival time and frame words."""
+        if self.start_ns is None:
+            self.start_ns = timestamp_ns
+        self._apply_pending()
+        bucket = (timestamp_ns - self.start_ns) // self.bucket_ns
+        if bucket != self._bucket:
+            self._emit_bucket()
+            self._bucket = bucket
+
+        raw = np.array(words[0:CHANNELS], dtype=np.float64)
+        if self._count:
+            np.minimum(self._min, raw, out=self._min)
+            np.maximum(self._max, raw, out=self._max)
+        else:
+            self._min[:] = raw
+            self._max[:] = raw
+        self._sum += raw
+        self._count += 1
+
+        if self.thresholds:
+            values = raw * SCALE
+            if self._last_values is not None:
+                for channel, level in self.thresholds.items():
+                    if (self._last_values[channel] < level) != (values[channel] < level):
+                        self._apply_trigger(timestamp_ns, f"ch{channel + 1} crossed {level}")
+                        break
+            self._last_values = values
+
+        if self.event_sink is None:
+            return
+        if timestamp_ns <= self._full_until_ns:
+            self._write_event(index, timestamp_ns, words)
+        else:
+            history = self._history
+            history.append((index, timestamp_ns, words))
+            horizon = timestamp_ns - self.pre_ns
+            while history[0][1] < horizon:
+                history.popleft()
+
+    def trigger(self, timestamp_ns=None, label=""):
+        """
+        Keep full rate data from ``pre_trigger`` before to ``post_trigger``
+        after now. Thread safe; takes effect with the next sample.
+        """
+        if timestamp_ns is None:
+            timestamp_ns = time.monotonic_ns()
+        self._pending.put((timestamp_ns, label))
+
+    def _apply_pending(self):
+        while True:
+            try:
+                timestamp_ns, label = self._pending.get_nowait()
+            except queue.Empty:
+                return
+            self._apply_trigger(timestamp_ns, label)
+
+    def _apply_trigger(self, timestamp_ns, label):
+        self.triggers.append((timestamp_ns, label))
+        if self.event_sink is None:
+            return
+        # The pre-trigger ring goes out first, then the post window stays open
+        horizon = timestamp_ns - self.pre_ns
+        for index, sample_ns, words in self._history:
+            if sample_ns >= horizon:
+                self._write_event(index, sample_ns, words)
+        self._history.clear()
+        self._full_until_ns = max(self._full_until_ns, timestamp_ns + self.post_ns)
+
+    def _write_event(self, index, timestamp_ns, words):
+        self._event_rows.add(index, (timestamp_ns - self.start_ns) / 1e9, words)
+        self._event_rows.write_to(self.event_sink)
+
+    def _emit_bucket(self):
+        if not self._count:
+            return
+        mean = self._sum / self._count * SCALE
+        minimum = self._min * SCALE
+        maximum = self._max * SCALE
+        minutes = self._bucket * self.bucket_ns / 60e9
+        self.buckets_written += 1
+        self.summary_sink.write(self._summary_format % (
+            (self.buckets_written, minutes) + tuple(mean) + (self._count,)
+            + tuple(minimum) + tuple(maximum)))
+        self._count = 0
+        self._sum[:] = 0
+
+    def close(self):
+        if self.start_ns is not None:
+            self._apply_pending()
+        self._emit_bucket()
+        self.summary_sink.close()
+        if self.event_sink is not None:
+            self.event_sink.close()
+
+
+async def write_decimated(subscription, decimator):
+    """AcquisitionService consumer feeding every sample to a ``Decimator``."""
+    decimator.open()
+    try:
+        async for sample in subscription:
+            decimator.add(sample.index, sample.timestamp_ns, sample.words)
+    finally:
+        decimator.close()
@@ -0,0 +1,106 @@
+"""
+Vectorised decoding of recorded raw potentiostat byte streams.
+
+Where ``FrameSynchronizer`` works on the live serial stream a few bytes at
+a time, these functions take a whole raw capture (for example a file of
+bytes dumped straight from the serial port) and decode it in a handful of
+NumPy operations.
+
+"""
+
+import os
+
+import numpy as np
+
+from potentiostat.framing import HEADER, CONTROL_BYTE, END_BYTE, FRAME_LENGTH, GAIN, TEMPERATURE_SCALE
+
+
+def find_frames(raw, package_length=FRAME_LENGTH):
+    """
+    Locate all valid frames in a raw byte stream.
+
+    Parameters
+    ----------
+    raw : bytes-like or numpy.ndarray
+        Raw bytes as read from the serial port.
+    package_length : int, optional
+        Length of one frame in bytes. The default is 25.
+
+    Returns
+    -------
+    starts : numpy.ndarray
+        Byte offsets of the accepted frames.
+    frames : numpy.ndarray
+        (N, package_length) uint8 array with the frames themselves.
+
+    """
+    data = np.frombuffer(raw, dtype=np.uint8) if not isinstance(raw, np.ndarray) else raw
+    last = len(data) - package_length
+    if last < 0:
+        return np.zeros(0, dtype=np.int64), np.zeros((0, package_length), dtype=np.uint8)
+
+    # Header candidates: every offset where the four header bytes line up
+    span = data[:last + 1]
+    mask = span == HEADER[0]
+    for k in range(1, len(HEADER)):
+        mask &= data[k:last + 1 + k] == HEADER[k]
+    starts = np.flatnonzero(mask)
+
+    frames = data[starts[:, None] + np.arange(package_length)]
+    checksum = frames[:, 4:package_length - 2].sum(axis=1, dtype=np.uint32) & 0xFF
+    valid = ((frames[:, 4] == CONTROL_BYTE)
+             & (frames[:, package_length - 1] == END_BYTE)
+             & (frames[:, package_length - 2] == checksum))
+    starts = starts[valid]
+    frames = frames[valid]
+
+    # A header pattern inside an accepted frame's data is not a new frame.
+    # Overlaps are rare, so only then fall back to a sequential pass that
+    # mirrors FrameSynchronizer.
+    if len(starts) > 1 and np.any(np.diff(starts) < package_length):
+        keep = np.ones(len(starts), dtype=bool)
+        frame_end = -1
+        for i, start in enumerate(starts.tolist()):
+            if start < frame_end:
+                keep[i] = False
+            else:
+                frame_end = start + package_length
+        starts = starts[keep]
+        frames = frames[keep]
+    return starts, frames
+
+
+def frames_to_words(frames, package_length=FRAME_LENGTH):
+    """Big endian int16 data words of an (N, package_length) frame array."""
+    count = (package_length - 7) // 2
+    payload = np.ascontiguousarray(frames[:, 5:5 + 2 * count])
+    return payload.view('>i2').reshape(len(frames), count)
+
+
+def decode_stream(raw, package_length=FRAME_LENGTH, return_offsets=False):
+    """
+    Decode every valid frame in a raw byte stream.
+
+    Returns an (N, 7) float array with the six channel currents in nA and
+    the temperature in °C, the same values ``convert_data`` produces before
+    rounding. With ``return_offsets`` the byte offset of every frame is
+    returned as well.
+    """
+    starts, frames = find_frames(raw, package_length)
+    words = frames_to_words(frames, package_length)
+    out = np.empty((len(words), 7), dtype=np.float64)
+    np.multiply(words[:, 0:6], GAIN, out=out[:, 0:6])
+    np.divide(words[:, 6], TEMPERATURE_SCALE, out=out[:, 6])
+    if return_offsets:
+        return out, starts
+    return out
+
+
+def decode_file(filename, package_length=FRAME_LENGTH, return_offsets=False):
+    """Decode a file of raw serial bytes without reading it into Python objects."""
+    # np.memmap refuses empty files
+    if os.path.getsize(filename) == 0:
+        raw = np.zeros(0, dtype=np.uint8)
+    else:
+        raw = np.memmap(filename, dtype=np.uint8, mode='r')
+    return decode_stream(raw, package_length, return_offsets)
@@ -0,0 +1,221 @@
+"""
+Pseudo-terminal potentiostat emulator.
+
+Creates a pty pair and streams valid frames into it, so the
+PotentiostatReader classes can be pointed at the printed device path
+instead of /dev/ttyUSB0. Frame rate, emulated baud rate and the amount of
+corruption (noise bytes, bad checksums, frames cut in the middle) are
+configurable, which makes it possible to measure throughput, resync
+behaviour and CPU cost without the hardware. Linux/macOS only.
+
+Example
+-------
+    python -m potentiostat.emulator --rate 200 --baud_rate 115200 --noise 0.01
+
+"""
+
+import math
+import os
+import random
+import threading
+import time
+import tty
+
+from potentiostat.framing import encode_frame, FRAME_LENGTH, GAIN, TEMPERATURE_SCALE
+
+
+class Waveform:
+    """
+    Plausible six channel signal: alternating buffer/standard steps per
+    channel with a slow drift, a small sine ripple and gaussian noise.
+    Currents are in nA, the temperature hovers around 37 °C.
+
+    Parameters
+    ----------
+    step_period : float, optional
+        Seconds between buffer and standard steps. The default is 90.
+    noise : float, optional
+        Standard deviation of the noise in nA. The default is 0.01.
+    seed : int, optional
+        Seed of the random generator.
+
+    """
+    BASELINE = [1.2, 0.8, 1.0, 0.6, 2.5, 3.0]
+    STEP = [2.0, 0.0, 1.5, 0.0, 4.0, 6.0]
+
+    def __init__(self, step_period=90.0, noise=0.01, seed=None):
+        self.step_period = step_period
+        self.noise = noise
+        self.random = random.Random(seed)
+
+    def words(self, t):
+        standard = int(t // self.step_period) % 2
+        drift = 0.002 * t / 60
+        words = []
+        for channel in range(6):
+            current = (self.BASELINE[channel] + standard * self.STEP[channel] + drift
+                       + 0.05 * math.sin(2 * math.pi * t / 30 + channel)
+                       + self.random.gauss(0, self.noise))
+            words.append(max(-32768, min(32767, int(round(current / GAIN)))))
+        temperature = 37 + 0.2 * math.sin(2 * math.pi * t / 600)
+        words.append(int(round(temperature * TEMPERATURE_SCALE)))
+        return words
+
+
+class PotentiostatEmulator:
+    """
+    Streams frames into a pseudo-terminal.
+
+    Frames that do not fit into the pty because nothing reads it are
+    counted in ``frames_dropped`` and ``bytes_dropped`` instead of blocking.
+
+    Parameters
+    ----------
+    rate : float, optional
+        Frames per second. The default is 10.
+    baud_rate : int, optional
+        Emulated line speed; the frame rate is capped at what fits through
+        it (10 bits per byte). The default is 9600.
+    noise : float, optional
+        Probability of inserting a few garbage bytes before a frame.
+    bad_checksum : float, optional
+        Probability that a frame carries a wrong checksum.
+    gaps : float, optional
+        Probability that a frame is cut in the middle and the rest is never
+        sent, as when the cable glitches.
+    waveform : Waveform, optional
+        Signal source. A default ``Waveform`` is used if omitted.
+    seed : int, optional
+        Seed for the corruption decisions.
+
+    """
+    def __init__(self, rate=10.0, baud_rate=9600, noise=0.0, bad_checksum=0.0, gaps=0.0,
+                 waveform=None, seed=None, package_length=FRAME_LENGTH):
+        self.rate = rate
+        self.baud_rate = baud_rate
+        self.noise = noise
+        self.bad_checksum = bad_checksum
+        self.gaps = gaps
+        self.waveform = waveform if waveform is not None else Waveform(seed=seed)
+        self.package_length = package_length
+        self.random = random.Random(seed)
+        self.port = None
+        self.frames_sent = 0
+        self.frames_corrupted = 0
+        self.frames_dropped = 0
+        self.bytes_sent = 0
+        self.bytes_dropped = 0
+        self._master = None
+        self._slave = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def frame_interval(self):
+        line_time = self.package_length * 10 / self.baud_rate
+        return max(1 / self.rate, line_time)
+
+    def open(self):
+        self._master, self._slave = os.openpty()
+        tty.setraw(self._slave)
+        # A full pty must not block the stream thread, see _stream
+        os.set_blocking(self._master, False)
+        self.port = os.ttyname(self._slave)
+        return self.port
+
+    def start(self):
+        if self._master is None:
+            self.open()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._stream, name="potentiostat-emulator", daemon=True)
+        self._thread.start()
+        return self.port
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def close(self):
+        self.stop()
+        for fd in (self._master, self._slave):
+            if fd is not None:
+                os.close(fd)
+        self._master = self._slave = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def next_chunk(self, t):
+        """Bytes for the frame at time ``t``, with any configured corruption."""
+        frame = bytearray(encode_frame(self.waveform.words(t), self.package_length))
+        chunk = bytearray()
+        corrupted = False
+        if self.random.random() < self.noise:
+            chunk += bytes(self.random.randrange(256) for _ in range(self.random.randint(1, 8)))
+            corrupted = True
+        if self.random.random() < self.bad_checksum:
+            frame[-2] = (frame[-2] + 1) & 0xFF
+            corrupted = True
+        if self.random.random() < self.gaps:
+            frame = frame[:self.random.randint(1, self.package_length - 1)]
+            corrupted = True
+        self.frames_corrupted += corrupted
+        return bytes(chunk + frame)
+
+    def _stream(self):
+        interval = self.frame_interval
+        start = time.monotonic()
+        next_time = start
+        while not self._stop.is_set():
+            now = time.monotonic()
+            if now < next_time:
+                time.sleep(min(next_time - now, 0.05))
+                continue
+            chunk = self.next_chunk(next_time - start)
+            try:
+                written = os.write(self._master, chunk)
+            except BlockingIOError:
+                written = 0
+            except OSError:
+                break
+            self.bytes_sent += written
+            if written == len(chunk):
+                self.frames_sent += 1
+            else:
+                # Nobody drains the port: the rest is lost like on a full UART
+                self.frames_dropped += 1
+                self.bytes_dropped += len(chunk) - written
+            next_time += interval
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Potentiostat emulator on a pseudo-terminal")
+    parser.add_argument("--rate", type=float, default=10.0, help="Frames per second")
+    parser.add_argument("--baud_rate", type=int, default=9600, help="Emulated baud rate")
+    parser.add_argument("--noise", type=float, default=0.0, help="Probability of garbage bytes before a frame")
+    parser.add_argument("--bad_checksum", type=float, default=0.0, help="Probability of a wrong checksum")
+    parser.add_argument("--gaps", type=float, default=0.0, help="Probability of a frame cut in the middle")
+    parser.add_argument("--seed", type=int, default=None, help="Random seed")
+    args = parser.parse_args()
+
+    emulator = PotentiostatEmulator(rate=args.rate, baud_rate=args.baud_rate, noise=args.noise,
+                                    bad_checksum=args.bad_checksum, gaps=args.gaps, seed=args.seed)
+    port = emulator.start()
+    print(f"Emulated potentiostat on {port} ({1 / emulator.frame_interval:.1f} frames/s)")
+    try:
+        while True:
+            time.sleep(5)
+            print(f"Sent {emulator.frames_sent} frames, {emulator.frames_corrupted} corrupted, "
+                  f"{emulator.frames_dropped} dropped")
+    except KeyboardInterrupt:
+        print("Emulator stopped by user.")
+    finally:
+        emulator.close()
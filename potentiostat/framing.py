@@ -0,0 +1,139 @@
+"""
+Frame synchronisation for the potentiostat serial stream.
+
+The potentiostat sends fixed length frames laid out as
+
+    0x68 0x13 0x13 0x68 0x04 <18 data bytes> <checksum> 0x16
+
+where the checksum is the low byte of the sum of everything between the
+header and the checksum (the 0x04 control byte plus the data bytes) and the
+data bytes are nine big endian signed 16 bit words (six channel currents,
+the temperature word and two unused words).
+
+"""
+
+import struct
+
+HEADER = b"\x68\x13\x13\x68"
+CONTROL_BYTE = 0x04
+END_BYTE = 0x16
+FRAME_LENGTH = 25
+GAIN = 50 / (2**15 - 1)  # channel counts to nA
+TEMPERATURE_SCALE = 16  # temperature word counts per °C
+
+
+def frame_checksum(frame, offset=0, package_length=FRAME_LENGTH):
+    """Checksum of the frame starting at ``offset`` in ``frame``."""
+    return sum(frame[offset + 4:offset + package_length - 2]) & 0xFF
+
+
+def decode_frame(frame, package_length=FRAME_LENGTH):
+    """
+    Decode the data words of a validated frame.
+
+    Returns the same list of signed integers as
+    ``PotentiostatReader.process_data_block``.
+    """
+    count = (package_length - 7) // 2
+    return list(struct.unpack_from(f">{count}h", frame, 5))
+
+
+def encode_frame(words, package_length=FRAME_LENGTH):
+    """Build a valid frame around the given data words (inverse of ``decode_frame``)."""
+    count = (package_length - 7) // 2
+    words = list(words) + [0] * (count - len(words))
+    body = bytes([CONTROL_BYTE]) + struct.pack(f">{count}h", *words)
+    return HEADER + body + bytes([sum(body) & 0xFF, END_BYTE])
+
+
+class FrameSynchronizer:
+    """
+    Byte stream to frame synchroniser backed by a single bytearray.
+
+    Bytes are appended with ``feed`` and complete frames are taken out with
+    ``frames``. Consumed bytes are only dropped from the front of the buffer
+    once they make up more than half of it, so a read costs one append and
+    a header search instead of a list shift per byte.
+
+    Parameters
+    ----------
+    package_length : int
+        Length of one frame in bytes. The default is 25.
+    max_buffer : int
+        Upper bound on unconsumed bytes kept while waiting for a header.
+        Older bytes are discarded when it is exceeded. The default is 65536.
+
+    """
+    def __init__(self, package_length=FRAME_LENGTH, max_buffer=65536):
+        self.package_length = package_length
+        self.max_buffer = max_buffer
+        self._buffer = bytearray()
+        self._start = 0
+        # Counters describing the health of the stream
+        self.frames_ok = 0
+        self.checksum_errors = 0
+        self.bytes_discarded = 0
+        self.resyncs = 0
+
+    def __len__(self):
+        return len(self._buffer) - self._start
+
+    def reset(self):
+        self._buffer.clear()
+        self._start = 0
+
+    def feed(self, data):
+        """Append raw bytes read from the serial port."""
+        if self._start and self._start * 2 >= len(self._buffer):
+            del self._buffer[:self._start]
+            self._start = 0
+        self._buffer += data
+        overflow = len(self) - self.max_buffer
+        if overflow > 0:
+            self._start += overflow
+            self.bytes_discarded += overflow
+            self.resyncs += 1
+
+    def frames(self):
+        """
+        Return every complete and valid frame currently buffered.
+
+        Bytes in front of a header are discarded and invalid frames are
+        skipped one byte at a time until the next header, so the stream
+        resynchronises on its own after noise or a dropped byte. A trailing
+        partial frame stays buffered for the next call.
+        """
+        buf = self._buffer
+        length = self.package_length
+        start = self._start
+        end = len(buf)
+        found = []
+        while True:
+            idx = buf.find(HEADER, start)
+            if idx < 0:
+                # Keep a possible partial header at the end of the buffer
+                keep = max(start, end - len(HEADER) + 1)
+                if keep > start:
+                    self.bytes_discarded += keep - start
+                    self.resyncs += 1
+                start = keep
+                break
+            if idx > start:
+                self.bytes_discarded += idx - start
+                self.resyncs += 1
+                start = idx
+            if end - idx < length:
+                break
+            if (buf[idx + 4] == CONTROL_BYTE
+                    and buf[idx + length - 1] == END_BYTE
+                    and buf[idx + length - 2] == frame_checksum(buf, idx, length)):
+                found.append(bytes(buf[idx:idx + length]))
+                self.frames_ok += 1
+                start = idx + length
+            else:
+                # Not a real frame, look for the next header after this one
+                self.checksum_errors += 1
+                self.bytes_discarded += 1
+                start = idx + 1
+        self._start = start
+        return found
@@ -0,0 +1,184 @@
+"""
+Health counters and latency histograms for the potentiostat readers.
+
+Every ``PotentiostatReader`` carries a ``ReaderMetrics`` instance. The hot
+path only increments integers and drops a latency into a fixed bucket, so
+the metrics stay on all the time. They can be pulled as a dict with
+``snapshot()`` or written periodically as a Prometheus text file (for the
+node exporter's textfile collector, or just to ``cat`` on the Pi).
+
+"""
+
+import os
+import time
+from bisect import bisect_left
+
+# Bucket upper bounds in seconds, 50 µs to 1 s
+LATENCY_BUCKETS = (50e-6, 100e-6, 250e-6, 500e-6, 1e-3, 2.5e-3, 5e-3, 10e-3,
+                   25e-3, 50e-3, 100e-3, 250e-3, 500e-3, 1.0)
+
+
+class LatencyHistogram:
+    """
+    Fixed bucket latency histogram.
+
+    Parameters
+    ----------
+    buckets : tuple of float, optional
+        Sorted bucket upper bounds in seconds. The default is
+        ``LATENCY_BUCKETS``.
+
+    """
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # last one is +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds):
+        self.counts[bisect_left(self.buckets, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the ``q`` quantile."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return self.max
+
+    def snapshot(self):
+        return {
+            'count': self.count,
+            'sum': self.sum,
+            'max': self.max,
+            'p50': self.quantile(0.5),
+            'p99': self.quantile(0.99),
+            'buckets': dict(zip(self.buckets + (float('inf'),), self.counts)),
+        }
+
+
+class ReaderMetrics:
+    """
+    Counters and histograms of one reader.
+
+    Parameters
+    ----------
+    framer : FrameSynchronizer, optional
+        Its frame, checksum, discard and resync counters are included.
+    sink : OutputSink, optional
+        Its current part number is included.
+    filename : string, optional
+        Prometheus text file written by ``poll``. The default is None
+        (no file).
+    interval : float, optional
+        Seconds between writes of ``filename``. The default is 10.
+    labels : dict, optional
+        Labels added to every metric, for example ``{'port': 'COM3'}``.
+
+    """
+    def __init__(self, framer=None, sink=None, filename=None, interval=10.0, labels=None):
+        self.framer = framer
+        self.sink = sink
+        self.filename = filename
+        self.interval = interval
+        self.labels = dict(labels or {})
+        self.started = time.time()
+        self.reads = 0
+        self.empty_reads = 0
+        self.bytes_read = 0
+        self.samples = 0
+        self.incomplete_samples = 0
+        self.read_latency = LatencyHistogram()
+        self.sample_latency = LatencyHistogram()
+        self._last_export = time.monotonic()
+
+    def record_read(self, nbytes, seconds):
+        self.reads += 1
+        self.bytes_read += nbytes
+        if not nbytes:
+            self.empty_reads += 1
+        self.read_latency.observe(seconds)
+
+    def record_sample(self, seconds):
+        self.samples += 1
+        self.sample_latency.observe(seconds)
+
+    def snapshot(self):
+        """Current values as a plain dict."""
+        snapshot = {
+            'uptime_seconds': time.time() - self.started,
+            'reads': self.reads,
+            'empty_reads': self.empty_reads,
+            'bytes_read': self.bytes_read,
+            'samples': self.samples,
+            'incomplete_samples': self.incomplete_samples,
+            'read_latency': self.read_latency.snapshot(),
+            'sample_latency': self.sample_latency.snapshot(),
+        }
+        if self.framer is not None:
+            snapshot.update({
+                'frames_ok': self.framer.frames_ok,
+                'checksum_errors': self.framer.checksum_errors,
+                'bytes_discarded': self.framer.bytes_discarded,
+                'resyncs': self.framer.resyncs,
+                'buffered_bytes': len(self.framer),
+            })
+        if self.sink is not None:
+            snapshot['output_part'] = self.sink.part
+        return snapshot
+
+    def prometheus_text(self, prefix='potentiostat'):
+        """Snapshot in the Prometheus text exposition format."""
+        labels = ",".join(f'{key}="{value}"' for key, value in self.labels.items())
+        lines = []
+
+        def sample(name, value, extra=""):
+            label_text = ",".join(x for x in (labels, extra) if x)
+            lines.append(f"{prefix}_{name}{{{label_text}}} {value}" if label_text
+                         else f"{prefix}_{name} {value}")
+
+        snapshot = self.snapshot()
+        for name, value in snapshot.items():
+            if isinstance(value, dict):
+                continue
+            kind = 'gauge' if name in ('uptime_seconds', 'buffered_bytes', 'output_part') else 'counter'
+            metric = name if kind == 'gauge' else f"{name}_total"
+            lines.append(f"# TYPE {prefix}_{metric} {kind}")
+            sample(metric, value)
+        for name in ('read_latency', 'sample_latency'):
+            histogram = getattr(self, name)
+            lines.append(f"# TYPE {prefix}_{name}_seconds histogram")
+            cumulative = 0
+            for bound, count in zip(histogram.buckets + (float('inf'),), histogram.counts):
+                cumulative += count
+                le = "+Inf" if bound == float('inf') else repr(bound)
+                sample(f"{name}_seconds_bucket", cumulative, f'le="{le}"')
+            sample(f"{name}_seconds_sum", histogram.sum)
+            sample(f"{name}_seconds_count", histogram.count)
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, filename=None):
+        """Write the text file atomically so a scraper never sees half of it."""
+        filename = filename or self.filename
+        temporary = filename + ".tmp"
+        with open(temporary, 'w') as file:
+            file.write(self.prometheus_text())
+        os.replace(temporary, filename)
+
+    def poll(self):
+        """Write ``filename`` if the export interval has passed."""
+        if self.filename is None:
+            return
+        now = time.monotonic()
+        if now - self._last_export >= self.interval:
+            self._last_export = now
+            self.write_prometheus()
@@ -0,0 +1,245 @@
+"""
+Concurrent acquisition from several potentiostats with a merged timeline.
+
+Each potentiostat gets its own reader thread that does nothing but read,
+frame and decode, stamping every batch of frames with ``time.monotonic_ns``
+on arrival. The frames of all devices meet in one thread safe queue and
+``MultiPotentiostatAcquisition.merged`` hands them out in time order.
+``WideRowWriter`` turns the merged stream into BioMon style rows with one
+sensor block (#1 to #4) per device.
+
+"""
+
+import heapq
+import queue
+import threading
+import time
+from collections import namedtuple
+
+from potentiostat.capture import biomon_stamp
+from potentiostat.framing import decode_frame, GAIN, TEMPERATURE_SCALE
+
+BLOCKS = 4
+CHANNELS_PER_BLOCK = 16
+
+DeviceSample = namedtuple('DeviceSample', ['timestamp_ns', 'device', 'sequence', 'words'])
+
+
+class MultiPotentiostatAcquisition:
+    """
+    Reads several potentiostats at once, one thread per serial port.
+
+    Parameters
+    ----------
+    readers : list of PotentiostatReader
+        One reader per device; the list index is the device number and
+        becomes sensor block #(index + 1) in the wide row output.
+    reorder_window : float, optional
+        Seconds a frame is held back so frames from slower threads can be
+        put in front of it. The default is 0.05.
+
+    """
+    def __init__(self, readers, reorder_window=0.05):
+        self.readers = list(readers)
+        self.reorder_window = reorder_window
+        self.frame_counts = [0] * len(self.readers)
+        self.errors = [None] * len(self.readers)
+        self._queue = queue.Queue()
+        self._stop = threading.Event()
+        self._threads = []
+
+    def start(self):
+        self._stop.clear()
+        for device, reader in enumerate(self.readers):
+            thread = threading.Thread(target=self._read_loop, args=(device, reader),
+                                      name=f"potentiostat-{device + 1}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self):
+        self._stop.set()
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+        for reader in self.readers:
+            reader.close_serial_connection()
+
+    @property
+    def running(self):
+        return any(thread.is_alive() for thread in self._threads)
+
+    def _read_loop(self, device, reader):
+        sequence = 0
+        try:
+            reader.open_serial_connection()
+            while not self._stop.is_set():
+                reader.read_frames()
+                arrival_ns = time.monotonic_ns()
+                while reader.pending_frames:
+                    words = decode_frame(reader.pending_frames.popleft(), reader.package_length)
+                    self._queue.put(DeviceSample(arrival_ns, device, sequence, words))
+                    sequence += 1
+                self.frame_counts[device] = sequence
+        except Exception as e:
+            # Keep the other devices running and report the failure
+            self.errors[device] = e
+            print(f"Potentiostat {device + 1} stopped: {e}")
+
+    def merged(self):
+        """
+        Yield ``DeviceSample`` tuples of all devices in arrival order.
+
+        Runs until every reader thread has exited (after ``stop``, or when
+        all devices failed; see ``errors``) and every queued frame was
+        handed out.
+        """
+        heap = []
+        window_ns = int(self.reorder_window * 1e9)
+        while True:
+            try:
+                heapq.heappush(heap, self._queue.get(timeout=self.reorder_window))
+                while True:
+                    heapq.heappush(heap, self._queue.get_nowait())
+            except queue.Empty:
+                pass
+            # A thread queues all its frames before it exits, so check it first
+            if not self.running and self._queue.empty():
+                while heap:
+                    yield heapq.heappop(heap)
+                return
+            horizon = time.monotonic_ns() - window_ns
+            while heap and heap[0].timestamp_ns <= horizon:
+                yield heapq.heappop(heap)
+
+
+def biomon_columns(blocks=BLOCKS, channels_per_block=CHANNELS_PER_BLOCK):
+    names = ["counter", "t[min]"]
+    for block in range(1, blocks + 1):
+        names.extend(f"#{block}ch{channel}" for channel in range(1, channels_per_block + 1))
+    return names
+
+
+class WideRowWriter:
+    """
+    Writes the merged stream as BioMon style wide rows.
+
+    The rows follow the layout of ``template_file`` (example_format.txt):
+    counter, t[min], the 64 sensor channels #1ch1 to #4ch16 and zeros up
+    to ``columns`` entries, like the rows of export_biomon. The column
+    header is copied from the template.
+
+    Frames within ``align_window`` of each other are aligned into one row
+    holding at most one frame per device. A row is written once every
+    device is in it, or earlier when a device sends a second frame or a
+    frame arrives later than the window, so no frame is overwritten and
+    rows keep coming if a device stops. Blocks without a frame in the row
+    repeat their most recent values (zeros until their first frame).
+    Channels 1 to 6 of a block hold the currents in nA and ch7 the
+    temperature, the remaining channels are zero.
+
+    Parameters
+    ----------
+    sink : OutputSink
+        Where the rows go.
+    devices : int
+        Number of devices, at most ``blocks``.
+    align_window : float, optional
+        Seconds after the first frame of a row in which frames of the other
+        devices join it. The default is 0.05.
+    template_file : string, optional
+        BioMon file whose column header is used. The default is
+        "example_format.txt".
+    columns : int, optional
+        Number of entries per row. The default is 83.
+    blocks : int, optional
+        Number of sensor blocks in the layout. The default is 4.
+
+    """
+    def __init__(self, sink, devices, align_window=0.05, template_file="example_format.txt",
+                 columns=83, blocks=BLOCKS):
+        if devices > blocks:
+            raise ValueError(f"Only {blocks} sensor blocks fit in the BioMon layout")
+        self.sink = sink
+        self.devices = devices
+        self.align_window_ns = int(align_window * 1e9)
+        self.template_file = template_file
+        self.blocks = blocks
+        self.counter = 1
+        self.start_ns = None
+        zero_block = "\t".join(["0"] * CHANNELS_PER_BLOCK)
+        self._block_text = [zero_block] * blocks
+        self._padding = "\t0" * (columns - len(biomon_columns(blocks)))
+        # Devices with a frame in the row being collected and its time
+        self._row_devices = set()
+        self._row_ns = None
+
+    def open(self):
+        with open(self.template_file, 'r') as template:
+            template_lines = template.readlines()
+        names = template_lines[1].rstrip("\n").split("\t") if len(template_lines) > 1 else []
+        expected = biomon_columns(self.blocks)
+        if names[:len(expected)] != expected:
+            raise ValueError(f"Template file {self.template_file} has no BioMon column header")
+        now = time.time()
+        self.sink.open(biomon_stamp("Created", now) + template_lines[1] + biomon_stamp("Start", now))
+
+    def add(self, sample):
+        if self.start_ns is None:
+            self.start_ns = sample.timestamp_ns
+        if self._row_devices and (sample.device in self._row_devices
+                                  or sample.timestamp_ns - self._row_ns > self.align_window_ns):
+            self.flush()
+        if not self._row_devices:
+            self._row_ns = sample.timestamp_ns
+        self._row_devices.add(sample.device)
+        words = sample.words
+        values = [f"{x * GAIN:.3f}" for x in words[0:6]]
+        values.append(f"{words[6] / TEMPERATURE_SCALE:.3f}" if len(words) > 6 else "0")
+        values.extend(["0"] * (CHANNELS_PER_BLOCK - len(values)))
+        self._block_text[sample.device] = "\t".join(values)
+        if len(self._row_devices) == self.devices:
+            self.flush()
+
+    def flush(self):
+        """Write the row being collected, if any."""
+        if not self._row_devices:
+            return
+        minutes = (self._row_ns - self.start_ns) / 60e9
+        self.sink.write(f"{self.counter}\t{minutes:.4f}\t" + "\t".join(self._block_text)
+                        + self._padding + "\n")
+        self.counter += 1
+        self._row_devices.clear()
+
+    def close(self):
+        self.flush()
+        self.sink.close()
+
+
+if __name__ == "__main__":
+    import argparse
+    from potentiostat.reader import PotentiostatReader
+    from potentiostat.sinks import OutputSink
+
+    parser = argparse.ArgumentParser(description="Multi Potentiostat Data Reader")
+    parser.add_argument("--com_ports", type=str, nargs="+", required=True, help="COM ports in sensor block order")
+    parser.add_argument("--baud_rate", type=int, default=9600, help="Baud rate for serial communication")
+    parser.add_argument("--timeout", type=float, default=0.5, help="Timeout for serial communication")
+    parser.add_argument("--output_filename", type=str, default="out_data.txt", help="File to save the output data")
+    parser.add_argument("--template_file", type=str, default="example_format.txt", help="File path of the template")
+    args = parser.parse_args()
+
+    readers = [PotentiostatReader(com_port=port, baud_rate=args.baud_rate, timeout=args.timeout)
+               for port in args.com_ports]
+    acquisition = MultiPotentiostatAcquisition(readers)
+    writer = WideRowWriter(OutputSink(args.output_filename), len(readers),
+                           template_file=args.template_file)
+    writer.open()
+    acquisition.start()
+    try:
+        for sample in acquisition.merged():
+            writer.add(sample)
+    except KeyboardInterrupt:
+        print("Data collection stopped by user.")
+    finally:
+        acquisition.stop()
+        writer.close()
@@ -0,0 +1,367 @@
+"""
+Shared potentiostat reader used by every datalogger script.
+
+``PotentiostatReader`` owns the serial port, the frame synchroniser, the
+output sink and the optional binary capture. What differs between the old
+reader copies is only the text layout, which lives in the output formats:
+
+    SampleTableFormat   Sample, Time/s, Ch1-Ch6, T, zero padded to 83
+                        columns (SIX_SERVER_READER, SIX_SERVER_READER_2)
+    TemplateFormat      example_format.txt header, then rows in its
+                        columns: counter, t[min], Ch1-Ch6 and T in #1ch7,
+                        zero padded to 83 columns (SIX_SERVER_READER_3)
+    TimeTableFormat     Time/s and Ch1-Ch6, header only on request
+                        (jobst_data_server)
+
+The old modules are thin shims that pick the matching format and keep
+their method names (write_header, write_template, line_one). Every format
+compiles its rows into a ``RowFormatter`` (see potentiostat.rows), which
+``run`` and ``run_batch`` both write through.
+
+"""
+
+import argparse
+import os
+import time
+from collections import deque
+
+import serial
+
+from potentiostat.capture import CaptureWriter
+from potentiostat.framing import FrameSynchronizer, decode_frame, GAIN, TEMPERATURE_SCALE
+from potentiostat.metrics import ReaderMetrics
+from potentiostat.rows import RowFormatter
+from potentiostat.sinks import OutputSink
+
+
+class SampleTableFormat:
+    """Layout of SIX_SERVER_READER and SIX_SERVER_READER_2."""
+    auto_header = True
+
+    def __init__(self, columns=83):
+        self.columns = columns
+
+    columns_header = "Sample\tTime/s\tCh1/nA\tCh2/nA\tCh3/nA\tCh4/nA\tCh5/nA\tCh6/nA\tT/°C"
+
+    def header(self):
+        print(self.columns_header)
+        return self.columns_header + "\n"
+
+    def formatter(self):
+        return RowFormatter.from_header(self.columns_header.split("\t"), self.columns)
+
+
+class TemplateFormat:
+    """Layout of SIX_SERVER_READER_3: the BioMon template as header."""
+    auto_header = True
+
+    def __init__(self, template_file="example_format.txt", columns=83):
+        self.template_file = template_file
+        self.columns = columns
+        self._template = None
+
+    def header(self):
+        # Read once; rotated files reuse the cached text
+        if self._template is None:
+            if not os.path.exists(self.template_file):
+                print(f"Template file {self.template_file} not found.")
+                raise FileNotFoundError(self.template_file)
+            with open(self.template_file, 'r') as template:
+                self._template = template.read()
+        return self._template
+
+    def formatter(self):
+        # The template's columns: counter, t[min], #1ch1-#1ch6, temperature
+        # in #1ch7, zero padded
+        return RowFormatter.from_template(self.template_file, self.columns)
+
+
+class TimeTableFormat:
+    """Layout of jobst_data_server: time and the six currents."""
+    auto_header = False
+
+    def header(self):
+        first_line = "Time/s\tCh1/nA\tCh2/nA\tCh3/nA\tCh4/nA\tCh5/nA\tCh6/nA\tT/°C"
+        print(first_line)
+        return first_line + "\n"
+
+    def formatter(self):
+        return RowFormatter(['time', 'ch1', 'ch2', 'ch3', 'ch4', 'ch5', 'ch6'])
+
+
+class PotentiostatReader:
+    """
+    Reads, validates and logs frames from one potentiostat.
+
+    Parameters
+    ----------
+    com_port : string
+    baud_rate : int, optional
+        The default is 9600.
+    timeout : float, optional
+        Serial read timeout in seconds. The default is 0.5.
+    package_length : int, optional
+        Frame length in bytes. The default is 25.
+    output_filename : string, optional
+        Text output file. The default is "out_data.txt".
+    sink : OutputSink, optional
+        Replaces the default sink on ``output_filename``.
+    capture_filename : string, optional
+        Binary capture file used by ``run_capture``.
+    output_format : object, optional
+        One of the format classes above. The default is
+        ``SampleTableFormat()``.
+    metrics_filename : string, optional
+        Prometheus text file with the reader's health metrics, rewritten
+        every ``metrics_interval`` seconds. The metrics are always
+        collected and available from ``metrics.snapshot()``.
+    metrics_interval : float, optional
+        The default is 10.
+
+    """
+    def __init__(self, com_port, baud_rate=9600, timeout=0.5, package_length=25,
+                 output_filename="out_data.txt", sink=None, capture_filename=None,
+                 output_format=None, metrics_filename=None, metrics_interval=10.0):
+        self.com_port = com_port
+        self.baud_rate = baud_rate
+        self.timeout = timeout
+        self.package_length = package_length
+        self.output_filename = output_filename
+        # Output file stays open for the whole run, see potentiostat.sinks
+        self.sink = sink if sink is not None else OutputSink(output_filename)
+        self.capture = CaptureWriter(capture_filename) if capture_filename else None
+        self.output_format = output_format if output_format is not None else SampleTableFormat()
+        self.data_block = [b'\x00'] * package_length
+        self.start_timestamp = None
+        self.serial_connection = None
+        self.sample_number = 1
+        self.last_sample_number = None
+        self.last_delta_time = None
+        self.header_written = False
+        self.framer = FrameSynchronizer(package_length)
+        self.pending_frames = deque()
+        self._sample_started = 0.0
+        self._formatter = None
+        self.metrics = ReaderMetrics(self.framer, self.sink, metrics_filename, metrics_interval,
+                                     labels={'port': com_port})
+
+    def open_serial_connection(self):
+        if self.serial_connection is None:
+            self.serial_connection = serial.Serial(self.com_port, baudrate=self.baud_rate, timeout=self.timeout)
+
+    def close_serial_connection(self):
+        if self.serial_connection is not None:
+            self.serial_connection.close()
+            self.serial_connection = None
+
+    # validate_data_block and process_data_block work on the old byte-wise
+    # shift register in self.data_block (newest byte first). The live path
+    # goes through the framer instead; they are kept for existing callers.
+    def validate_data_block(self):
+        header = [b'\x04', b'\x68', b'\x13', b'\x13', b'\x68']
+        cks = 0
+        for x in [int.from_bytes(x, 'big') for x in self.data_block[2:-4]]:
+            cks = (cks + x) & 0xFF
+        if (self.data_block[-5:] == header and
+                self.data_block[0] == b'\x16' and
+                int.from_bytes(self.data_block[1], 'big') == cks):
+            return True
+        return False
+
+    def process_data_block(self):
+        data_inv = [x for x in self.data_block[2:-5]]
+        data_inv.reverse()
+        it = iter(data_inv)
+        out_data = [
+            int.from_bytes(b''.join([x, next(it)]),
+                           byteorder='big',
+                           signed=True) for x in it]
+        return out_data
+
+    def convert_data(self, out_data):
+        to_insert = [str(round(int(x) * GAIN, 3)) for x in out_data[0:6]]
+        temperature = str(round(float(out_data[6]) / TEMPERATURE_SCALE, 3)) if len(out_data) > 6 else "0"
+        to_insert.append(temperature)
+        return to_insert
+
+    def write_header(self):
+        self.sink.open(self.output_format.header())
+        self.header_written = True
+
+    def close_sink(self):
+        self.sink.close()
+        if self.capture is not None:
+            self.capture.close()
+        if self.metrics.filename is not None:
+            self.metrics.write_prometheus()
+
+    def read_frames(self):
+        # Bulk read whatever is waiting, at least enough to finish a frame
+        waiting = max(self.serial_connection.in_waiting,
+                      self.package_length - len(self.framer))
+        started = time.perf_counter()
+        new_data = self.serial_connection.read(waiting)
+        self.metrics.record_read(len(new_data), time.perf_counter() - started)
+        if new_data:
+            self.framer.feed(new_data)
+            self.pending_frames.extend(self.framer.frames())
+
+    def _next_words(self):
+        # Decoded words of the next frame, numbered and timed, or None
+        self.open_serial_connection()
+        if not self.pending_frames:
+            self.read_frames()
+        if not self.pending_frames:
+            # Nothing complete and valid arrived within the timeout
+            return None
+
+        self._sample_started = time.perf_counter()
+        out_data = decode_frame(self.pending_frames.popleft(), self.package_length)
+        if len(out_data) < 6:
+            self.metrics.incomplete_samples += 1
+            print("Error: Data block is incomplete or missing values:", out_data)
+            return None
+
+        timestamp = round(time.time(), 4)
+        if self.start_timestamp is None:
+            self.start_timestamp = timestamp
+            delta_time = 0
+        else:
+            delta_time = timestamp - self.start_timestamp
+
+        self.last_sample_number = self.sample_number
+        self.last_delta_time = delta_time
+        self.sample_number += 1
+        return out_data
+
+    def get_data(self):
+        """Row of the next frame as a list of column strings, or None."""
+        words = self._next_words()
+        if words is None:
+            return None
+        line = self.formatter.format(self.last_sample_number, self.last_delta_time, words)
+        return line.rstrip("\n").split("\t")
+
+    def run_capture(self):
+        # Binary capture mode: store the raw words without building text rows
+        self.open_serial_connection()
+        self.read_frames()
+        timestamp_ns = time.monotonic_ns()
+        while self.pending_frames:
+            started = time.perf_counter()
+            out_data = decode_frame(self.pending_frames.popleft(), self.package_length)
+            self.capture.write(out_data, timestamp_ns)
+            self.metrics.record_sample(time.perf_counter() - started)
+        self.capture.poll()
+        self.metrics.poll()
+
+    @property
+    def formatter(self):
+        # Compiled on first use; the template is only read once
+        if self._formatter is None:
+            self._formatter = self.output_format.formatter()
+        return self._formatter
+
+    def run_batch(self):
+        """
+        Log every frame of one bulk read through the compiled row formatter.
+
+        Faster than ``run`` for continuous logging: rows are formatted from
+        the frame words without intermediate string lists and reach the
+        sink in a single write. All frames of one read share its arrival
+        time. Returns the number of samples written.
+        """
+        if not self.header_written and self.output_format.auto_header:
+            self.write_header()
+        self.open_serial_connection()
+        if not self.pending_frames:
+            self.read_frames()
+        if not self.pending_frames:
+            self.sink.poll()
+            self.metrics.poll()
+            return 0
+
+        started = time.perf_counter()
+        timestamp = round(time.time(), 4)
+        if self.start_timestamp is None:
+            self.start_timestamp = timestamp
+        delta_time = timestamp - self.start_timestamp
+        formatter = self.formatter
+        count = len(self.pending_frames)
+        while self.pending_frames:
+            words = decode_frame(self.pending_frames.popleft(), self.package_length)
+            formatter.add(self.sample_number, delta_time, words)
+            self.sample_number += 1
+        self.last_sample_number = self.sample_number - 1
+        formatter.write_to(self.sink)
+        elapsed = (time.perf_counter() - started) / count
+        for _ in range(count):
+            self.metrics.record_sample(elapsed)
+        self.metrics.poll()
+        return count
+
+    def run(self):
+        # Ensure the header is written only once
+        if not self.header_written and self.output_format.auto_header:
+            self.write_header()
+
+        words = self._next_words()
+        if words is None:
+            self.sink.poll()
+            self.metrics.poll()
+            return None
+        line = self.formatter.format(self.last_sample_number, self.last_delta_time, words)
+        self.sink.write(line)
+        # Decode, format and write time; the serial wait is in read_latency
+        self.metrics.record_sample(time.perf_counter() - self._sample_started)
+        self.metrics.poll()
+        # The row goes back as a list, like get_data(), for scripts that print it
+        return line.rstrip("\n").split("\t")
+
+
+def build_parser(template=False):
+    parser = argparse.ArgumentParser(description="Potentiostat Data Reader")
+    parser.add_argument("--com_port", type=str, required=True, help="COM port for the potentiostat")
+    parser.add_argument("--baud_rate", type=int, default=9600, help="Baud rate for serial communication")
+    parser.add_argument("--timeout", type=float, default=0.5, help="Timeout for serial communication")
+    parser.add_argument("--package_length", type=int, default=25, help="Expected package length for data")
+    parser.add_argument("--output_filename", type=str, default="out_data.txt", help="File to save the output data")
+    parser.add_argument("--capture_filename", type=str, default=None, help="Record a binary capture instead of text")
+    parser.add_argument("--metrics_filename", type=str, default=None, help="Prometheus text file with reader health metrics")
+    if template:
+        parser.add_argument("--template_file", type=str, default="example_format.txt", help="File path of the template")
+    return parser
+
+
+def main(reader_class, template=False):
+    """Command line entry point shared by the reader scripts."""
+    args = build_parser(template).parse_args()
+    kwargs = {}
+    if template:
+        kwargs['template_file'] = args.template_file
+    reader = reader_class(
+        com_port=args.com_port,
+        baud_rate=args.baud_rate,
+        timeout=args.timeout,
+        package_length=args.package_length,
+        output_filename=args.output_filename,
+        capture_filename=args.capture_filename,
+        metrics_filename=args.metrics_filename,
+        **kwargs
+    )
+    try:
+        if reader.capture is not None:
+            while True:
+                reader.run_capture()
+        else:
+            while True:
+                reader.run_batch()
+    except KeyboardInterrupt:
+        print("Data collection stopped by user.")
+    finally:
+        reader.close_serial_connection()
+        reader.close_sink()
+
+
+if __name__ == "__main__":
+    main(PotentiostatReader)
@@ -0,0 +1,125 @@
+"""
+Precompiled text rows for the potentiostat logs.
+
+Building a row used to mean a ``str(round(x * gain, 3))`` per channel, a
+list insert for the sample number and time, 70-odd ``"0"`` strings of
+padding and a join. ``RowFormatter`` compiles the column layout once into
+a single ``%`` format string in which the zero tail is a constant, so a
+row costs one tuple and one formatting call. Rows are collected in a
+reusable list and handed to the sink in one write per batch.
+
+The layout can be derived from a header line: the BioMon names of
+example_format.txt (counter, t[min], #1ch1 ... #1ch7) as well as the
+SIX_SERVER_READER names (Sample, Time/s, Ch1/nA ... T/°C) are understood.
+
+"""
+
+from operator import itemgetter
+
+from potentiostat.framing import GAIN, TEMPERATURE_SCALE
+
+# Values available to a row, in the order RowFormatter builds them
+FIELDS = ('sample', 'time', 'ch1', 'ch2', 'ch3', 'ch4', 'ch5', 'ch6', 'temperature')
+
+# Header names understood by RowFormatter.from_header
+HEADER_FIELDS = {
+    'counter': 'sample',
+    'Sample': 'sample',
+    't[min]': 'time',
+    'Time/s': 'time',
+    'T/°C': 'temperature',
+    '#1ch7': 'temperature',
+}
+for _channel in range(1, 7):
+    HEADER_FIELDS[f'#1ch{_channel}'] = f'ch{_channel}'
+    HEADER_FIELDS[f'Ch{_channel}/nA'] = f'ch{_channel}'
+
+
+class RowFormatter:
+    """
+    Compiled row layout with a reusable batch buffer.
+
+    Parameters
+    ----------
+    layout : list
+        One entry per column: a name from ``FIELDS`` or None for a column
+        that is always zero.
+    time_scale : float, optional
+        Factor applied to the time in seconds, 1/60 for minutes.
+        The default is 1.
+    time_format : string, optional
+        The default is "%.1f".
+    value_format : string, optional
+        Format of the currents and the temperature. The default is "%.3f".
+
+    """
+    def __init__(self, layout, time_scale=1.0, time_format="%.1f", value_format="%.3f"):
+        parts = []
+        order = []
+        for field in layout:
+            if field is None:
+                parts.append("0")
+                continue
+            if field not in FIELDS:
+                raise ValueError(f"Unknown row field {field!r}")
+            if field == 'sample':
+                parts.append("%d")
+            elif field == 'time':
+                parts.append(time_format)
+            else:
+                parts.append(value_format)
+            order.append(FIELDS.index(field))
+        if len(order) < 2:
+            raise ValueError("A row needs at least two fields")
+        self.layout = list(layout)
+        self.time_scale = time_scale
+        self.row_format = "\t".join(parts) + "\n"
+        self._pick = itemgetter(*order)
+        self._lines = []
+
+    @classmethod
+    def from_header(cls, names, columns=None, **kwargs):
+        """
+        Layout from the column names of a header line.
+
+        Unknown names become zero columns. With ``columns`` the layout is
+        cut or zero padded to that many columns.
+        """
+        layout = [HEADER_FIELDS.get(name.strip()) for name in names]
+        if columns is not None:
+            layout = layout[:columns] + [None] * (columns - len(layout))
+        if 't[min]' in names:
+            kwargs.setdefault('time_scale', 1 / 60)
+            kwargs.setdefault('time_format', "%.4f")
+        return cls(layout, **kwargs)
+
+    @classmethod
+    def from_template(cls, template_file="example_format.txt", columns=83, **kwargs):
+        """Layout from the column header (second line) of a BioMon template."""
+        with open(template_file, 'r') as template:
+            template.readline()
+            header = template.readline()
+        if not header:
+            raise ValueError(f"Template file {template_file} has no column header")
+        return cls.from_header(header.rstrip("\n").split("\t"), columns, **kwargs)
+
+    def format(self, sample_number, seconds, words):
+        """One row from the decoded frame words (see ``decode_frame``)."""
+        temperature = words[6] / TEMPERATURE_SCALE if len(words) > 6 else 0.0
+        values = (sample_number, seconds * self.time_scale,
+                  words[0] * GAIN, words[1] * GAIN, words[2] * GAIN,
+                  words[3] * GAIN, words[4] * GAIN, words[5] * GAIN, temperature)
+        return self.row_format % self._pick(values)
+
+    def add(self, sample_number, seconds, words):
+        """Format a row into the batch buffer."""
+        self._lines.append(self.format(sample_number, seconds, words))
+
+    def __len__(self):
+        return len(self._lines)
+
+    def write_to(self, sink):
+        """Hand the buffered rows to ``sink`` in one write and reset the buffer."""
+        if self._lines:
+            sink.write("".join(self._lines), samples=len(self._lines))
+            self._lines.clear()
@@ -0,0 +1,258 @@
+"""
+Shared memory ring of live samples for consumers in other processes.
+
+The acquisition process publishes every sample into a
+``multiprocessing.shared_memory`` block holding a small header and a ring
+of fixed width records (the same layout as the binary capture, see
+``potentiostat.capture.RECORD_DTYPE``). A monotonically increasing write
+sequence in the header tells readers how many records were ever written,
+so the GUI, the analysis and other processes can attach by name and pull
+new samples as zero-copy NumPy views without polling a text file.
+
+There is a single writer. It raises a claim sequence in the header before
+it overwrites a slot and the write sequence once the record is complete.
+Readers detect when the writer lapped them (they were more than
+``capacity`` records behind) or overwrote records while they were being
+copied, and report how many records they missed.
+
+Example
+-------
+    # acquisition process
+    ring = SharedSampleRing(name='potentiostat', create=True)
+    asyncio.run(service.run_with(publish_shared(service.subscribe(), ring), ...))
+
+    # any other process
+    reader = SampleRingReader('potentiostat')
+    while True:
+        records = reader.read()        # structured array of new records
+        ...
+
+"""
+
+import multiprocessing
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from potentiostat.capture import RECORD_DTYPE
+
+MAGIC = 0x50535452494E4731  # "PSTRING1"
+VERSION = 1
+HEADER_SIZE = 64
+# Header words
+_MAGIC, _VERSION, _CAPACITY, _RECORD_SIZE, _WRITE_SEQ, _START_NS, _CLAIM_SEQ = range(7)
+
+# Blocks created by this process, whose tracker registration belongs to the writer
+_created = set()
+
+
+def _attach(name):
+    # Attaching must not leave the block registered with a resource tracker
+    # of its own, or it gets unlinked when the consumer exits
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        pass
+    shm = shared_memory.SharedMemory(name=name)
+    # Before Python 3.13 attaching registers the block. Children started by
+    # multiprocessing (fork or spawn) share the tracker of their parent, where
+    # unregistering would drop the writer's own registration and make its
+    # unlink report a KeyError; only a process with its own tracker undoes it.
+    if multiprocessing.parent_process() is None and shm._name not in _created:
+        try:
+            from multiprocessing import resource_tracker
+            resource_tracker.unregister(shm._name, 'shared_memory')
+        except Exception:
+            pass
+    return shm
+
+
+class SharedSampleRing:
+    """
+    Writer side of the shared sample ring.
+
+    Parameters
+    ----------
+    name : string, optional
+        Name of the shared memory block. A random name is used if omitted;
+        it is available as ``ring.name`` for the readers.
+    capacity : int, optional
+        Number of records in the ring. The default is 65536 (about 1.5 MB,
+        almost two hours at 10 samples per second).
+    create : bool, optional
+        Create the block (acquisition side). The default is True.
+
+    """
+    def __init__(self, name=None, capacity=65536, create=True):
+        size = HEADER_SIZE + capacity * RECORD_DTYPE.itemsize
+        if create:
+            self.shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+            _created.add(self.shm._name)
+        else:
+            self.shm = _attach(name)
+        self.name = self.shm.name
+        self.owner = create
+        self.header = np.ndarray((HEADER_SIZE // 8,), dtype='<u8', buffer=self.shm.buf)
+        if create:
+            self.header[:] = 0
+            self.header[_MAGIC] = MAGIC
+            self.header[_VERSION] = VERSION
+            self.header[_CAPACITY] = capacity
+            self.header[_RECORD_SIZE] = RECORD_DTYPE.itemsize
+            self.header[_START_NS] = time.monotonic_ns()
+        self.capacity = int(self.header[_CAPACITY])
+        self.records = np.ndarray((self.capacity,), dtype=RECORD_DTYPE,
+                                  buffer=self.shm.buf, offset=HEADER_SIZE)
+        self._seq = int(self.header[_WRITE_SEQ])
+
+    @property
+    def write_seq(self):
+        return int(self.header[_WRITE_SEQ])
+
+    def publish(self, words, timestamp_ns=None):
+        """Append one decoded frame (the words from ``decode_frame``)."""
+        if timestamp_ns is None:
+            timestamp_ns = time.monotonic_ns()
+        # Claim the slot first, readers drop records it may have torn
+        self.header[_CLAIM_SEQ] = self._seq + 1
+        record = self.records[self._seq % self.capacity]
+        record['timestamp_ns'] = timestamp_ns
+        record['channels'] = words[0:6]
+        record['temperature'] = words[6] if len(words) > 6 else 0
+        # The record is complete before the sequence makes it visible
+        self._seq += 1
+        self.header[_WRITE_SEQ] = self._seq
+
+    def close(self):
+        # Drop our views before closing the mapping
+        self.header = None
+        self.records = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+            _created.discard(self.shm._name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class SampleRingReader:
+    """
+    Reader side of the shared sample ring.
+
+    Parameters
+    ----------
+    name : string
+        Name of the ring created by the acquisition process.
+    from_start : bool, optional
+        Start with the oldest record still in the ring instead of only new
+        ones. The default is False.
+
+    """
+    def __init__(self, name, from_start=False):
+        self.shm = _attach(name)
+        self.header = np.ndarray((HEADER_SIZE // 8,), dtype='<u8', buffer=self.shm.buf)
+        if int(self.header[_MAGIC]) != MAGIC or int(self.header[_VERSION]) != VERSION:
+            self.shm.close()
+            raise ValueError(f"Shared memory block {name} is not a potentiostat sample ring")
+        if int(self.header[_RECORD_SIZE]) != RECORD_DTYPE.itemsize:
+            self.shm.close()
+            raise ValueError(f"Record size mismatch in shared memory block {name}")
+        self.capacity = int(self.header[_CAPACITY])
+        self.start_ns = int(self.header[_START_NS])
+        self.records = np.ndarray((self.capacity,), dtype=RECORD_DTYPE,
+                                  buffer=self.shm.buf, offset=HEADER_SIZE)
+        write_seq = int(self.header[_WRITE_SEQ])
+        self.read_seq = max(0, write_seq - self.capacity) if from_start else write_seq
+        self.missed = 0
+        # Sequence number of the first record of the last views()
+        self.view_seq = self.read_seq
+
+    def available(self):
+        return int(self.header[_WRITE_SEQ]) - self.read_seq
+
+    def views(self):
+        """
+        Zero-copy views of all records written since the last call.
+
+        Returns a list of one or two structured array views (two when the
+        new records wrap around the end of the ring). The views point into
+        shared memory and the writer keeps filling the ring: after using or
+        copying them, ``overwritten()`` tells how many of their leading
+        records may have been overwritten meanwhile and must be dropped.
+        """
+        write_seq = int(self.header[_WRITE_SEQ])
+        start = self.read_seq
+        if write_seq - start > self.capacity:
+            # Overrun: the oldest unread records were already overwritten
+            self.missed += write_seq - start - self.capacity
+            start = write_seq - self.capacity
+        self.read_seq = write_seq
+        self.view_seq = start
+        if write_seq == start:
+            return []
+        first = start % self.capacity
+        last = write_seq % self.capacity
+        if first < last:
+            return [self.records[first:last]]
+        parts = [self.records[first:]]
+        if last:
+            parts.append(self.records[:last])
+        return parts
+
+    def overwritten(self):
+        """
+        Number of leading records of the last ``views()`` the writer has
+        overwritten, or started to overwrite, since.
+        """
+        # Claiming sequence n reuses the slot of record n - 1 - capacity
+        claimed = int(self.header[_CLAIM_SEQ])
+        return min(max(0, claimed - self.capacity - self.view_seq), self.read_seq - self.view_seq)
+
+    def read(self):
+        """
+        New records since the last call as one (copied) structured array.
+
+        Records the writer overwrote while they were copied are dropped and
+        counted in ``missed``.
+        """
+        parts = self.views()
+        if not parts:
+            return np.zeros(0, dtype=RECORD_DTYPE)
+        records = np.concatenate(parts) if len(parts) > 1 else parts[0].copy()
+        torn = self.overwritten()
+        if torn:
+            self.missed += torn
+            records = records[torn:]
+        return records
+
+    def latest(self, count):
+        """Copy of the most recent ``count`` records, independent of ``read``."""
+        write_seq = int(self.header[_WRITE_SEQ])
+        count = min(count, write_seq, self.capacity)
+        indices = np.arange(write_seq - count, write_seq) % self.capacity
+        records = self.records[indices]
+        # Leave out records the writer overwrote while they were copied
+        claimed = int(self.header[_CLAIM_SEQ])
+        return records[max(0, claimed - self.capacity - (write_seq - count)):]
+
+    def close(self):
+        self.header = None
+        self.records = None
+        self.shm.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+async def publish_shared(subscription, ring):
+    """AcquisitionService consumer that publishes every sample to a ring."""
+    async for sample in subscription:
+        ring.publish(sample.words, sample.timestamp_ns)
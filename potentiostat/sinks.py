@@ -0,0 +1,168 @@
+"""
+Long lived output sinks for the potentiostat dataloggers.
+
+"""
+
+import os
+import time
+
+
+class OutputSink:
+    """
+    Buffered sink that keeps the output file open for the whole run.
+
+    Lines are collected in the file object's buffer and pushed to the OS
+    every ``flush_every`` samples or ``flush_interval`` seconds, whichever
+    comes first. The header given to ``open`` is kept in memory and written
+    again at the top of every rotated file.
+
+    Parameters
+    ----------
+    filename : string
+        Path of the first output file. Rotated files get a ``_001``,
+        ``_002``, ... suffix before the extension.
+    buffer_size : int, optional
+        Size of the file buffer in bytes. The default is 65536.
+    flush_every : int, optional
+        Flush after this many samples. The default is 50.
+    flush_interval : float, optional
+        Flush when this many seconds passed since the last flush.
+        The default is 5.0.
+    fsync : string, optional
+        When to force data onto the storage device: 'never', 'flush' (after
+        every flush) or 'close' (when a file is closed or rotated).
+        The default is 'close'.
+    rotate_bytes : int, optional
+        Start a new file once the current one reaches this size.
+        The default is None (no size based rotation).
+    rotate_interval : float, optional
+        Start a new file after this many seconds. The default is None
+        (no time based rotation).
+    encoding : string, optional
+        Text encoding of the output. The default is the platform default,
+        same as the plain ``open`` calls this replaces.
+    binary : bool, optional
+        Write bytes records instead of text lines. The default is False.
+
+    """
+    FSYNC_POLICIES = ('never', 'flush', 'close')
+
+    def __init__(self, filename, buffer_size=65536, flush_every=50, flush_interval=5.0,
+                 fsync='close', rotate_bytes=None, rotate_interval=None, encoding=None,
+                 binary=False):
+        if fsync not in self.FSYNC_POLICIES:
+            raise ValueError(f"'fsync' must be one of {self.FSYNC_POLICIES}")
+        self.filename = filename
+        self.buffer_size = buffer_size
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self.fsync = fsync
+        self.rotate_bytes = rotate_bytes
+        self.rotate_interval = rotate_interval
+        self.encoding = encoding
+        self.binary = binary
+        self.header = None
+        self.current_filename = None
+        self.part = 0
+        self._file = None
+        self._pending = 0
+        self._bytes_written = 0
+        self._last_flush = 0.0
+        self._opened_at = 0.0
+
+    @property
+    def is_open(self):
+        return self._file is not None
+
+    def part_filename(self, part):
+        if part == 0:
+            return self.filename
+        root, ext = os.path.splitext(self.filename)
+        return f"{root}_{part:03d}{ext}"
+
+    def open(self, header=None):
+        """
+        Truncate the output file and write ``header`` at its top.
+
+        Without a header the sink can also be used straight away: the first
+        ``write`` then appends to an existing file instead.
+        """
+        self.close()
+        self.header = header
+        self._open_file('w')
+
+    def _open_file(self, mode):
+        self.current_filename = self.part_filename(self.part)
+        if self.binary:
+            self._file = open(self.current_filename, mode + 'b', buffering=self.buffer_size)
+        else:
+            self._file = open(self.current_filename, mode, buffering=self.buffer_size,
+                              encoding=self.encoding)
+        self._bytes_written = self._file.tell()
+        self._pending = 0
+        self._opened_at = self._last_flush = time.monotonic()
+        if mode == 'w' and self.header:
+            self._file.write(self.header)
+            self._bytes_written += len(self.header)
+
+    def write(self, line, samples=1):
+        """
+        Write one sample line (including its newline) or binary record.
+
+        A batch of several lines can be written at once; ``samples`` tells
+        the flush policy how many samples it holds.
+        """
+        if self._file is None:
+            self._open_file('a')
+        self._file.write(line)
+        self._bytes_written += len(line)
+        self._pending += samples
+        if self._pending >= self.flush_every:
+            self.flush()
+        else:
+            self.poll()
+        if self.rotate_bytes is not None and self._bytes_written >= self.rotate_bytes:
+            self.rotate()
+
+    def poll(self):
+        """Apply the time based flush and rotation policies."""
+        if self._file is None:
+            return
+        now = time.monotonic()
+        if self._pending and now - self._last_flush >= self.flush_interval:
+            self.flush()
+        if self.rotate_interval is not None and now - self._opened_at >= self.rotate_interval:
+            self.rotate()
+
+    def flush(self):
+        if self._file is None:
+            return
+        self._file.flush()
+        if self.fsync == 'flush':
+            os.fsync(self._file.fileno())
+        self._pending = 0
+        self._last_flush = time.monotonic()
+
+    def rotate(self):
+        """Close the current file and continue in the next numbered one."""
+        self._close_file()
+        self.part += 1
+        self._open_file('w')
+
+    def _close_file(self):
+        if self._file is None:
+            return
+        self._file.flush()
+        if self.fsync != 'never':
+            os.fsync(self._file.fileno())
+        self._file.close()
+        self._file = None
+
+    def close(self):
+        self._close_file()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,126 @@
+import asyncio
+import struct
+import threading
+import time
+from collections import deque
+
+from SIX_SERVER_READER_3 import PotentiostatReader
+from potentiostat.acquisition import AcquisitionService, Subscription, write_text
+from potentiostat.framing import HEADER
+
+
+def make_frame(index):
+    body = bytes([0x04]) + struct.pack(">9h", index, 0, 0, 0, 0, 0, 592, 0, 0)
+    return HEADER + body + bytes([sum(body) & 0xFF, 0x16])
+
+
+class FakeMetrics:
+    def record_sample(self, seconds):
+        pass
+
+    def poll(self):
+        pass
+
+
+class FakeReader:
+    """Hands out ``batches`` of frames, then stops the service from the read thread."""
+
+    package_length = 25
+
+    def __init__(self, batches, service=None):
+        self.batches = deque(batches)
+        self.service = service
+        self.pending_frames = deque()
+        self.metrics = FakeMetrics()
+
+    def open_serial_connection(self):
+        pass
+
+    def read_frames(self):
+        if self.batches:
+            self.pending_frames.extend(make_frame(i) for i in self.batches.popleft())
+        else:
+            if self.service is not None:
+                self.service.stop()
+            time.sleep(0.01)
+
+
+def fill(subscription, count):
+    async def run():
+        for i in range(1, count + 1):
+            await subscription.put(i)
+        items = []
+        while len(subscription):
+            items.append(await subscription.get())
+        return items
+    return asyncio.run(run())
+
+
+def test_block_policy_delivers_every_sample():
+    reader = FakeReader([range(1, 11), range(11, 31)])
+    service = AcquisitionService(reader)
+    reader.service = service
+    subscription = service.subscribe(maxsize=2, policy='block')
+    received = []
+
+    async def slow_consumer():
+        async for sample in subscription:
+            received.append(sample.words[0])
+            await asyncio.sleep(0)
+
+    asyncio.run(asyncio.wait_for(service.run_with(slow_consumer()), 5))
+    assert received == list(range(1, 31))
+    assert subscription.dropped == 0
+
+
+def test_drop_oldest_policy_keeps_newest():
+    subscription = Subscription(maxsize=4, policy='drop_oldest')
+    assert fill(subscription, 10) == [7, 8, 9, 10]
+    assert subscription.dropped == 6
+
+
+def test_sample_policy_replaces_queued_samples():
+    subscription = Subscription(maxsize=4, policy='sample', sample_every=3)
+    # 5 overflows the queue and replaces 1, then every third sample replaces
+    # the oldest one
+    assert fill(subscription, 11) == [4, 5, 8, 11]
+    assert subscription.dropped == 7
+
+
+def test_stop_ends_consumers():
+    reader = FakeReader([])
+    service = AcquisitionService(reader)
+    subscription = service.subscribe()
+    finished = []
+
+    async def consumer():
+        async for _ in subscription:
+            pass
+        finished.append(True)
+
+    async def main():
+        task = asyncio.ensure_future(service.run_with(consumer()))
+        await asyncio.sleep(0.05)
+        threading.Thread(target=service.stop).start()
+        await asyncio.wait_for(task, 5)
+
+    asyncio.run(main())
+    assert finished == [True]
+    assert subscription.closed
+
+
+def test_write_text_uses_the_reader_layout(tmp_path):
+    filename = tmp_path / "out.txt"
+    logger = PotentiostatReader("COM1", output_filename=str(filename))
+    reader = FakeReader([range(1, 4)])
+    service = AcquisitionService(reader)
+    reader.service = service
+    asyncio.run(service.run_with(
+        write_text(service.subscribe(policy='block'), logger.sink, logger.output_format)))
+    with open("example_format.txt") as template:
+        expected = template.read()
+    formatter = logger.output_format.formatter()
+    # All three frames arrive with one read, at 0 s
+    for i in range(1, 4):
+        expected += formatter.format(i, 0, [i, 0, 0, 0, 0, 0, 592, 0, 0])
+    assert filename.read_text() == expected
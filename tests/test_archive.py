@@ -0,0 +1,61 @@
+import os
+
+from potentiostat.archive import RunArchive, archive_run, open_run
+from potentiostat.reader import SampleTableFormat, TemplateFormat
+
+WORDS = [100, 200, 300, 400, 500, 600, 592, 0, 0]
+
+
+def write_sample_table(file_path, samples, rate=10.0):
+    """A SIX_SERVER_READER log: the Sample/Time/s header on line 0, then rows."""
+    output_format = SampleTableFormat()
+    formatter = output_format.formatter()
+    with open(file_path, 'w') as file:
+        file.write(output_format.columns_header + "\n")
+        for number in range(1, samples + 1):
+            file.write(formatter.format(number, (number - 1) / rate, WORDS))
+    return file_path
+
+
+def write_template_run(file_path, samples, rate=10.0):
+    """A SIX_SERVER_READER_3 log: the BioMon template, then rows in its columns."""
+    output_format = TemplateFormat()
+    formatter = output_format.formatter()
+    with open(file_path, 'w') as file:
+        file.write(output_format.header())
+        for number in range(1, samples + 1):
+            file.write(formatter.format(number, (number - 1) / rate, WORDS))
+    return file_path
+
+
+def test_sample_table_window(tmp_path):
+    source = write_sample_table(str(tmp_path / 'run.txt'), 1000)
+    destination = archive_run(source, block_size=4096)
+
+    with RunArchive(destination) as archive:
+        assert archive.index['time_column'] == [1, 1.0]
+        assert archive.preamble.decode('utf-8').startswith("Sample\tTime/s\t")
+        window = archive.read_window(10.0, 20.0).splitlines()
+
+    assert window[0] == SampleTableFormat.columns_header
+    rows = [line.split("\t") for line in window[1:]]
+    assert [float(row[1]) for row in rows] == [number / 10 for number in range(100, 201)]
+    assert rows[0][0] == "101"
+
+
+def test_biomon_window(tmp_path):
+    source = write_template_run(str(tmp_path / 'run.txt'), 1000)
+    destination = archive_run(source, block_size=4096, remove=True)
+
+    with RunArchive(destination) as archive:
+        assert archive.index['time_column'] == [1, 60.0]
+        window = archive.read_window(10.0, 20.0).splitlines()
+
+    assert window[0].startswith("Created:")
+    assert window[1].startswith("counter\tt[min]\t")
+    assert window[2].startswith("Start:")
+    seconds = [float(line.split("\t")[1]) * 60 for line in window[3:]]
+    assert len(seconds) == 101 and 10.0 <= min(seconds) and max(seconds) <= 20.0
+    with open_run(source) as file:
+        assert file.readline().startswith("Created:")
+    assert not os.path.exists(source)
@@ -0,0 +1,45 @@
+import numpy as np
+
+from analysis.batch import analyze_runs, summary_table
+from jobst_data_reader import DataProcessor
+from potentiostat.reader import TemplateFormat
+
+
+def write_run(file_path, rows=200, seed=0):
+    output_format = TemplateFormat()
+    formatter = output_format.formatter()
+    rng = np.random.default_rng(seed)
+    with open(file_path, 'w') as file:
+        file.write(output_format.header())
+        for number in range(1, rows + 1):
+            words = list(rng.integers(-2000, 2000, size=6)) + [592]
+            file.write(formatter.format(number, number * 0.1, words))
+
+
+def test_broken_runs_become_error_entries(tmp_path):
+    good = str(tmp_path / 'good.txt')
+    write_run(good)
+    # Header without the channel columns, missing file
+    malformed = tmp_path / 'malformed.txt'
+    malformed.write_text("Created\ncounter\tt[min]\nStart\n\n1\t0.1\n")
+    missing = str(tmp_path / 'missing.txt')
+
+    results = list(analyze_runs([good, str(malformed), missing], workers=2))
+    assert [result[0] for result in results] == [good, str(malformed), missing]
+    assert results[0][3] is None and results[0][2] == 200
+    for _, debug_info, rows, error in results[1:]:
+        assert debug_info is None and rows == 0 and error
+    summary = summary_table(results)
+    assert set(summary['run']) == {good}
+
+
+def test_unexpected_errors_do_not_escape(tmp_path, monkeypatch):
+    def fail(self):
+        raise KeyError('Glutamate')
+
+    monkeypatch.setattr(DataProcessor, 'create_buffer', fail)
+    run = str(tmp_path / 'run.txt')
+    write_run(run)
+    [(file_path, debug_info, rows, error)] = analyze_runs([run], workers=1)
+    assert (file_path, debug_info, rows) == (run, None, 0)
+    assert error == "KeyError: 'Glutamate'"
@@ -0,0 +1,75 @@
+import os
+
+import numpy as np
+
+from analysis.cache import RunCache
+from analysis.loader import load_run
+from potentiostat.reader import TemplateFormat
+
+
+def write_run(file_path, rows, seed=0):
+    output_format = TemplateFormat()
+    formatter = output_format.formatter()
+    rng = np.random.default_rng(seed)
+    with open(file_path, 'w') as file:
+        file.write(output_format.header())
+        for number in range(1, rows + 1):
+            words = list(rng.integers(-2000, 2000, size=6)) + [592]
+            file.write(formatter.format(number, number * 0.1, words))
+
+
+def test_changed_run_is_parsed_again(tmp_path):
+    cache = RunCache(str(tmp_path / 'cache'))
+    run = str(tmp_path / 'run.txt')
+    write_run(run, 100)
+    first = load_run(run, cache=cache)
+    assert load_run(run, cache=cache).equals(first)
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    # Same size, new modification time
+    stat = os.stat(run)
+    write_run(run, 100, seed=1)
+    os.utime(run, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1))
+    second = load_run(run, cache=cache)
+    assert (cache.hits, cache.misses) == (1, 2)
+    assert second.equals(load_run(run, cache=False))
+    assert not second.equals(first)
+
+    # More rows, modification time put back
+    write_run(run, 150)
+    os.utime(run, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1))
+    assert len(load_run(run, cache=cache)) == 150
+    assert (cache.hits, cache.misses) == (1, 3)
+
+    # Columns not cached yet are added to the entry
+    assert list(load_run(run, ['counter', '#2ch1'], cache=cache).columns) == ['counter', '#2ch1']
+    assert cache.misses == 4
+    load_run(run, cache=cache)
+    assert cache.hits == 2
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    directory = tmp_path / 'cache'
+    cache = RunCache(str(directory), max_bytes=None)
+    runs = [str(tmp_path / f'run{i}.txt') for i in range(3)]
+    for i, run in enumerate(runs):
+        write_run(run, 500, seed=i)
+        load_run(run, cache=cache)
+    sizes = {run: os.path.getsize(cache.entry_path(run, 'run')) for run in runs}
+    for i, run in enumerate(runs):
+        os.utime(cache.entry_path(run, 'run'), ns=(i, i))
+
+    # A hit makes run0 the most recently used entry
+    cache.max_bytes = sizes[runs[0]] + sizes[runs[2]] + sizes[runs[1]] // 2
+    load_run(runs[0], cache=cache)
+    assert cache.hits == 1
+    assert cache.evict() == 1
+    assert sorted(os.listdir(directory)) == sorted(os.path.basename(cache.entry_path(run, 'run'))
+                                                   for run in (runs[0], runs[2]))
+
+    # A new entry is kept even if it alone is over the limit
+    cache.max_bytes = 1
+    new_run = str(tmp_path / 'new.txt')
+    write_run(new_run, 500, seed=3)
+    load_run(new_run, cache=cache)
+    assert os.listdir(directory) == [os.path.basename(cache.entry_path(new_run, 'run'))]
@@ -0,0 +1,68 @@
+import numpy as np
+import pandas as pd
+
+from analysis.calibration import ANALYTES, CHANNELS, Calibration, calibrate
+from analysis.loader import load_run
+from potentiostat.reader import TemplateFormat
+
+
+def baseline_calibration(df):
+    # DataProcessor.calibrate_data before the vector version
+    return pd.DataFrame({
+        'Glutamate': (df['#1ch1'] - df['#1ch2']) * 0.97,
+        'Glutamine': (df['#1ch3'] - df['#1ch1']) * 0.418,
+        'Glucose': (df['#1ch5'] - df['#1ch4']) * 0.6854,
+        'Lactate': (df['#1ch6'] - df['#1ch4']) * 0.0609,
+    })
+
+
+def random_channels(rows, blocks=1, seed=0):
+    rng = np.random.default_rng(seed)
+    columns = [f'#{block}ch{channel}' for block in range(1, blocks + 1) for channel in range(1, 7)]
+    return pd.DataFrame(rng.uniform(-5, 5, size=(rows, len(columns))), columns=columns)
+
+
+def test_calibrate_matches_baseline():
+    df = random_channels(500)
+    expected = baseline_calibration(df).to_numpy()
+    assert np.allclose(calibrate(df[CHANNELS].to_numpy()), expected)
+    assert np.allclose(calibrate(df[CHANNELS].to_numpy()[7]), expected[7])
+    assert np.allclose(Calibration.default().apply_frame(df).to_numpy(), expected)
+
+
+def test_config_calibrates_every_block():
+    calibration = Calibration.from_config('calibration.json')
+    df = random_channels(200, blocks=4, seed=1)
+    result = calibration.apply_frame(df)
+    for block in range(1, 5):
+        channels = df[[f'#{block}ch{channel}' for channel in range(1, 7)]].to_numpy()
+        columns = [f'#{block} {name}' for name in ANALYTES]
+        assert np.allclose(result[columns].to_numpy(), calibrate(channels))
+
+
+def test_coefficients_and_offsets():
+    calibration = Calibration.from_sensors({
+        2: {'Mix': {'coefficients': {'1': 0.5, '3': -0.25}, 'offset': 1.0},
+            'Single': {'working': 4, 'gain': 2.0}},
+    })
+    assert calibration.analytes == ['#2 Mix', '#2 Single']
+    raw = np.array([[2.0, 4.0, 3.0]])
+    assert calibration.columns == ['#2ch1', '#2ch3', '#2ch4']
+    assert np.allclose(calibration.apply(raw), [[0.5 * 2.0 - 0.25 * 4.0 + 1.0, 6.0]])
+
+
+def test_calibrate_run_matches_baseline(tmp_path):
+    output_format = TemplateFormat()
+    formatter = output_format.formatter()
+    file_path = str(tmp_path / 'run.txt')
+    rng = np.random.default_rng(2)
+    with open(file_path, 'w') as file:
+        file.write(output_format.header())
+        for number in range(1, 301):
+            words = list(rng.integers(-2000, 2000, size=6)) + [592]
+            file.write(formatter.format(number, number * 0.1, words))
+
+    results = Calibration.default().calibrate_run(file_path, chunk_size=2048)
+    expected = baseline_calibration(load_run(file_path))
+    assert np.allclose(results[[f'#1 {name}' for name in ANALYTES]].to_numpy(), expected.to_numpy())
+    assert results['counter'].tolist() == list(range(1, 301))
@@ -0,0 +1,75 @@
+import threading
+
+import pytest
+
+from potentiostat.decimate import Decimator
+from potentiostat.framing import GAIN
+from potentiostat.sinks import OutputSink
+
+SECOND = 1_000_000_000
+
+
+def words_at(t):
+    return [100 * t, 0, 0, 0, 0, 0, 592]
+
+
+def read_rows(filename):
+    lines = filename.read_text().splitlines()
+    return lines[:3], [line.split("\t") for line in lines[3:]]
+
+
+@pytest.fixture
+def decimator(tmp_path):
+    decimator = Decimator(OutputSink(str(tmp_path / "summary.txt")), OutputSink(str(tmp_path / "events.txt")),
+                          bucket_seconds=10, pre_trigger=30, post_trigger=60)
+    decimator.open()
+    return decimator
+
+
+def test_summary_buckets(decimator, tmp_path):
+    for t in range(25):
+        decimator.add(t + 1, t * SECOND, words_at(t))
+    decimator.close()
+    header, rows = read_rows(tmp_path / "summary.txt")
+    names = header[1].split("\t")
+    assert [row[names.index("count")] for row in rows] == ["10", "10", "5"]
+    ch1 = names.index("#1ch1")
+    assert float(rows[0][ch1]) == round(100 * 4.5 * GAIN, 3)
+    assert float(rows[2][names.index("#1ch1_min")]) == round(100 * 20 * GAIN, 3)
+    assert float(rows[2][names.index("#1ch1_max")]) == round(100 * 24 * GAIN, 3)
+    assert float(rows[1][names.index("t[min]")]) == round(10 / 60, 4)
+
+
+def test_event_window_in_template_layout(decimator, tmp_path):
+    for t in range(200):
+        if t == 100:
+            # Raised by another thread, applied with the next sample
+            thread = threading.Thread(target=decimator.trigger, args=(100 * SECOND, "move"))
+            thread.start()
+            thread.join()
+        decimator.add(t + 1, t * SECOND, words_at(t))
+    decimator.close()
+    assert decimator.triggers == [(100 * SECOND, "move")]
+
+    with open("example_format.txt") as template:
+        template_header = template.readlines()[1].rstrip("\n")
+    header, rows = read_rows(tmp_path / "events.txt")
+    assert header[1] == template_header
+    names = template_header.split("\t")
+    assert all(len(row) == 83 for row in rows)
+    # 30 s before to 60 s after the trigger
+    assert [int(row[names.index("counter")]) for row in rows] == list(range(71, 162))
+    first = rows[0]
+    assert float(first[names.index("t[min]")]) == round(70 / 60, 4)
+    assert float(first[names.index("#1ch1")]) == round(100 * 70 * GAIN, 3)
+    assert float(first[names.index("#1ch7")]) == 37.0
+
+
+def test_threshold_crossing_triggers(tmp_path):
+    decimator = Decimator(OutputSink(str(tmp_path / "summary.txt")), bucket_seconds=10,
+                          thresholds={0: 100 * 50 * GAIN})
+    decimator.open()
+    for t in range(100):
+        decimator.add(t + 1, t * SECOND, words_at(t))
+    decimator.close()
+    assert [timestamp for timestamp, _ in decimator.triggers] == [50 * SECOND]
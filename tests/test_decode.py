@@ -0,0 +1,61 @@
+import random
+import struct
+
+import numpy as np
+
+from potentiostat.decode import decode_file, decode_stream
+from potentiostat.framing import FrameSynchronizer, decode_frame, HEADER
+
+GAIN = 50 / (2**15 - 1)
+
+
+def make_frame(words, bad_checksum=False):
+    body = bytes([0x04]) + struct.pack(">9h", *words)
+    checksum = (sum(body) + bad_checksum) & 0xFF
+    return HEADER + body + bytes([checksum, 0x16])
+
+
+def noisy_stream(frames=500, seed=0):
+    generator = random.Random(seed)
+    stream = bytearray()
+    for _ in range(frames):
+        if generator.random() < 0.1:
+            stream += bytes(generator.randrange(256) for _ in range(generator.randint(1, 8)))
+        words = [generator.randint(-32768, 32767) for _ in range(6)] + [generator.randint(500, 700), 0, 0]
+        frame = make_frame(words, bad_checksum=generator.random() < 0.05)
+        if generator.random() < 0.05:
+            frame = frame[:generator.randint(1, 24)]
+        stream += frame
+    return bytes(stream)
+
+
+def test_decode_stream_matches_synchronizer():
+    stream = noisy_stream()
+    framer = FrameSynchronizer()
+    words = []
+    for position in range(0, len(stream), 64):
+        framer.feed(stream[position:position + 64])
+        words.extend(decode_frame(frame) for frame in framer.frames())
+    expected = np.array(words, dtype=np.float64)
+
+    values, offsets = decode_stream(stream, return_offsets=True)
+
+    assert len(values) == len(expected) > 400
+    assert np.array_equal(values[:, 0:6], expected[:, 0:6] * GAIN)
+    assert np.array_equal(values[:, 6], expected[:, 6] / 16)
+    assert all(stream[offset:offset + 4] == HEADER for offset in offsets)
+
+
+def test_decode_file(tmp_path):
+    stream = noisy_stream(50, seed=1)
+    path = tmp_path / 'raw.bin'
+    path.write_bytes(stream)
+    assert np.array_equal(decode_file(str(path)), decode_stream(stream))
+
+
+def test_decode_empty_file(tmp_path):
+    path = tmp_path / 'empty.bin'
+    path.write_bytes(b"")
+    values, offsets = decode_file(str(path), return_offsets=True)
+    assert values.shape == (0, 7)
+    assert len(offsets) == 0
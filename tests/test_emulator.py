@@ -0,0 +1,39 @@
+import os
+import time
+
+from potentiostat.emulator import PotentiostatEmulator
+from potentiostat.framing import FrameSynchronizer, decode_frame
+
+
+def test_stop_without_a_reader():
+    emulator = PotentiostatEmulator(rate=5000, baud_rate=10_000_000, seed=1)
+    emulator.start()
+    # Nobody reads the pty, so it fills up within a few thousand frames
+    deadline = time.monotonic() + 5
+    while emulator.frames_dropped == 0 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    started = time.monotonic()
+    emulator.close()
+    assert time.monotonic() - started < 1
+    assert emulator.frames_dropped > 0
+    assert emulator.bytes_dropped > 0
+
+
+def test_frames_reach_the_slave_side():
+    emulator = PotentiostatEmulator(rate=1000, baud_rate=1_000_000, seed=1)
+    emulator.open()
+    reader = os.dup(emulator._slave)
+    try:
+        emulator.start()
+        framer = FrameSynchronizer()
+        frames = []
+        deadline = time.monotonic() + 5
+        while len(frames) < 20 and time.monotonic() < deadline:
+            framer.feed(os.read(reader, 4096))
+            frames.extend(framer.frames())
+        emulator.close()
+    finally:
+        os.close(reader)
+    assert len(frames) >= 20
+    assert framer.checksum_errors == 0
+    assert all(len(decode_frame(frame)) == 9 for frame in frames)
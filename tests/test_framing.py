@@ -0,0 +1,58 @@
+import struct
+
+from potentiostat.framing import FrameSynchronizer, decode_frame, HEADER
+
+WORDS = [100, -200, 3000, 0, 32767, -32768, 592, 0, 0]
+
+
+def make_frame(words, bad_checksum=False):
+    body = bytes([0x04]) + struct.pack(">9h", *words)
+    checksum = (sum(body) + bad_checksum) & 0xFF
+    return HEADER + body + bytes([checksum, 0x16])
+
+
+def test_frames_split_across_reads():
+    framer = FrameSynchronizer()
+    stream = make_frame(WORDS) * 3
+    found = []
+    for position in range(0, len(stream), 7):
+        framer.feed(stream[position:position + 7])
+        found.extend(framer.frames())
+    assert [decode_frame(frame) for frame in found] == [WORDS] * 3
+    assert framer.frames_ok == 3
+    assert framer.bytes_discarded == 0
+    assert len(framer) == 0
+
+
+def test_resync_after_noise_and_bad_checksum():
+    framer = FrameSynchronizer()
+    other = [1, 2, 3, 4, 5, 6, 7, 8, 9]
+    # Garbage with a stray header byte, a corrupted frame, a frame cut short
+    stream = (b"\x00\x68\x13\xff" + make_frame(WORDS)
+              + make_frame(other, bad_checksum=True)
+              + make_frame(WORDS)[:10]
+              + make_frame(other))
+    framer.feed(stream)
+    assert [decode_frame(frame) for frame in framer.frames()] == [WORDS, other]
+    assert framer.checksum_errors == 2
+    assert framer.resyncs > 0
+    assert framer.bytes_discarded == 4 + 25 + 10
+
+
+def test_partial_header_is_kept():
+    framer = FrameSynchronizer()
+    frame = make_frame(WORDS)
+    framer.feed(b"\x01\x02" + frame[:3])
+    assert framer.frames() == []
+    assert len(framer) == 3
+    framer.feed(frame[3:])
+    assert [decode_frame(found) for found in framer.frames()] == [WORDS]
+
+
+def test_buffer_limit_discards_oldest_bytes():
+    framer = FrameSynchronizer(max_buffer=64)
+    framer.feed(b"\x00" * 100)
+    assert len(framer) == 64
+    assert framer.bytes_discarded == 36
+    framer.feed(make_frame(WORDS))
+    assert [decode_frame(frame) for frame in framer.frames()] == [WORDS]
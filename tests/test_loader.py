@@ -0,0 +1,51 @@
+import os
+
+import numpy as np
+
+from analysis.loader import load_run
+from potentiostat.capture import biomon_stamp
+from potentiostat.multi import DeviceSample, WideRowWriter
+from potentiostat.reader import TemplateFormat
+from potentiostat.sinks import OutputSink
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TEMPLATE_FILE = os.path.join(REPO_DIR, 'example_format.txt')
+
+
+def test_template_run_with_footer(tmp_path):
+    # SIX_SERVER_READER_3 layout: the template (with its blank line after the
+    # Start line), the data rows and a footer
+    output_format = TemplateFormat(TEMPLATE_FILE)
+    formatter = output_format.formatter()
+    header = output_format.header()
+    assert "\n\n" in header
+    file_path = str(tmp_path / 'run.txt')
+    with open(file_path, 'w') as file:
+        file.write(header)
+        for number in range(1, 51):
+            file.write(formatter.format(number, number * 6.0, [number, 0, 0, 0, 0, 0, 592]))
+        file.write(biomon_stamp("Stop", 0))
+
+    df = load_run(file_path, chunk_size=512)
+
+    assert len(df) == 50
+    assert df['counter'].tolist() == list(range(1, 51))
+    assert np.allclose(df['t[min]'], np.arange(1, 51) / 10)
+    assert np.allclose(df['#1ch7'], 37.0)
+
+
+def test_wide_rows_load(tmp_path):
+    file_path = str(tmp_path / 'wide.txt')
+    writer = WideRowWriter(OutputSink(file_path), 2, template_file=TEMPLATE_FILE)
+    writer.open()
+    for number in range(20):
+        timestamp_ns = number * 100_000_000
+        writer.add(DeviceSample(timestamp_ns, 0, number, [number, 0, 0, 0, 0, 0, 592]))
+        writer.add(DeviceSample(timestamp_ns + 1000, 1, number, [2 * number, 0, 0, 0, 0, 0, 600]))
+    writer.close()
+
+    df = load_run(file_path, columns=['counter', 't[min]', '#1ch1', '#2ch1', '#2ch7'])
+
+    assert df['counter'].tolist() == list(range(1, 21))
+    assert np.allclose(df['#2ch1'], np.round(2 * np.arange(20) * 50 / 32767, 3))
+    assert np.allclose(df['#2ch7'], 37.5)
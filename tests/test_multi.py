@@ -0,0 +1,96 @@
+import struct
+import time
+from collections import deque
+
+from potentiostat.framing import HEADER
+from potentiostat.multi import (MultiPotentiostatAcquisition, WideRowWriter, DeviceSample,
+                                biomon_columns)
+from potentiostat.sinks import OutputSink
+
+
+def make_frame(index):
+    body = bytes([0x04]) + struct.pack(">9h", index, 0, 0, 0, 0, 0, 592, 0, 0)
+    return HEADER + body + bytes([sum(body) & 0xFF, 0x16])
+
+
+class FakeReader:
+    """Hands out ``frames`` frames in small batches, then idles or fails."""
+
+    package_length = 25
+
+    def __init__(self, frames, fail=False):
+        self.frames = deque(make_frame(i) for i in range(frames))
+        self.fail = fail
+        self.pending_frames = deque()
+
+    def open_serial_connection(self):
+        pass
+
+    def close_serial_connection(self):
+        pass
+
+    def read_frames(self):
+        if not self.frames:
+            if self.fail:
+                raise OSError("device unplugged")
+            time.sleep(0.001)
+        for _ in range(min(7, len(self.frames))):
+            self.pending_frames.append(self.frames.popleft())
+
+
+def test_merged_keeps_every_frame():
+    readers = [FakeReader(200), FakeReader(150)]
+    acquisition = MultiPotentiostatAcquisition(readers, reorder_window=0.01)
+    acquisition.start()
+    received = []
+    for sample in acquisition.merged():
+        received.append(sample)
+        if len(received) == 350:
+            acquisition.stop()
+    assert [sum(1 for s in received if s.device == d) for d in (0, 1)] == [200, 150]
+    for device in (0, 1):
+        words = [s.words[0] for s in received if s.device == device]
+        assert words == sorted(words)
+
+
+def test_merged_ends_when_every_device_failed():
+    readers = [FakeReader(20, fail=True), FakeReader(30, fail=True)]
+    acquisition = MultiPotentiostatAcquisition(readers, reorder_window=0.01)
+    acquisition.start()
+    assert len(list(acquisition.merged())) == 50
+    assert all(isinstance(error, OSError) for error in acquisition.errors)
+    acquisition.stop()
+
+
+def test_wide_rows_follow_template(tmp_path):
+    filename = tmp_path / "wide.txt"
+    writer = WideRowWriter(OutputSink(str(filename)), 2, align_window=0.05)
+    writer.open()
+    ms = 1_000_000
+    writer.add(DeviceSample(0, 0, 0, [1000] * 6 + [592]))
+    writer.add(DeviceSample(1 * ms, 1, 0, [2000] * 6 + [592]))
+    # device 0 again before device 1: the row is written without it
+    writer.add(DeviceSample(100 * ms, 0, 1, [3000] * 6 + [592]))
+    writer.add(DeviceSample(110 * ms, 0, 2, [4000] * 6 + [592]))
+    writer.close()
+
+    with open("example_format.txt") as template:
+        template_header = template.readlines()[1]
+    lines = filename.read_text().splitlines(keepends=True)
+    assert lines[0].startswith("Created: ")
+    assert lines[1] == template_header
+    assert lines[2].startswith("Start: ")
+    rows = [line.rstrip("\n").split("\t") for line in lines[3:]]
+    assert len(rows) == 3
+    assert all(len(row) == 83 for row in rows)
+    names = template_header.rstrip("\n").split("\t")
+    assert names[:66] == biomon_columns()
+    first, second, third = rows
+    assert first[names.index("#1ch1")] == f"{1000 * 50 / 32767:.3f}"
+    assert first[names.index("#2ch1")] == f"{2000 * 50 / 32767:.3f}"
+    assert first[names.index("#1ch7")] == "37.000"
+    # block 2 repeats its last values in rows without a frame of device 1
+    assert second[names.index("#1ch1")] == f"{3000 * 50 / 32767:.3f}"
+    assert second[names.index("#2ch1")] == first[names.index("#2ch1")]
+    assert third[0] == "3"
+    assert third[1] == f"{110 / 60000:.4f}"
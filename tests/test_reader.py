@@ -0,0 +1,142 @@
+import struct
+import time
+
+import pytest
+
+import SIX_SERVER_READER
+import SIX_SERVER_READER_2
+import SIX_SERVER_READER_3
+import jobst_data_server
+from potentiostat.framing import HEADER
+
+GAIN = 50 / (2**15 - 1)
+SAMPLES = [[100 * i - 700, 3 * i, -2000, 0, 32767, -32768, 590 + i, 0, 0] for i in range(12)]
+
+
+def make_frame(words):
+    body = bytes([0x04]) + struct.pack(">9h", *words)
+    return HEADER + body + bytes([sum(body) & 0xFF, 0x16])
+
+
+class FakeSerial:
+    def __init__(self, data):
+        self.data = data
+
+    @property
+    def in_waiting(self):
+        return len(self.data)
+
+    def read(self, size):
+        chunk, self.data = self.data[:size], self.data[size:]
+        return chunk
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """time.time stepping 0.25 s per call; ``clock`` lists the values handed out."""
+    calls = []
+
+    def fake_time():
+        calls.append(1_700_000_000.0 + 0.25 * len(calls))
+        return calls[-1]
+
+    monkeypatch.setattr(time, 'time', fake_time)
+    return calls
+
+
+class OneFrameSerial(FakeSerial):
+    """Serial port that never has more than one frame waiting."""
+
+    @property
+    def in_waiting(self):
+        return min(len(self.data), 25)
+
+
+def run_reader(reader, batch=False):
+    stream = b"".join(make_frame(words) for words in SAMPLES)
+    reader.serial_connection = OneFrameSerial(stream) if batch else FakeSerial(stream)
+    if hasattr(reader, 'line_one'):
+        reader.line_one()
+    for _ in SAMPLES:
+        reader.run_batch() if batch else reader.run()
+    reader.close_sink()
+
+
+def baseline_values(words):
+    # convert_data of the old reader copies
+    values = [round(int(x) * GAIN, 3) for x in words[0:6]]
+    values.append(round(float(words[6]) / 16, 3))
+    return values
+
+
+def baseline_deltas(clock):
+    # One time.time() per sample, after any calls made while setting up
+    stamps = [round(t, 4) for t in clock[-len(SAMPLES):]]
+    return [0] + [stamp - stamps[0] for stamp in stamps[1:]]
+
+
+def read_rows(filename, header_lines):
+    lines = filename.read_text().splitlines()
+    return lines[:header_lines], [line.split("\t") for line in lines[header_lines:]]
+
+
+@pytest.mark.parametrize("module", [SIX_SERVER_READER, SIX_SERVER_READER_2])
+def test_sample_table_matches_baseline(module, tmp_path, clock):
+    filename = tmp_path / "out.txt"
+    run_reader(module.PotentiostatReader("COM1", output_filename=str(filename)))
+    header, rows = read_rows(filename, 1)
+    assert header == ["Sample\tTime/s\tCh1/nA\tCh2/nA\tCh3/nA\tCh4/nA\tCh5/nA\tCh6/nA\tT/°C"]
+    assert len(rows) == len(SAMPLES)
+    for number, (row, words, delta) in enumerate(zip(rows, SAMPLES, baseline_deltas(clock)), start=1):
+        assert len(row) == 83
+        assert row[0] == str(number)
+        assert float(row[1]) == round(delta, 1)
+        assert [float(x) for x in row[2:9]] == baseline_values(words)
+        assert set(row[9:]) == {"0"}
+
+
+def test_template_matches_baseline(tmp_path, clock):
+    filename = tmp_path / "out.txt"
+    run_reader(SIX_SERVER_READER_3.PotentiostatReader("COM1", output_filename=str(filename)))
+    with open("example_format.txt") as template:
+        template_lines = template.read().splitlines()
+    header, rows = read_rows(filename, len(template_lines))
+    assert header == template_lines
+    names = template_lines[1].split("\t")
+    columns = [names.index(name) for name in ("#1ch1", "#1ch2", "#1ch3", "#1ch4", "#1ch5", "#1ch6", "#1ch7")]
+    assert len(rows) == len(SAMPLES)
+    for number, (row, words, delta) in enumerate(zip(rows, SAMPLES, baseline_deltas(clock)), start=1):
+        assert len(row) == 83
+        assert row[names.index("counter")] == str(number)
+        assert float(row[names.index("t[min]")]) == round(delta / 60, 4)
+        assert [float(row[column]) for column in columns] == baseline_values(words)
+
+
+def test_time_table_matches_baseline(tmp_path, clock):
+    filename = tmp_path / "out.txt"
+    run_reader(jobst_data_server.PotentiostatReader("COM1", output_filename=str(filename)))
+    header, rows = read_rows(filename, 1)
+    assert header == ["Time/s\tCh1/nA\tCh2/nA\tCh3/nA\tCh4/nA\tCh5/nA\tCh6/nA\tT/°C"]
+    assert len(rows) == len(SAMPLES)
+    for row, words, delta in zip(rows, SAMPLES, baseline_deltas(clock)):
+        assert float(row[0]) == round(delta, 1)
+        assert [float(x) for x in row[1:]] == baseline_values(words)[0:6]
+
+
+@pytest.mark.parametrize("module", [SIX_SERVER_READER, SIX_SERVER_READER_3, jobst_data_server])
+def test_run_and_run_batch_write_the_same_text(module, tmp_path, clock):
+    single = tmp_path / "run.txt"
+    batch = tmp_path / "run_batch.txt"
+    run_reader(module.PotentiostatReader("COM1", output_filename=str(single)))
+    run_reader(module.PotentiostatReader("COM1", output_filename=str(batch)), batch=True)
+    assert single.read_text() == batch.read_text()
+
+
+def test_get_data_returns_the_written_columns(tmp_path, clock):
+    reader = SIX_SERVER_READER_3.PotentiostatReader("COM1", output_filename=str(tmp_path / "out.txt"))
+    reader.serial_connection = FakeSerial(make_frame(SAMPLES[3]))
+    row = reader.get_data()
+    assert row == reader.formatter.format(1, 0, SAMPLES[3]).rstrip("\n").split("\t")
@@ -0,0 +1,47 @@
+import numpy as np
+
+from analysis.results import ResultStore
+from jobst_data_reader import DataProcessor
+
+ANALYTES = ['Glutamate', 'Glutamine', 'Glucose', 'Lactate']
+
+
+def test_append_grows_and_reads_back():
+    store = ResultStore(ANALYTES, capacity=2)
+    assert store.append_row([1.0, 2.0, 3.0, 4.0], index=10, timestamp=0.5)
+    # Repeats of the previous row and all NaN rows are not stored
+    assert not store.append_row([1.0, 2.0, 3.0, 4.0], index=11)
+    assert not store.append_row([np.nan] * 4, index=12)
+    assert store.append_row([1.5, np.nan, 3.0, 4.5], index=13, timestamp=0.75)
+    store.append(2, 9.0, index=14)
+    assert len(store) == 8
+
+    frame = store.to_frame()
+    assert frame['row'].tolist() == [0, 0, 0, 0, 1, 1, 1, 2]
+    assert frame['analyte'].tolist() == ANALYTES + ['Glutamate', 'Glucose', 'Lactate', 'Glucose']
+    assert frame['value'].tolist() == [1.0, 2.0, 3.0, 4.0, 1.5, 3.0, 4.5, 9.0]
+    assert frame['index'].tolist() == [10] * 4 + [13] * 3 + [14]
+    assert np.array_equal(frame['timestamp'], [0.5] * 4 + [0.75] * 3 + [np.nan], equal_nan=True)
+
+    wide = store.wide()
+    assert list(wide.columns) == ANALYTES
+    assert np.array_equal(wide.to_numpy(), [[1.0, 2.0, 3.0, 4.0], [1.5, np.nan, 3.0, 4.5],
+                                            [np.nan, np.nan, 9.0, np.nan]], equal_nan=True)
+
+
+def test_check_change_without_results_frame():
+    # Live and follow mode only fill outputs, there is no results frame
+    processor = DataProcessor()
+    assert processor.results is None
+    processor.outputs = [[2.0, 1.0], [4.0, 3.0], [6.0, 5.0], [8.0, 7.0]]
+    processor.check_change(500, timestamp=1.25)
+    processor.outputs[0].append(1.0)
+    processor.check_change(600)
+    assert processor.output.to_numpy().tolist() == [[1.0, 3.0, 5.0, 7.0]]
+    assert processor.changes.to_frame()['timestamp'].tolist() == [1.25] * 4
+    # Falling again in every analyte gives the next row
+    for values in processor.outputs:
+        values.append(values[-1] - 0.5)
+    processor.check_change(700)
+    assert processor.output.to_numpy().tolist() == [[1.0, 3.0, 5.0, 7.0], [0.5, 2.5, 4.5, 6.5]]
+    assert np.isnan(processor.changes.to_frame()['timestamp'].iloc[-1])
@@ -0,0 +1,66 @@
+import multiprocessing
+
+from potentiostat.shm import SharedSampleRing, SampleRingReader, _CLAIM_SEQ, _WRITE_SEQ
+
+
+def publish(ring, first, last):
+    for i in range(first, last):
+        ring.publish([i, 0, 0, 0, 0, 0, 592], timestamp_ns=i)
+
+
+def test_wrapped_ring_with_idle_writer():
+    with SharedSampleRing(capacity=16) as ring:
+        publish(ring, 0, 40)
+        with SampleRingReader(ring.name, from_start=True) as reader:
+            records = reader.read()
+            assert list(records['timestamp_ns']) == list(range(24, 40))
+            assert reader.missed == 0
+            assert reader.overwritten() == 0
+            assert list(reader.latest(5)['timestamp_ns']) == list(range(35, 40))
+
+
+def test_reader_lapped_by_writer():
+    with SharedSampleRing(capacity=16) as ring:
+        with SampleRingReader(ring.name) as reader:
+            publish(ring, 0, 20)
+            assert list(reader.read()['timestamp_ns']) == list(range(4, 20))
+            assert reader.missed == 4
+            views = reader.views()
+            assert views == []
+            publish(ring, 20, 30)
+            views = reader.views()
+            assert sum(len(view) for view in views) == 10
+            # Records 36 to 38 reuse the slots of the viewed records 20 to 22
+            publish(ring, 30, 39)
+            assert reader.overwritten() == 3
+
+
+def test_record_being_written_is_dropped():
+    with SharedSampleRing(capacity=16) as ring:
+        publish(ring, 0, 40)
+        # Writer in the middle of record 40, which reuses the slot of record 24
+        ring.header[_CLAIM_SEQ] = int(ring.header[_WRITE_SEQ]) + 1
+        with SampleRingReader(ring.name, from_start=True) as reader:
+            assert list(reader.read()['timestamp_ns']) == list(range(25, 40))
+            assert reader.missed == 1
+            assert len(reader.latest(16)) == 15
+
+
+def _child_read(name, results):
+    with SampleRingReader(name, from_start=True) as reader:
+        results.put(len(reader.read()))
+
+
+def test_child_process_reader_leaves_ring_alone():
+    context = multiprocessing.get_context('fork')
+    with SharedSampleRing(capacity=16) as ring:
+        publish(ring, 0, 10)
+        results = context.Queue()
+        child = context.Process(target=_child_read, args=(ring.name, results))
+        child.start()
+        assert results.get(timeout=10) == 10
+        child.join(10)
+        assert child.exitcode == 0
+        # The block is still there for other consumers
+        with SampleRingReader(ring.name, from_start=True) as reader:
+            assert len(reader.read()) == 10
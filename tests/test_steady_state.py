@@ -0,0 +1,77 @@
+import numpy as np
+import pandas as pd
+
+from analysis.steady_state import StreamingSteadyState, STD_LIMIT, SPACING, THRESH, WINDOW, accept
+from jobst_data_reader import DataProcessor
+
+
+def plateaus(samples, analytes=4, seed=0):
+    """Calibrated traces stepping between levels every 300 samples, with noise."""
+    rng = np.random.default_rng(seed)
+    levels = rng.uniform(0.5, 5.0, size=(samples // 300 + 1, analytes))
+    values = np.repeat(levels, 300, axis=0)[:samples]
+    noise = rng.normal(0, 0.004, size=values.shape)
+    noise[rng.random(samples) < 0.05] *= 10
+    return values + noise
+
+
+def test_running_mean_and_std_match_the_window():
+    values = plateaus(10000)
+    detector = StreamingSteadyState(analytes=4)
+    assert detector.window == WINDOW + 1
+    for index, row in enumerate(values):
+        detector.update(index, row)
+        if index % 997 == 0 or index == len(values) - 1:
+            window = values[max(0, index - detector.window + 1):index + 1]
+            assert np.allclose(detector.mean, window.mean(axis=0), atol=1e-12)
+            assert np.allclose(detector.std, window.std(axis=0), atol=1e-9)
+
+
+def test_outputs_match_a_full_window_recompute():
+    values = plateaus(6000, seed=1)
+    detector = StreamingSteadyState(analytes=4)
+    outputs = [[] for _ in range(4)]
+    indices = [[] for _ in range(4)]
+    window = WINDOW + 1
+    for index, row in enumerate(values):
+        detector.update(index, row)
+        if index + 1 < window:
+            continue
+        std = values[index - window + 1:index + 1].std(axis=0)
+        for i in np.flatnonzero(std < STD_LIMIT):
+            value = int(abs(row[i]) * 1000) / 1000
+            if accept(outputs[i], indices[i], value, index, THRESH[i], SPACING):
+                outputs[i].append(value)
+                indices[i].append(index)
+    assert detector.outputs == outputs
+    assert detector.indices == indices
+    assert all(indices)
+
+
+def baseline_create_buffer(processor):
+    # The row loop create_buffer used before it was vectorised
+    for index, row in processor.results.iterrows():
+        processor.buffer += 1
+        if processor.buffer > WINDOW:
+            processor.analyze_buffer(index)
+            processor.buffer = 0
+
+
+def make_processor(values):
+    processor = DataProcessor()
+    # Indexed from 3 like the frames of load_run
+    processor.results = pd.DataFrame(values, columns=['Glutamate', 'Glutamine', 'Glucose', 'Lactate'],
+                                     index=pd.RangeIndex(3, 3 + len(values)))
+    return processor
+
+
+def test_create_buffer_matches_the_row_loop():
+    values = plateaus(20000, seed=2)
+    expected = make_processor(values)
+    baseline_create_buffer(expected)
+    processor = make_processor(values)
+    processor.create_buffer()
+    assert processor.outputs == expected.outputs
+    assert processor.indices == expected.indices
+    assert processor.buffer == expected.buffer
+    assert all(processor.indices)
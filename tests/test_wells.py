@@ -0,0 +1,44 @@
+import numpy as np
+import pandas as pd
+
+from analysis.wells import VisitLog, well_name
+
+# Sequence([Method([1, 5], 15), Method([13], 30)]) as sent by AmuzaConnection.Move
+SEQUENCE = "@P,M1,0015,01,05,M2,0030,13,\n\n"
+
+
+def test_planned_visits_from_moves():
+    visits = VisitLog(clock=lambda: 0.0)
+    assert visits.move(SEQUENCE, 100.0)
+    wells = visits.wells()
+    assert wells.starts.tolist() == [100.0, 115.0, 130.0]
+    assert wells.ends.tolist() == [115.0, 130.0, 160.0]
+    assert visits.wells().assign([99.0, 100.0, 116.0, 159.9, 160.0]).tolist() == [0, 1, 5, 13, 0]
+    assert [well_name(well) for well in wells.wells] == ['A1', 'E1', 'E2']
+
+
+def test_resent_sequence_is_not_a_new_move():
+    visits = VisitLog()
+    assert visits.move(SEQUENCE, 100.0)
+    # Same target again while it is still running: the plan keeps going
+    assert not visits.move(SEQUENCE, 120.0)
+    assert len(visits.events) == 3
+    assert visits.well_at(135.0) == 13
+    # Once the plan is over (or for another target) it is a move again
+    assert visits.move(SEQUENCE, 160.0)
+    assert visits.move("@P,M1,0010,02,\n\n", 165.0)
+    assert visits.wells().assign([161.0, 166.0]).tolist() == [1, 2]
+
+
+def test_status_transitions_and_table():
+    visits = VisitLog()
+    for moment, reply in [(0.0, "@q,9,1,01,0010"), (5.0, "@q,9,1,01,0005"), (10.0, "@q,9,2,05,0010"),
+                          (20.0, "@q,0,0,00,0000")]:
+        visits.status(reply, moment)
+    assert len(visits.events) == 3
+    times = np.arange(0.0, 25.0)
+    values = pd.DataFrame({'Glucose': times})
+    table = visits.wells().aggregate(times, values)
+    assert table.index.tolist() == ['A1', 'E1']
+    assert table['samples'].tolist() == [10, 10]
+    assert table['Glucose mean'].tolist() == [4.5, 14.5]